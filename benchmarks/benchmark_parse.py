@@ -0,0 +1,114 @@
+"""Benchmark the table conversion of the parsers against the old per-value loop
+
+Writes a synthetic DWBA output with many angles and L-transfers, then times
+the per-value str.split()/float() loop hieroglyph used to use against the
+vectorized conversion in hieroglyph.parse. Both see the same blocks, so the
+difference is only in the table conversion.
+
+Run from the repository root as
+
+    python benchmarks/benchmark_parse.py --angles 200000 --ls 8
+"""
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import sys
+import click
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from hieroglyph.parse import (  # noqa: E402
+    DWBA_CS_HEADER,
+    DWBA_CS_FOOTER,
+    DWBA_CS_FOOTER_ALT,
+    DWBA_LXS_PER_ROW,
+    DWBALayout,
+    iter_dwba_tables,
+    parse_dwba_table,
+)
+
+ROWS_PER_PAGE = 50
+
+
+def write_synthetic_dwba(path: Path, n_angles: int, n_ls: int):
+    rng = np.random.default_rng(42)
+    l_values = list(range(n_ls))
+    groups = [
+        l_values[i : i + DWBA_LXS_PER_ROW] for i in range(0, n_ls, DWBA_LXS_PER_ROW)
+    ]
+    angles = np.linspace(0.0, 180.0, n_angles)
+    cross_ls = 10.0 ** rng.uniform(-4.0, 1.0, size=(n_angles, n_ls))
+    with open(path, "w") as output:
+        for start in range(0, n_angles, ROWS_PER_PAGE):
+            output.write(f"{DWBA_CS_HEADER}\n   ANGLE\n   (MB/SR)\n\n")
+            for group in groups:
+                output.write(" + ".join(f"  LX = {l}" for l in group) + "\n")
+            output.write("\n")
+            for idx in range(start, min(start + ROWS_PER_PAGE, n_angles)):
+                output.write(
+                    f" {angles[idx]:7.3f} {cross_ls[idx].sum():11.4E}   -0.1234"
+                    f"    0   30   12.34   {angles[idx]:7.3f}  0.1234  0.5678"
+                )
+                for gidx in range(len(groups)):
+                    lxs = cross_ls[idx, gidx * DWBA_LXS_PER_ROW :][: len(groups[gidx])]
+                    output.write("".join(f" {value:11.4E}" for value in lxs) + "\n")
+            if start + ROWS_PER_PAGE < n_angles:
+                output.write(f"{DWBA_CS_FOOTER}\n")
+            else:
+                output.write(f"{DWBA_CS_FOOTER_ALT}  1.0\n")
+
+
+def loop_dwba_table(table: list[str], layout: DWBALayout) -> list[list[float]]:
+    """The per-value loop the parser used before the tables were vectorized"""
+    rows = []
+    rows_per_line = layout.rows_per_line
+    idx = 0
+    while idx < len(table):
+        entries = table[idx].split()
+        if len(entries) == 0:
+            idx += 1
+            continue
+        row = [float(entries[0]), float(entries[1])]
+        for ridx in range(rows_per_line):
+            lx_entries = table[idx + ridx].split()
+            start_idx = 9 if ridx == 0 else 0
+            for i in range(layout.lxs_per_row[ridx]):
+                row.append(float(lx_entries[start_idx + i]))
+        rows.append(row)
+        idx += rows_per_line
+    return rows
+
+
+@click.command()
+@click.option("--angles", type=int, default=200000, help="Number of table rows")
+@click.option("--ls", type=int, default=8, help="Number of L-transfers")
+def main(angles: int, ls: int):
+    with TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "synthetic_dwba.out"
+        write_synthetic_dwba(path, angles, ls)
+        print(f"Synthetic output: {path.stat().st_size / 1.0e6:.1f} MB")
+        with open(path, "r") as pt_file:
+            tables = list(iter_dwba_tables(pt_file))
+
+    start = perf_counter()
+    loop_rows = np.array(
+        [row for layout, table in tables for row in loop_dwba_table(table, layout)]
+    )
+    loop_time = perf_counter() - start
+
+    start = perf_counter()
+    vector_rows = np.vstack(
+        [parse_dwba_table(table, layout) for layout, table in tables]
+    )
+    vector_time = perf_counter() - start
+
+    if not np.array_equal(loop_rows, vector_rows):
+        raise Exception("Vectorized tables do not match the loop!")
+    print(f"Per-value loop: {loop_time:.3f} s")
+    print(f"Vectorized:     {vector_time:.3f} s ({loop_time / vector_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
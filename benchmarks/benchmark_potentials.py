@@ -0,0 +1,72 @@
+"""Benchmark the array optical potentials against the scalar ones
+
+Evaluates every potential over a random set of energies and targets, once
+point by point with create_parameters and once in bulk with
+create_parameters_array, checks that the two agree element for element, and
+times both. numpy's exp and power can differ from the math module's in the
+last bit, so the check allows a few ulps.
+
+Run from the repository root as
+
+    python benchmarks/benchmark_potentials.py --points 20000
+"""
+
+from pathlib import Path
+from time import perf_counter
+import sys
+import click
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from hieroglyph.potentials import (  # noqa: E402
+    POTENTIALS,
+    PARAMETER_NAMES,
+    create_parameters,
+    create_parameters_array,
+)
+
+# Agreement asked of the array potentials
+RELATIVE_TOLERANCE = 1.0e-12
+ABSOLUTE_TOLERANCE = 1.0e-12
+
+
+@click.command()
+@click.option("--points", type=int, default=20000, help="Number of (E, Z, A) points")
+def main(points: int):
+    rng = np.random.default_rng(42)
+    energies = rng.uniform(1.0, 100.0, points)
+    zs = rng.integers(3, 90, points)
+    As = 2 * zs + rng.integers(0, 50, points)
+
+    for potential in POTENTIALS.keys():
+        start = perf_counter()
+        scalar = [
+            create_parameters(float(energy), int(z), int(a), potential)
+            for energy, z, a in zip(energies, zs, As)
+        ]
+        scalar_time = perf_counter() - start
+
+        start = perf_counter()
+        vector = create_parameters_array(energies, zs, As, potential)
+        vector_time = perf_counter() - start
+
+        for name in PARAMETER_NAMES:
+            expected = np.array([params[name] for params in scalar])
+            if not np.allclose(
+                vector[name],
+                expected,
+                rtol=RELATIVE_TOLERANCE,
+                atol=ABSOLUTE_TOLERANCE,
+            ):
+                raise Exception(
+                    f"Array potential {potential} does not match the scalar one for {name}!"
+                )
+        print(
+            f"{potential:24s} scalar: {scalar_time:.3f} s  array: {vector_time:.4f} s"
+            f" ({scalar_time / vector_time:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from glob import glob
+from itertools import repeat
+from pathlib import Path
+import numpy as np
+
+from .parse import (
+    ELASTIC,
+    DWBA,
+    UNKNOWN,
+    ELASTIC_CS_HEADER,
+    DWBA_CS_HEADER,
+    read_differential_cross_section,
+)
+from .result import CrossSectionResult
+from .cache import ResultCache
+
+# Files handed to a worker at a time, keeps the pool from idling on tiny files
+BATCH_CHUNK_SIZE = 16
+
+
+def find_ptolemy_outputs(source: str) -> list[Path]:
+    """Find the PTOLEMY outputs to be parsed
+
+    Parameters
+    ----------
+    source: str
+        A directory (every file in it is used) or a glob pattern
+
+    Returns
+    -------
+    list[Path]
+        The sorted list of output paths
+    """
+    source_path = Path(source)
+    if source_path.is_dir():
+        return sorted(path for path in source_path.iterdir() if path.is_file())
+    return sorted(Path(path) for path in glob(source) if Path(path).is_file())
+
+
+def detect_output_kind(ptolemy_path: Path) -> str:
+    """Detect whether a PTOLEMY output is from an elastic or DWBA calculation
+
+    The output is read only until the first cross section header is found.
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+
+    Returns
+    -------
+    str
+        One of ELASTIC, DWBA, or UNKNOWN if no cross section was found
+    """
+    with open(ptolemy_path, "r") as pt_file:
+        for line in pt_file:
+            if line.startswith(DWBA_CS_HEADER):
+                return DWBA
+            elif line.startswith(ELASTIC_CS_HEADER):
+                return ELASTIC
+    return UNKNOWN
+
+
+def parse_output(
+    ptolemy_path: Path, cache: ResultCache | None = None
+) -> tuple[str, CrossSectionResult | None, str]:
+    """Detect the kind of a PTOLEMY output and parse it
+
+    Errors are caught and returned so that one bad file does not stop a batch.
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+    cache: ResultCache | None
+        If given, a cached result for an identical output is used instead of parsing
+
+    Returns
+    -------
+    tuple[str, CrossSectionResult | None, str]
+        The kind of the output (UNKNOWN if it could not be detected), the parsed
+        result (None on failure), and the error message (empty on success)
+    """
+    try:
+        kind = detect_output_kind(ptolemy_path)
+    except Exception as error:
+        return UNKNOWN, None, str(error)
+    if kind == UNKNOWN:
+        return kind, None, "No cross section table found"
+    try:
+        return (
+            kind,
+            read_differential_cross_section(ptolemy_path, kind, cache, verbose=False),
+            "",
+        )
+    except Exception as error:
+        return kind, None, str(error)
+
+
+def parse_batch(
+    ptolemy_paths: list[Path],
+    n_workers: int | None = None,
+    cache: ResultCache | None = None,
+) -> list[tuple[str, CrossSectionResult | None, str]]:
+    """Parse many PTOLEMY outputs across a pool of worker processes
+
+    Parameters
+    ----------
+    ptolemy_paths: list[Path]
+        The PTOLEMY outputs
+    n_workers: int | None
+        The number of worker processes. None uses one per CPU
+    cache: ResultCache | None
+        If given, cached results for identical outputs are used instead of parsing
+
+    Returns
+    -------
+    list[tuple[str, CrossSectionResult | None, str]]
+        The result of parse_output for each path, in the same order as the paths
+    """
+    # The workers leave eviction to a single pass once the batch is done, rather
+    # than each scanning the cache as they go
+    worker_cache = None
+    if cache is not None:
+        worker_cache = copy(cache)
+        worker_cache.evict_on_put = False
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        parsed = list(
+            executor.map(
+                parse_output,
+                ptolemy_paths,
+                repeat(worker_cache),
+                chunksize=BATCH_CHUNK_SIZE,
+            )
+        )
+    if cache is not None:
+        cache.evict()
+    return parsed
+
+
+def consolidate_batch(
+    ptolemy_paths: list[Path],
+    parsed: list[tuple[str, CrossSectionResult | None, str]],
+) -> dict[str, np.ndarray]:
+    """Pack the results of a batch into one set of flat arrays
+
+    The arrays of every file are concatenated. The arrays named *offsets have one
+    more entry than there are files, and file i owns the slice offsets[i]:offsets[i+1].
+    cross_ls is stored flattened, and is recovered for file i by reshaping its slice to
+    (number of l-values, number of angles).
+
+    Parameters
+    ----------
+    ptolemy_paths: list[Path]
+        The PTOLEMY outputs
+    parsed: list[tuple[str, CrossSectionResult | None, str]]
+        The result of parse_output for each path
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        The consolidated dataset
+    """
+    empty = CrossSectionResult(
+        cross_ls=np.empty(0), l_values=np.empty(0, dtype=np.int64)
+    )
+    results = [result if result is not None else empty for _, result, _ in parsed]
+    ls_results = [
+        result if result.cross_ls is not None else empty for result in results
+    ]
+
+    def offsets(lengths: list[int]) -> np.ndarray:
+        return np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+
+    # Seeded with a typed empty array, so a batch of no files still consolidates
+    return {
+        "path": np.array([str(path) for path in ptolemy_paths], dtype=str),
+        "kind": np.array([kind for kind, _, _ in parsed], dtype=str),
+        "error": np.array([error for _, _, error in parsed], dtype=str),
+        "angle": np.concatenate([np.empty(0)] + [result.angle for result in results]),
+        "cross": np.concatenate([np.empty(0)] + [result.cross for result in results]),
+        "offsets": offsets([len(result.angle) for result in results]),
+        "l_values": np.concatenate(
+            [np.empty(0, dtype=np.int64)] + [result.l_values for result in ls_results]
+        ),
+        "l_offsets": offsets([len(result.l_values) for result in ls_results]),
+        "cross_ls": np.concatenate(
+            [np.empty(0)] + [result.cross_ls.ravel() for result in ls_results]
+        ),
+        "cross_ls_offsets": offsets([result.cross_ls.size for result in ls_results]),
+    }
+
+
+def get_batch_result(
+    data: dict[str, np.ndarray], idx: int
+) -> CrossSectionResult | None:
+    """Get the result of a single entry of a consolidated dataset
+
+    Parameters
+    ----------
+    data: dict[str, numpy.ndarray]
+        The consolidated dataset. An opened .npz works, but reads its arrays on every
+        call, so load them first when getting many entries
+    idx: int
+        The position of the entry in the dataset
+
+    Returns
+    -------
+    CrossSectionResult | None
+        The result, or None if the entry failed
+    """
+    kind = data["kind"][idx]
+    if data["error"][idx] or kind not in (ELASTIC, DWBA):
+        return None
+    offsets = data["offsets"]
+    result = CrossSectionResult(
+        angle=data["angle"][offsets[idx] : offsets[idx + 1]],
+        cross=data["cross"][offsets[idx] : offsets[idx + 1]],
+    )
+    if kind == DWBA:
+        l_offsets = data["l_offsets"]
+        ls_offsets = data["cross_ls_offsets"]
+        result.l_values = data["l_values"][l_offsets[idx] : l_offsets[idx + 1]]
+        result.cross_ls = data["cross_ls"][
+            ls_offsets[idx] : ls_offsets[idx + 1]
+        ].reshape(len(result.l_values), len(result.angle))
+    return result
+
+
+def unpack_batch(data: dict[str, np.ndarray]) -> dict[str, CrossSectionResult]:
+    """Split a consolidated dataset back into one result per file
+
+    Files which failed to parse are left out.
+
+    Parameters
+    ----------
+    data: dict[str, numpy.ndarray]
+        The consolidated dataset (an opened .npz works)
+
+    Returns
+    -------
+    dict[str, CrossSectionResult]
+        The result for each file keyed by the path of the PTOLEMY output
+    """
+    # An opened .npz reads an array every time it is looked up, so read them once
+    data = {key: data[key] for key in data.keys()}
+    results = {}
+    for idx, path in enumerate(data["path"]):
+        result = get_batch_result(data, idx)
+        if result is not None:
+            results[str(path)] = result
+    return results
@@ -0,0 +1,334 @@
+from hashlib import sha256
+from pathlib import Path
+import os
+import threading
+import zipfile
+import numpy as np
+
+from .result import CrossSectionResult
+
+# Environment variables which control the cache
+CACHE_DIR_ENV = "HIEROGLYPH_CACHE_DIR"
+CACHE_MAX_MB_ENV = "HIEROGLYPH_CACHE_MAX_MB"
+
+DEFAULT_CACHE_MAX_MB = 2048
+
+# Bytes read at a time while hashing files
+HASH_CHUNK_SIZE = 1 << 20
+# Eviction brings the cache down to this fraction of its size cap, so that the
+# directory is not scanned again on the very next entry
+EVICT_TARGET_FRACTION = 0.9
+# Errors of reading an entry which is corrupt (left truncated by a full disk, or
+# written by an older layout), rather than missing
+CORRUPT_ENTRY_ERRORS = (EOFError, ValueError, KeyError, TypeError, zipfile.BadZipFile)
+
+
+def default_cache_dir() -> Path:
+    """Get the directory hieroglyph keeps its caches in
+
+    This is $HIEROGLYPH_CACHE_DIR if set, otherwise $XDG_CACHE_HOME/hieroglyph
+    (~/.cache/hieroglyph)
+
+    Returns
+    -------
+    Path
+        The cache directory
+    """
+    if CACHE_DIR_ENV in os.environ:
+        return Path(os.environ[CACHE_DIR_ENV])
+    xdg_cache = os.environ.get("XDG_CACHE_HOME", str(Path.home() / ".cache"))
+    return Path(xdg_cache) / "hieroglyph"
+
+
+def default_max_bytes() -> int:
+    """Get the size cap of hieroglyph's caches
+
+    This is $HIEROGLYPH_CACHE_MAX_MB megabytes if set, otherwise DEFAULT_CACHE_MAX_MB
+
+    Returns
+    -------
+    int
+        The size cap in bytes
+    """
+    return int(float(os.environ.get(CACHE_MAX_MB_ENV, DEFAULT_CACHE_MAX_MB)) * 1.0e6)
+
+
+def hash_file(path: Path) -> str:
+    """Hash the contents of a file
+
+    Parameters
+    ----------
+    path: Path
+        The file to hash
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest of the contents
+    """
+    digest = sha256()
+    with open(path, "rb") as hashed_file:
+        while chunk := hashed_file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_key(*parts: str) -> str:
+    """Combine several strings into a single cache key
+
+    Parameters
+    ----------
+    *parts: str
+        The strings identifying an entry
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest of the parts
+    """
+    return sha256("\0".join(parts).encode()).hexdigest()
+
+
+class ResultCache:
+    """An on-disk cache of parsed results with a size cap
+
+    Each entry is an uncompressed .npz file named by its key. When the cache grows past
+    its size cap, the least recently used entries are evicted. An entry's modification
+    time is used as its last use, and is bumped on every hit. Entries are written to a
+    temporary file and moved into place, so several processes can share a cache.
+
+    The size of the cache is only found by scanning the directory on the first entry
+    written, and afterwards kept as a running total, so the directory is only scanned
+    again once the total passes the size cap. Processes writing many entries at once
+    (like the workers of hieroglyph.batch.parse_batch) can switch eviction off
+    altogether and leave it to a single evict() at the end.
+
+    Attributes
+    ----------
+    directory: Path
+        The directory holding the entries
+    max_bytes: int
+        The size cap of the cache
+    hits: int
+        The number of lookups which found an entry
+    misses: int
+        The number of lookups which did not find an entry
+    evict_on_put: bool
+        Whether storing an entry evicts old entries when the cache is over its cap
+    size: int | None
+        The running total of the size of the cache, None until it is first scanned
+
+    Methods
+    -------
+    get(key)
+        Look up an entry
+    put(key, result)
+        Store an entry
+    evict()
+        Remove the least recently used entries until the cache fits its size cap
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evict_on_put = True
+        self.size: int | None = None
+
+    def get_entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}.npz"
+
+    def get(self, key: str) -> CrossSectionResult | None:
+        """Look up an entry
+
+        Parameters
+        ----------
+        key: str
+            The key of the entry
+
+        Returns
+        -------
+        CrossSectionResult | None
+            The cached result, or None if there is no entry for the key. A corrupt
+            entry is removed
+        """
+        entry_path = self.get_entry_path(key)
+        try:
+            with np.load(entry_path) as data:
+                result = CrossSectionResult(**{name: data[name] for name in data.files})
+            os.utime(entry_path)
+        except OSError:
+            self.misses += 1
+            return None
+        except CORRUPT_ENTRY_ERRORS:
+            self.remove_entry(entry_path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def remove_entry(self, entry_path: Path):
+        # A corrupt entry would otherwise miss on every lookup until it is evicted
+        try:
+            entry_path.unlink()
+        except OSError:
+            pass
+
+    def put(self, key: str, result: CrossSectionResult):
+        """Store an entry, evicting old entries if needed
+
+        Parameters
+        ----------
+        key: str
+            The key of the entry
+        result: CrossSectionResult
+            The result to store
+        """
+        self.write_entry(key, result.arrays())
+
+    def write_entry(self, key: str, arrays: dict[str, np.ndarray]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry_path = self.get_entry_path(key)
+        temp_path = entry_path.with_name(
+            f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.partial"
+        )
+        with open(temp_path, "wb") as temp_file:
+            np.savez(temp_file, **arrays)
+            entry_size = temp_file.tell()
+        os.replace(temp_path, entry_path)
+        if not self.evict_on_put:
+            return
+        if self.size is not None:
+            self.size += entry_size
+        if self.size is None or self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits its size cap
+
+        If the cache is over its cap, entries are removed until it is down to
+        EVICT_TARGET_FRACTION of the cap. The running total is reset to the size
+        found.
+        """
+        entries = []
+        for entry_path in self.directory.glob("*.npz"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry_path))
+        total = sum(size for _, size, _ in entries)
+        target = (
+            self.max_bytes
+            if total <= self.max_bytes
+            else self.max_bytes * EVICT_TARGET_FRACTION
+        )
+        for _, size, entry_path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                entry_path.unlink()
+            except OSError:
+                continue
+            total -= size
+        self.size = total
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of lookups which found an entry"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class RunCache(ResultCache):
+    """An on-disk cache of the parsed results of PTOLEMY runs
+
+    The same as ResultCache, except that an entry holds every calculation of a run,
+    as an input can bundle several reactions. Each entry stores the kinds of the
+    calculations, and the arrays of calculation i prefixed by ri_.
+
+    Methods
+    -------
+    get_reactions(key)
+        Look up the calculations of a run
+    put_reactions(key, reactions)
+        Store the calculations of a run
+    """
+
+    def get_reactions(self, key: str) -> list[tuple[str, CrossSectionResult]] | None:
+        """Look up the calculations of a run
+
+        Parameters
+        ----------
+        key: str
+            The key of the entry
+
+        Returns
+        -------
+        list[tuple[str, CrossSectionResult]] | None
+            The kind and result of each calculation, or None if there is no entry
+            for the key. A corrupt entry is removed
+        """
+        entry_path = self.get_entry_path(key)
+        try:
+            with np.load(entry_path) as data:
+                reactions = []
+                for number, kind in enumerate(data["kinds"]):
+                    prefix = f"r{number}_"
+                    result = CrossSectionResult(
+                        **{
+                            name[len(prefix) :]: data[name]
+                            for name in data.files
+                            if name.startswith(prefix)
+                        }
+                    )
+                    reactions.append((str(kind), result))
+            os.utime(entry_path)
+        except OSError:
+            self.misses += 1
+            return None
+        except CORRUPT_ENTRY_ERRORS:
+            self.remove_entry(entry_path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return reactions
+
+    def put_reactions(self, key: str, reactions: list[tuple[str, CrossSectionResult]]):
+        """Store the calculations of a run, evicting old entries if needed
+
+        Parameters
+        ----------
+        key: str
+            The key of the entry
+        reactions: list[tuple[str, CrossSectionResult]]
+            The kind and result of each calculation
+        """
+        arrays = {"kinds": np.array([kind for kind, _ in reactions], dtype=str)}
+        for number, (_, result) in enumerate(reactions):
+            for name, array in result.arrays().items():
+                arrays[f"r{number}_{name}"] = array
+        self.write_entry(key, arrays)
+
+
+def default_parse_cache() -> ResultCache:
+    """Get the cache of parsed PTOLEMY outputs in the default location
+
+    Returns
+    -------
+    ResultCache
+        The cache, stored in the parsed subdirectory of default_cache_dir()
+    """
+    return ResultCache(default_cache_dir() / "parsed", default_max_bytes())
+
+
+def default_run_cache() -> RunCache:
+    """Get the cache of PTOLEMY runs in the default location
+
+    Returns
+    -------
+    RunCache
+        The cache, stored in the runs subdirectory of default_cache_dir()
+    """
+    return RunCache(default_cache_dir() / "runs", default_max_bytes())
@@ -0,0 +1,229 @@
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from mmap import mmap, ACCESS_READ
+from pathlib import Path
+import os
+import numpy as np
+
+from .parse import (
+    ELASTIC,
+    DWBA,
+    ELASTIC_CS_FOOTER,
+    DWBA_CS_HEADER,
+    DWBA_CS_FOOTER,
+    DWBA_HEADER_LINES,
+    DWBALayout,
+    parse_dwba_layout,
+    collect_elastic_result,
+    collect_dwba_result,
+    get_parse_key,
+)
+from .cache import ResultCache
+from .result import CrossSectionResult
+
+# The page banners at which the output can be safely split
+PAGE_BANNERS = {
+    ELASTIC: ELASTIC_CS_FOOTER.encode(),
+    DWBA: DWBA_CS_FOOTER.encode(),
+}
+
+# Chunks made per worker, so that a slow chunk does not leave the other workers idle
+CHUNKS_PER_WORKER = 4
+
+
+def find_line_starts(data: mmap, keyline: bytes) -> list[int]:
+    """Find the byte offsets of every line starting with a keyline
+
+    Parameters
+    ----------
+    data: mmap.mmap
+        The memory-mapped PTOLEMY output
+    keyline: bytes
+        The keyline to search for
+
+    Returns
+    -------
+    list[int]
+        The byte offsets of the start of each matching line, in increasing order
+    """
+    offsets = [0] if data[: len(keyline)] == keyline else []
+    pattern = b"\n" + keyline
+    position = data.find(pattern)
+    while position != -1:
+        offsets.append(position + 1)
+        position = data.find(pattern, position + 1)
+    return offsets
+
+
+def split_at_pages(
+    size: int, banners: list[int], n_chunks: int
+) -> list[tuple[int, int]]:
+    """Split an output into byte ranges which start at page banners
+
+    Every cross section block ends at a page banner (or the total cross section line),
+    so no block is ever split between two chunks.
+
+    Parameters
+    ----------
+    size: int
+        The size of the output in bytes
+    banners: list[int]
+        The byte offsets of the page banners, in increasing order
+    n_chunks: int
+        The number of chunks wanted. Fewer are made if there are not enough pages
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        The (start, end) byte range of each chunk, in file order
+    """
+    cuts = [0]
+    for chunk in range(1, n_chunks):
+        idx = bisect_left(banners, size * chunk // n_chunks)
+        if idx < len(banners) and banners[idx] > cuts[-1]:
+            cuts.append(banners[idx])
+    cuts.append(size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def read_layout_lines(data: mmap, header_offset: int) -> list[bytes]:
+    """Read the header lines of a DWBA block, up to the end of the Lx lines
+
+    Parameters
+    ----------
+    data: mmap.mmap
+        The memory-mapped PTOLEMY output
+    header_offset: int
+        The byte offset of the block header
+
+    Returns
+    -------
+    list[bytes]
+        The header lines followed by the Lx lines and the blank line ending them
+    """
+    data.seek(header_offset)
+    lines = [data.readline() for _ in range(DWBA_HEADER_LINES)]
+    while True:
+        line = data.readline()
+        lines.append(line)
+        if line.strip() == b"":
+            return lines
+
+
+def find_dwba_layout(data: mmap) -> DWBALayout:
+    """Find the Lx layout shared by every DWBA block of an output
+
+    Only the headers of the blocks are read, which are found by searching the
+    memory-mapped file.
+
+    Parameters
+    ----------
+    data: mmap.mmap
+        The memory-mapped PTOLEMY output
+
+    Returns
+    -------
+    DWBALayout
+        The Lx layout
+    """
+    header_offsets = find_line_starts(data, DWBA_CS_HEADER.encode())
+    if len(header_offsets) == 0:
+        raise Exception("Did not find any lxs while parsing DWBA!")
+    layout_lines = read_layout_lines(data, header_offsets[0])
+    for offset in header_offsets[1:]:
+        if (
+            read_layout_lines(data, offset)[DWBA_HEADER_LINES:]
+            != layout_lines[DWBA_HEADER_LINES:]
+        ):
+            raise Exception(
+                "Found DWBA tables with different lxs! Parse each reaction separately using hieroglyph.index"
+            )
+    return parse_dwba_layout([line.decode() for line in layout_lines])
+
+
+def _parse_chunk(
+    task: tuple[Path, str, int, int, DWBALayout | None, bool],
+) -> CrossSectionResult:
+    ptolemy_path, kind, start, end, layout, extras = task
+    with open(ptolemy_path, "rb") as pt_file:
+        with mmap(pt_file.fileno(), 0, access=ACCESS_READ) as data:
+            lines = data[start:end].decode().splitlines(keepends=True)
+    if kind == DWBA:
+        return collect_dwba_result(lines, verbose=False, layout=layout, extras=extras)
+    return collect_elastic_result(lines, extras)
+
+
+def read_chunked(
+    ptolemy_path: Path,
+    kind: str,
+    n_workers: int | None = None,
+    extras: bool = False,
+    cache: ResultCache | None = None,
+) -> CrossSectionResult:
+    """Parse a large PTOLEMY output in parallel chunks
+
+    The output is memory-mapped and split at its page banners into chunks, which
+    are parsed across a pool of worker processes. For DWBA the Lx layout is found
+    once and handed to every worker. The chunk results are stitched back together
+    in file order, which is the angle order of the table, so the result is the same
+    as from the single process parsers, and shares their cache entries (see
+    hieroglyph.parse.read_differential_cross_section).
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+    kind: str
+        The kind of calculation (ELASTIC or DWBA)
+    n_workers: int | None
+        The number of worker processes. None uses one per CPU
+    extras: bool
+        If True, also collect the extra tables of the output (default False)
+    cache: ResultCache | None
+        The cache of parsed results. None always parses (default None)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed result
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    ptolemy_path = Path(ptolemy_path)
+    if ptolemy_path.stat().st_size == 0:
+        raise Exception(f"PTOLEMY output {ptolemy_path} is empty!")
+    key = None
+    if cache is not None:
+        key = get_parse_key(ptolemy_path, kind, extras)
+        result = cache.get(key)
+        if result is not None:
+            return result
+    layout = None
+    with open(ptolemy_path, "rb") as pt_file:
+        with mmap(pt_file.fileno(), 0, access=ACCESS_READ) as data:
+            if kind == DWBA:
+                layout = find_dwba_layout(data)
+            banners = find_line_starts(data, PAGE_BANNERS[kind])
+            chunks = split_at_pages(len(data), banners, n_workers * CHUNKS_PER_WORKER)
+
+    tasks = [(ptolemy_path, kind, start, end, layout, extras) for start, end in chunks]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        parts = list(executor.map(_parse_chunk, tasks))
+
+    # Per-l arrays are laid out (l, angle), so they are stitched along the second axis
+    result = CrossSectionResult()
+    for name, array in parts[0].arrays().items():
+        if name == "l_values":
+            continue
+        setattr(
+            result,
+            name,
+            np.concatenate(
+                [getattr(part, name) for part in parts], axis=array.ndim - 1
+            ),
+        )
+    if layout is not None:
+        result.l_values = np.array(layout.l_values, dtype=np.int64)
+    if cache is not None and key is not None:
+        cache.put(key, result)
+    return result
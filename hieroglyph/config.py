@@ -2,8 +2,10 @@ from dataclasses import dataclass, field
 from spyral_utils.nuclear import NuclearDataMap
 from pathlib import Path
 from json import load
+from typing import Any
 
 from .convert import convert_to_target_ke
+from .nuclear import MassTable
 
 
 @dataclass
@@ -71,7 +73,7 @@ class Config:
     angle_max: float = 0.0
     angle_step: float = 0.0
 
-    def sanitize(self, nuc_map: NuclearDataMap):
+    def sanitize(self, nuc_map: NuclearDataMap | MassTable):
         """Convert inverse kinematics to normal kinematics
 
         If the configuration is already in normal kinematics,
@@ -79,7 +81,7 @@ class Config:
 
         Parameters
         ----------
-        nuc_map: spyral_utils.nuclear.NuclearDataMap
+        nuc_map: spyral_utils.nuclear.NuclearDataMap | hieroglyph.nuclear.MassTable
             The map of nucleus masses
         """
         if self.target.a < self.projectile.a:
@@ -113,12 +115,28 @@ def deserialize_config(path: Path) -> Config:
     Config
         The parsed configuration
     """
-    config = Config()
     with open(path, "r") as input_path:
         json_data = load(input_path)
-        for key in config.__dict__.keys():
-            if isinstance(config.__dict__[key], NucleusParameters):
-                config.__dict__[key] = NucleusParameters(**json_data[key])
-            else:
-                config.__dict__[key] = json_data[key]
+    return config_from_dict(json_data)
+
+
+def config_from_dict(json_data: dict[str, Any]) -> Config:
+    """Build a configuration from its JSON data
+
+    Parameters
+    ----------
+    json_data: dict[str, Any]
+        The fields of the configuration, as in its JSON file
+
+    Returns
+    -------
+    Config
+        The configuration
+    """
+    config = Config()
+    for key in config.__dict__.keys():
+        if isinstance(config.__dict__[key], NucleusParameters):
+            config.__dict__[key] = NucleusParameters(**json_data[key])
+        else:
+            config.__dict__[key] = json_data[key]
     return config
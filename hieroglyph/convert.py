@@ -30,3 +30,31 @@ def convert_to_target_ke(
 
     target_as_proj = target_vec.boostCM_of(proj_vec)
     return target_as_proj.E - target_as_proj.M
+
+
+def convert_to_target_ke_array(
+    KE_proj: np.ndarray, projectile: NucleusData, target: NucleusData
+) -> np.ndarray:
+    """Convert many beam energies from inverse kinematics to normal at once
+
+    In the frame where the projectile is at rest, the target moves with the Lorentz
+    factor the projectile had in the lab, gamma = 1 + KE_proj / m_proj. The target
+    kinetic energy is then (gamma - 1) * m_target, so the conversion is the closed form
+    KE_target = KE_proj * m_target / m_proj, with no boosts needed. This agrees with
+    convert_to_target_ke to round-off.
+
+    Parameters
+    ----------
+    KE_proj: numpy.ndarray
+        The projectile kinetic energies in MeV
+    projectile: spyral.nuclear.NucleusData
+        The projectile data
+    target: spyral.nuclear.NucleusData
+        The target data
+
+    Returns
+    -------
+    numpy.ndarray
+        The target kinetic energies in the frame where the projectile is at rest
+    """
+    return np.asarray(KE_proj, dtype=np.float64) * (target.mass / projectile.mass)
@@ -1,17 +1,65 @@
 from pathlib import Path
-from spyral_utils.nuclear import NuclearDataMap, NucleusData
+from spyral_utils.nuclear import NucleusData
 from fractions import Fraction
-from io import TextIOWrapper
+from hashlib import sha256
+from io import StringIO
+from typing import TextIO
+import os
+import warnings
 
-from .potentials import create_parameters
+from .potentials import (
+    PotentialParameters,
+    POTENTIAL_VALIDITY,
+    create_parameters,
+    find_out_of_range,
+)
 from .config import Config, deserialize_config
+from .nuclear import MassTable, get_mass_table
+
+# What happened to an input when it was (re)generated
+CREATED = "created"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+
+def create_channel_parameters(
+    E: float, zt: int, at: int, potential: str
+) -> PotentialParameters:
+    """Create the optical model parameters of a channel
+
+    Warns (UserWarning) if the potential is being extrapolated outside of its range of
+    validity
+
+    Parameters
+    ----------
+    E: float
+        The normal kinematics beam energy in MeV
+    zt: int
+        The target Z
+    at: int
+        The target A
+    potential: str
+        The potential keyword
+
+    Returns
+    -------
+    PotentialParameters
+        The optical model parameters
+    """
+    if find_out_of_range(E, zt, at, potential):
+        # The point is left out of the message, so that a sweep reports each
+        # potential once rather than once per input
+        warnings.warn(
+            f"Potential {potential} is being used outside of its range of validity {POTENTIAL_VALIDITY[potential]}"
+        )
+    return create_parameters(E, zt, at, potential)
 
 
 def create_elastic_scattering_input(
     config: Config,
     target: NucleusData,
     projectile: NucleusData,
-    output: TextIOWrapper,
+    output: TextIO,
 ):
     """Generate a PTOLEMY input for elastic scattering reactions
 
@@ -23,10 +71,10 @@ def create_elastic_scattering_input(
         The target nucleus
     projectile: spyral_utils.nuclear.NucleusData
         The projectile nucleus
-    output: TextIOWrapper
+    output: TextIO
         The handle to the file to be written to
     """
-    potential = create_parameters(
+    potential = create_channel_parameters(
         config.projectile_energy,
         config.target.z,
         config.target.a,
@@ -52,7 +100,7 @@ def create_inelastic_scattering_input(
     config: Config,
     target: NucleusData,
     projectile: NucleusData,
-    output: TextIOWrapper,
+    output: TextIO,
 ):
     """Generate a PTOLEMY input for inelastic scattering reactions
 
@@ -64,16 +112,16 @@ def create_inelastic_scattering_input(
         The target nucleus
     projectile: spyral_utils.nuclear.NucleusData
         The projectile nucleus
-    output: TextIOWrapper
+    output: TextIO
         The handle to the file to be written to
     """
-    potential_in = create_parameters(
+    potential_in = create_channel_parameters(
         config.projectile_energy,
         config.target.z,
         config.target.a,
         potential=config.incoming_potential,
     )
-    potential_out = create_parameters(
+    potential_out = create_channel_parameters(
         config.projectile_energy - config.residual.excitation,
         config.target.z,
         config.target.a,
@@ -108,7 +156,7 @@ def create_transfer_input(
     projectile: NucleusData,
     ejectile: NucleusData,
     residual: NucleusData,
-    output: TextIOWrapper,
+    output: TextIO,
 ):
     """Generate a PTOLEMY input for transfer reactions
 
@@ -124,7 +172,7 @@ def create_transfer_input(
         The ejectile nucleus
     residual: spyral_utils.nuclear.NucleusData
         The residual nucleus
-    output: TextIOWrapper
+    output: TextIO
         The handle to the file to be written to
     """
     Q = (
@@ -132,13 +180,13 @@ def create_transfer_input(
         + projectile.mass
         - (ejectile.mass + residual.mass + config.residual.excitation)
     )
-    potential_in = create_parameters(
+    potential_in = create_channel_parameters(
         config.projectile_energy,
         config.target.z,
         config.target.a,
         potential=config.incoming_potential,
     )
-    potential_out = create_parameters(
+    potential_out = create_channel_parameters(
         config.projectile_energy + Q,
         config.residual.z,
         config.residual.a,
@@ -204,48 +252,208 @@ def create_transfer_input(
     output.write("RETURN\n")
 
 
-def create_input(path: Path):
-    """From a hieroglyph JSON file, create a PTOLEMY input file
+def write_input(config: Config, nuc_map: MassTable, output: TextIO):
+    """Write the PTOLEMY input for a configuration in normal kinematics
 
     Auto-detects whether the configuration is for elastic,
     inelastic, or transfer and calls the appropriate
     function.
 
+    Parameters
+    ----------
+    config: Config
+        The hieroglyph configuration, already sanitized
+    nuc_map: hieroglyph.nuclear.MassTable
+        The map of nucleus masses
+    output: TextIO
+        The handle to the file to be written to
+    """
+    target = nuc_map.get_data(config.target.z, config.target.a)
+    projectile = nuc_map.get_data(config.projectile.z, config.projectile.a)
+    ejectile = nuc_map.get_data(config.ejectile.z, config.ejectile.a)
+    residual = nuc_map.get_data(config.residual.z, config.residual.a)
+
+    if projectile.Z == ejectile.Z and projectile.A == ejectile.A:
+        # Check both case of normal and inverse kinematic inelastic
+        if config.residual.excitation == 0.0:
+            create_elastic_scattering_input(config, target, projectile, output)
+        else:
+            create_inelastic_scattering_input(config, target, projectile, output)
+    else:
+        if projectile.A - ejectile.A > 1:
+            raise Exception("Currently only support single-nucleon transfer!")
+        elif projectile.A == ejectile.A:
+            raise Exception("Currently do not support p/n exchange!")
+
+        create_transfer_input(config, target, projectile, ejectile, residual, output)
+
+
+def render_input(config: Config, nuc_map: MassTable) -> str:
+    """Render the PTOLEMY input for a configuration in normal kinematics to a string
+
+    Parameters
+    ----------
+    config: Config
+        The hieroglyph configuration, already sanitized
+    nuc_map: hieroglyph.nuclear.MassTable
+        The map of nucleus masses
+
+    Returns
+    -------
+    str
+        The text of the PTOLEMY input
+    """
+    output = StringIO()
+    write_input(config, nuc_map, output)
+    return output.getvalue()
+
+
+def bundle_inputs(inputs: list[tuple[str, str]]) -> str:
+    """Pack several rendered PTOLEMY inputs into one, so PTOLEMY only starts once
+
+    Each reaction is tagged with a comment, every reaction after the first starts
+    with a reset so nothing carries over from the one before, and the single RETURN
+    comes at the very end. PTOLEMY writes the results of the reactions in order.
+
+    Parameters
+    ----------
+    inputs: list[tuple[str, str]]
+        The tag and the text (from render_input) of each reaction
+
+    Returns
+    -------
+    str
+        The text of the combined PTOLEMY input
+    """
+    output = StringIO()
+    for idx, (tag, text) in enumerate(inputs):
+        if idx > 0:
+            output.write("reset\n")
+        output.write(f"$ {tag}\n")
+        output.write(text.removesuffix("RETURN\n"))
+    output.write("RETURN\n")
+    return output.getvalue()
+
+
+def unbundle_input(text: str) -> list[str]:
+    """Split a PTOLEMY input made by bundle_inputs back into its reactions
+
+    The tags are dropped and each reaction gets its own RETURN, so the text of each
+    reaction is the same as that from render_input. An input which is not a bundle
+    comes back whole.
+
+    Parameters
+    ----------
+    text: str
+        The text of the PTOLEMY input
+
+    Returns
+    -------
+    list[str]
+        The text of each reaction, in order
+    """
+    reactions = [[]]
+    for line in text.splitlines(keepends=True):
+        if line == "reset\n":
+            reactions.append([])
+        else:
+            reactions[-1].append(line)
+    if len(reactions) == 1:
+        return [text]
+    texts = []
+    for lines in reactions:
+        if len(lines) > 0 and lines[0].startswith("$ "):
+            lines = lines[1:]
+        texts.append("".join(lines).removesuffix("RETURN\n") + "RETURN\n")
+    return texts
+
+
+def hash_input(text: str) -> str:
+    """Hash the text of a PTOLEMY input
+
+    Parameters
+    ----------
+    text: str
+        The text of the input
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest of the text
+    """
+    return sha256(text.encode()).hexdigest()
+
+
+def write_input_if_changed(
+    ptolemy_path: Path, text: str, recorded_hash: str | None = None
+) -> str:
+    """Write a PTOLEMY input, unless the file already holds exactly this text
+
+    An input which is left alone keeps its modification time, so anything downstream
+    which goes by modification times (make, a job scheduler) does not rerun it.
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        The path of the input
+    text: str
+        The text of the input
+    recorded_hash: str | None
+        The hash (see hash_input) of the file's contents if it is already known, from
+        a manifest say, so the file does not need to be read. The caller must be sure
+        the file has not changed since
+
+    Returns
+    -------
+    str
+        CREATED if there was no file, CHANGED if the file was rewritten, and UNCHANGED
+        if it was left alone
+    """
+    ptolemy_path = Path(ptolemy_path)
+    if recorded_hash is not None and recorded_hash == hash_input(text):
+        return UNCHANGED
+    try:
+        with open(ptolemy_path, "r") as ptolemy_config:
+            if ptolemy_config.read() == text:
+                return UNCHANGED
+        status = CHANGED
+    except FileNotFoundError:
+        status = CREATED
+    # Write to a temporary file and move it in place, so the input is never half written
+    temp_path = ptolemy_path.with_name(f"{ptolemy_path.name}.{os.getpid()}.partial")
+    with open(temp_path, "w") as ptolemy_config:
+        ptolemy_config.write(text)
+    os.replace(temp_path, ptolemy_path)
+    return status
+
+
+def create_input(path: Path) -> str:
+    """From a hieroglyph JSON file, create a PTOLEMY input file
+
+    Auto-detects whether the configuration is for elastic,
+    inelastic, or transfer and calls the appropriate
+    function. The input is rendered in memory first, so a
+    configuration which fails leaves no partial file behind,
+    and an input which already exists with the same text is
+    not rewritten.
+
     Parameters
     ----------
     path: Path
         The path to the JSON configuration file
+
+    Returns
+    -------
+    str
+        Whether the input was CREATED, CHANGED, or UNCHANGED
     """
     if not path.exists():
         raise Exception(f"Configuration path {path} does not exist!")
 
-    nuc_map = NuclearDataMap()
+    nuc_map = get_mass_table()
     config = deserialize_config(path)
     config.sanitize(nuc_map)
 
-    target = nuc_map.get_data(config.target.z, config.target.a)
-    projectile = nuc_map.get_data(config.projectile.z, config.projectile.a)
-    ejectile = nuc_map.get_data(config.ejectile.z, config.ejectile.a)
-    residual = nuc_map.get_data(config.residual.z, config.residual.a)
-    ptolemy_path = Path(config.ptolemy_config_path)
-
-    with open(ptolemy_path, "w") as ptolemy_config:
-        if projectile.Z == ejectile.Z and projectile.A == ejectile.A:
-            # Check both case of normal and inverse kinematic inelastic
-            if config.residual.excitation == 0.0:
-                create_elastic_scattering_input(
-                    config, target, projectile, ptolemy_config
-                )
-            else:
-                create_inelastic_scattering_input(
-                    config, target, projectile, ptolemy_config
-                )
-        else:
-            if projectile.A - ejectile.A > 1:
-                raise Exception("Currently only support single-nucleon transfer!")
-            elif projectile.A == ejectile.A:
-                raise Exception("Currently do not support p/n exchange!")
-
-            create_transfer_input(
-                config, target, projectile, ejectile, residual, ptolemy_config
-            )
+    return write_input_if_changed(
+        Path(config.ptolemy_config_path), render_input(config, nuc_map)
+    )
@@ -0,0 +1,163 @@
+from pathlib import Path
+from typing import Callable, Iterator, TextIO
+import time
+import numpy as np
+
+from .parse import (
+    DWBA,
+    ELASTIC_CS_FOOTER_ALT,
+    DWBA_CS_FOOTER_ALT,
+    iter_elastic_tables,
+    iter_dwba_tables,
+    parse_elastic_table,
+    parse_dwba_table,
+)
+from .result import NpyAppender
+
+# How long to wait between checks for new output (seconds)
+FOLLOW_POLL_INTERVAL = 0.5
+
+
+def follow_lines(
+    pt_file: TextIO,
+    idle_timeout: float,
+    poll_interval: float = FOLLOW_POLL_INTERVAL,
+    stop_keyline: str | None = None,
+) -> Iterator[str]:
+    """Lazily yield the lines of a file which is still being written
+
+    Like tail -f, waits for more lines at the end of the file. Only complete lines are
+    given back. Stops right after a line starting with stop_keyline, or once the file
+    has not grown for idle_timeout seconds.
+
+    Parameters
+    ----------
+    pt_file: TextIO
+        The open file
+    idle_timeout: float
+        Seconds without new output after which the file is considered finished
+    poll_interval: float
+        Seconds to wait between checks for new output
+    stop_keyline: str | None
+        The keyline of the last line of the file. None only stops on idle_timeout
+        (default None)
+
+    Yields
+    ------
+    str
+        The lines of the file
+    """
+    partial = ""
+    last_growth = time.monotonic()
+    while True:
+        line = pt_file.readline()
+        if line == "":
+            if time.monotonic() - last_growth > idle_timeout:
+                break
+            time.sleep(poll_interval)
+            continue
+        last_growth = time.monotonic()
+        partial += line
+        if partial.endswith("\n"):
+            yield partial
+            if stop_keyline is not None and partial.startswith(stop_keyline):
+                return
+            partial = ""
+    if partial != "":
+        yield partial
+
+
+def follow_output(
+    ptolemy_path: Path,
+    parsed_path: Path,
+    kind: str,
+    idle_timeout: float,
+    on_block: Callable[[int], None] | None = None,
+) -> tuple[int, bool]:
+    """Parse a PTOLEMY output while it is still being written
+
+    Each cross section block is parsed as soon as its footer appears and its rows are
+    appended to a directory of .npy files (the npy output format), which can be loaded
+    at any time while the calculation is running. Nothing is ever parsed twice. The
+    calculation is finished by its total cross section line, after which nothing more
+    is read; idle_timeout only ends calculations which never write it.
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+    parsed_path: Path
+        Path to the directory the parsed data will be written to
+    kind: str
+        The kind of calculation (ELASTIC or DWBA)
+    idle_timeout: float
+        Seconds without new output after which the calculation is considered finished
+    on_block: Callable[[int], None] | None
+        Called with the total number of rows written after each block
+
+    Returns
+    -------
+    tuple[int, bool]
+        The total number of rows written, and whether the total cross section line
+        was found (False if the output went idle first)
+    """
+    parsed_path = Path(parsed_path)
+    parsed_path.mkdir(parents=True, exist_ok=True)
+    appenders: dict[str, NpyAppender] = {}
+    l_values = None
+    n_rows = 0
+    footer = DWBA_CS_FOOTER_ALT if kind == DWBA else ELASTIC_CS_FOOTER_ALT
+    finished = False
+
+    with open(ptolemy_path, "r") as pt_file:
+
+        def watch(lines: Iterator[str]) -> Iterator[str]:
+            nonlocal finished
+            for line in lines:
+                finished = line.startswith(footer)
+                yield line
+
+        lines = watch(
+            follow_lines(
+                pt_file, idle_timeout, FOLLOW_POLL_INTERVAL, stop_keyline=footer
+            )
+        )
+        if kind == DWBA:
+            tables = (
+                (layout, parse_dwba_table(table, layout))
+                for layout, table in iter_dwba_tables(lines)
+            )
+        else:
+            tables = (
+                (None, parse_elastic_table(table))
+                for table in iter_elastic_tables(lines)
+            )
+        try:
+            for layout, rows in tables:
+                if len(appenders) == 0:
+                    appenders["angle"] = NpyAppender(parsed_path / "angle.npy")
+                    appenders["cross"] = NpyAppender(parsed_path / "cross.npy")
+                    if layout is not None:
+                        l_values = layout.l_values
+                        appenders["cross_ls"] = NpyAppender(
+                            parsed_path / "cross_ls.npy", len(l_values)
+                        )
+                        np.save(
+                            parsed_path / "l_values.npy",
+                            np.array(l_values, dtype=np.int64),
+                        )
+                elif layout is not None and layout.l_values != l_values:
+                    raise Exception(
+                        f"Found DWBA tables with different lxs ({l_values} and {layout.l_values})! Parse each reaction separately using hieroglyph.index"
+                    )
+                appenders["angle"].append(rows[:, 0])
+                appenders["cross"].append(rows[:, 1])
+                if "cross_ls" in appenders:
+                    appenders["cross_ls"].append(rows[:, 2:])
+                n_rows += len(rows)
+                if on_block is not None:
+                    on_block(n_rows)
+        finally:
+            for appender in appenders.values():
+                appender.close()
+    return n_rows, finished
@@ -0,0 +1,467 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Iterable, Iterator
+from json import load, dump
+
+from .parse import (
+    ELASTIC,
+    DWBA,
+    UNKNOWN,
+    ELASTIC_CS_HEADER,
+    ELASTIC_CS_FOOTER_ALT,
+    DWBA_CS_HEADER,
+    DWBA_CS_FOOTER_ALT,
+    DWBA_HEADER_LINES,
+    DWBALayout,
+    collect_elastic_result,
+    collect_dwba_result,
+    is_dwba_total_continuation,
+    parse_dwba_layout,
+)
+from .result import CrossSectionResult
+
+# Bump whenever the layout of the index file changes
+INDEX_VERSION = 2
+
+# The keylines we scan for
+CS_HEADERS = {
+    ELASTIC: ELASTIC_CS_HEADER,
+    DWBA: DWBA_CS_HEADER,
+}
+CS_HEADER_KEYLINES = tuple(CS_HEADERS.values())
+CS_FOOTERS_ALT = {
+    ELASTIC: ELASTIC_CS_FOOTER_ALT,
+    DWBA: DWBA_CS_FOOTER_ALT,
+}
+
+
+@dataclass
+class ReactionEntry:
+    """The location of one calculation within a PTOLEMY output
+
+    A calculation is a run of cross section blocks of the same kind, finished by the
+    total cross section line (and, for DWBA, the lines of Lx totals continuing it).
+
+    Attributes
+    ----------
+    kind: str
+        The kind of calculation (ELASTIC or DWBA)
+    start: int
+        The byte offset of the first cross section block header
+    end: int
+        The byte offset just past the end of the calculation's cross section
+    blocks: list[int]
+        The byte offsets of the header of each cross section block
+    """
+
+    kind: str = ELASTIC
+    start: int = 0
+    end: int = 0
+    blocks: list[int] = field(default_factory=list)
+
+
+@dataclass
+class ReactionSplitter:
+    """Find the calculations of a PTOLEMY output, one line at a time
+
+    The state machine shared by build_index and iter_reactions. A calculation starts
+    at the header of its first cross section block and ends with its total cross
+    section line. For DWBA calculations whose Lx's are broken over several lines, the
+    totals of the remaining Lx's follow the total line, and belong to the calculation
+    too (see hieroglyph.parse.parse_dwba_totals).
+
+    Attributes
+    ----------
+    kind: str
+        The kind of the current calculation, UNKNOWN between calculations
+    header: list[str] | None
+        The lines of the current DWBA block header, while its Lx layout is read
+    layout: DWBALayout | None
+        The Lx layout of the last DWBA block
+    continuations: list[int]
+        The number of Lx's of each total continuation line still expected
+
+    Methods
+    -------
+    feed(line)
+        Place the next line of the output
+    """
+
+    kind: str = UNKNOWN
+    header: list[str] | None = None
+    layout: DWBALayout | None = None
+    continuations: list[int] = field(default_factory=list)
+
+    def feed(self, line: str) -> tuple[str, bool, bool, bool]:
+        """Place the next line of the output
+
+        Parameters
+        ----------
+        line: str
+            The line
+
+        Returns
+        -------
+        tuple[str, bool, bool, bool]
+            The kind of the calculation the line belongs to (UNKNOWN if none), and
+            whether the line starts a new calculation, is the header of a cross
+            section block, and is the last line of its calculation
+        """
+        if self.continuations:
+            if is_dwba_total_continuation(line, self.continuations[0]):
+                self.continuations.pop(0)
+                if self.continuations:
+                    return self.kind, False, False, False
+                kind = self.kind
+                self.kind = UNKNOWN
+                return kind, False, False, True
+            self.kind = UNKNOWN
+            self.continuations = []
+
+        if line.startswith(CS_HEADER_KEYLINES):
+            kind = DWBA if line.startswith(CS_HEADERS[DWBA]) else ELASTIC
+            starts = kind != self.kind
+            self.kind = kind
+            self.header = [line] if kind == DWBA else None
+            return kind, starts, True, False
+        if self.kind == UNKNOWN:
+            return UNKNOWN, False, False, False
+
+        if self.header is not None:
+            self.header.append(line)
+            # The Lx lines of the header end at the first empty line
+            if len(self.header) > DWBA_HEADER_LINES and len(line.split()) == 0:
+                self.layout = parse_dwba_layout(self.header)
+                self.header = None
+        if line.startswith(CS_FOOTERS_ALT[self.kind]):
+            kind = self.kind
+            if kind == DWBA and self.layout is not None:
+                self.continuations = list(self.layout.lxs_per_row[1:])
+            if self.continuations:
+                return kind, False, False, False
+            self.kind = UNKNOWN
+            return kind, False, False, True
+        return self.kind, False, False, False
+
+
+@dataclass
+class OutputIndex:
+    """An index of the calculations within a PTOLEMY output
+
+    Attributes
+    ----------
+    size: int
+        The size of the indexed output in bytes
+    mtime_ns: int
+        The modification time of the indexed output
+    reactions: list[ReactionEntry]
+        The calculations found in the output, in the order they appear
+    """
+
+    size: int = 0
+    mtime_ns: int = 0
+    reactions: list[ReactionEntry] = field(default_factory=list)
+
+
+def get_index_path(ptolemy_path: Path) -> Path:
+    """Get the path of the index file kept next to a PTOLEMY output
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+
+    Returns
+    -------
+    Path
+        Path to the index file
+    """
+    return ptolemy_path.with_name(f"{ptolemy_path.name}.index.json")
+
+
+def build_index(ptolemy_path: Path) -> OutputIndex:
+    """Scan a PTOLEMY output once and record where each calculation lives
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+
+    Returns
+    -------
+    OutputIndex
+        The index of the output
+    """
+    stat = ptolemy_path.stat()
+    index = OutputIndex(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    splitter = ReactionSplitter()
+    current: ReactionEntry | None = None
+    offset = 0
+    with open(ptolemy_path, "rb") as pt_file:
+        for line in pt_file:
+            # PTOLEMY writes ASCII, and latin-1 decodes any byte as one character
+            kind, starts, block, _ = splitter.feed(line.decode("latin-1"))
+            if starts:
+                current = ReactionEntry(kind=kind, start=offset)
+                index.reactions.append(current)
+            offset += len(line)
+            if kind != UNKNOWN and current is not None:
+                if block:
+                    current.blocks.append(offset - len(line))
+                current.end = offset
+    return index
+
+
+def write_index(index: OutputIndex, index_path: Path) -> None:
+    """Write an index to a JSON file
+
+    Parameters
+    ----------
+    index: OutputIndex
+        The index
+    index_path: Path
+        Path to which the index will be written
+    """
+    with open(index_path, "w") as index_file:
+        dump({"version": INDEX_VERSION, **asdict(index)}, index_file)
+
+
+def read_index(index_path: Path) -> OutputIndex:
+    """Read an index from a JSON file
+
+    Parameters
+    ----------
+    index_path: Path
+        Path to the index file
+
+    Returns
+    -------
+    OutputIndex
+        The index
+    """
+    with open(index_path, "r") as index_file:
+        json_data = load(index_file)
+    if json_data.get("version") != INDEX_VERSION:
+        raise Exception(f"Index {index_path} has an unsupported version!")
+    return OutputIndex(
+        size=json_data["size"],
+        mtime_ns=json_data["mtime_ns"],
+        reactions=[ReactionEntry(**entry) for entry in json_data["reactions"]],
+    )
+
+
+def get_index(ptolemy_path: Path) -> OutputIndex:
+    """Get the index of a PTOLEMY output, building it only if needed
+
+    The index is kept next to the output and is rebuilt whenever the output has
+    changed since it was made. If the index cannot be written (e.g. a read-only
+    archive) it is simply rebuilt every time.
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+
+    Returns
+    -------
+    OutputIndex
+        The index of the output
+    """
+    ptolemy_path = Path(ptolemy_path)
+    index_path = get_index_path(ptolemy_path)
+    stat = ptolemy_path.stat()
+    if index_path.exists():
+        try:
+            index = read_index(index_path)
+            if index.size == stat.st_size and index.mtime_ns == stat.st_mtime_ns:
+                return index
+        except Exception:
+            pass
+    index = build_index(ptolemy_path)
+    try:
+        write_index(index, index_path)
+    except OSError:
+        pass
+    return index
+
+
+def get_reaction(index: OutputIndex, kind: str, number: int) -> ReactionEntry:
+    """Get the entry of a calculation from an index
+
+    Parameters
+    ----------
+    index: OutputIndex
+        The index of the output
+    kind: str
+        The kind of calculation (ELASTIC or DWBA)
+    number: int
+        The position of the calculation among those of the same kind (starting from 0)
+
+    Returns
+    -------
+    ReactionEntry
+        The entry of the calculation
+    """
+    entries = [entry for entry in index.reactions if entry.kind == kind]
+    if number < 0 or number >= len(entries):
+        raise Exception(
+            f"Requested {kind} calculation {number}, but the output only has {len(entries)}!"
+        )
+    return entries[number]
+
+
+def iter_lines_between(ptolemy_path: Path, start: int, end: int) -> Iterator[str]:
+    """Lazily yield the lines of a PTOLEMY output within a range of bytes
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+    start: int
+        The byte offset of the first line
+    end: int
+        The byte offset at which to stop
+
+    Yields
+    ------
+    str
+        The lines of the range
+    """
+    with open(ptolemy_path, "rb") as pt_file:
+        pt_file.seek(start)
+        offset = start
+        for line in pt_file:
+            if offset >= end:
+                break
+            offset += len(line)
+            # Decoded as in build_index, so any byte the index was built over reads
+            yield line.decode("latin-1")
+
+
+def read_reaction(
+    ptolemy_path: Path, entry: ReactionEntry, extras: bool = False
+) -> CrossSectionResult:
+    """Parse a single calculation of a PTOLEMY output
+
+    Seeks straight to the calculation, so nothing else in the file is read.
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+    entry: ReactionEntry
+        The index entry of the calculation
+    extras: bool
+        If True, also collect the extra tables of the calculation (default False)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed calculation
+    """
+    lines = iter_lines_between(ptolemy_path, entry.start, entry.end)
+    if entry.kind == DWBA:
+        return collect_dwba_result(lines, verbose=False, extras=extras)
+    return collect_elastic_result(lines, extras)
+
+
+def iter_reactions(lines: Iterable[str]) -> Iterator[tuple[str, list[str]]]:
+    """Split the lines of a PTOLEMY output into its calculations, as they arrive
+
+    The same splitting as build_index, for outputs which are not files (a pipe, say).
+    Only the lines of one calculation are held at a time.
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+
+    Yields
+    ------
+    tuple[str, list[str]]
+        The kind of each calculation (ELASTIC or DWBA) and its lines, from the header
+        of its first cross section block to its total cross section line and any
+        lines of Lx totals continuing it
+    """
+    splitter = ReactionSplitter()
+    kind = UNKNOWN
+    current: list[str] = []
+    for line in lines:
+        line_kind, starts, _, last = splitter.feed(line)
+        if (starts or line_kind == UNKNOWN) and len(current) > 0:
+            yield kind, current
+            current = []
+        if line_kind == UNKNOWN:
+            continue
+        kind = line_kind
+        current.append(line)
+        if last:
+            yield kind, current
+            current = []
+    # Ran out of lines in the middle of a calculation
+    if len(current) > 0:
+        yield kind, current
+
+
+def read_reactions(
+    lines: Iterable[str], extras: bool = False
+) -> list[tuple[str, CrossSectionResult]]:
+    """Parse every calculation of a PTOLEMY output from its lines, as they arrive
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+    extras: bool
+        If True, also collect the extra tables of each calculation (default False)
+
+    Returns
+    -------
+    list[tuple[str, CrossSectionResult]]
+        The kind and result of each calculation, in the order they appear
+    """
+    reactions = []
+    for kind, reaction_lines in iter_reactions(lines):
+        if kind == DWBA:
+            result = collect_dwba_result(reaction_lines, verbose=False, extras=extras)
+        else:
+            result = collect_elastic_result(reaction_lines, extras)
+        reactions.append((kind, result))
+    return reactions
+
+
+def _read_reaction_task(task: tuple[Path, ReactionEntry]) -> CrossSectionResult:
+    return read_reaction(*task)
+
+
+def read_all_reactions(
+    ptolemy_path: Path, kind: str | None = None, n_workers: int | None = None
+) -> list[CrossSectionResult]:
+    """Parse every calculation of a PTOLEMY output across a pool of worker processes
+
+    Parameters
+    ----------
+    ptolemy_path: Path
+        Path to the PTOLEMY output
+    kind: str | None
+        Only parse calculations of this kind (ELASTIC or DWBA). None parses all of them
+    n_workers: int | None
+        The number of worker processes. None uses one per CPU, 1 parses in this process
+
+    Returns
+    -------
+    list[CrossSectionResult]
+        The result of each calculation, in the order they appear in the output
+    """
+    ptolemy_path = Path(ptolemy_path)
+    index = get_index(ptolemy_path)
+    tasks = [
+        (ptolemy_path, entry)
+        for entry in index.reactions
+        if kind is None or entry.kind == kind
+    ]
+    if n_workers == 1:
+        return [_read_reaction_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(_read_reaction_task, tasks))
@@ -0,0 +1,142 @@
+import numpy as np
+
+# The kinematics of a reaction A(a, b)B in normal kinematics, one record per reaction.
+# Energies are in MeV, angles in degrees
+KINEMATICS_DTYPE = np.dtype(
+    [
+        ("projectile_energy", np.float64),
+        ("q_value", np.float64),
+        ("threshold", np.float64),
+        ("incoming_cm_energy", np.float64),
+        ("outgoing_energy", np.float64),
+        ("outgoing_cm_energy", np.float64),
+        ("max_angle", np.float64),
+        ("allowed", np.bool_),
+    ]
+)
+
+
+def compute_kinematics(
+    target_mass: np.ndarray,
+    projectile_mass: np.ndarray,
+    ejectile_mass: np.ndarray,
+    residual_mass: np.ndarray,
+    projectile_energy: np.ndarray,
+    excitation: np.ndarray,
+) -> np.ndarray:
+    """Compute the kinematics of many two-body reactions at once
+
+    Every argument is an array (or a scalar), all broadcast together, so a whole sweep
+    is computed in a handful of numpy operations. The kinematics are relativistic:
+
+    - the Q-value is Q = m_A + m_a - m_b - (m_B + Ex)
+    - the threshold is the beam energy at which the outgoing channel opens,
+      ((m_b + m_B + Ex)^2 - (m_A + m_a)^2) / (2 m_A), and 0 for Q >= 0
+    - the incoming (outgoing) center of mass energy is the kinetic energy of the
+      incoming (outgoing) channel in the center of mass frame
+    - the outgoing energy is E + Q, the energy create uses for the outgoing potential
+    - the maximum lab angle of the ejectile is given by sin(theta_max) = p* / (m_b
+      gamma beta), where p* is the ejectile's center of mass momentum and beta is the
+      velocity of the center of mass. It is 180 degrees when the ejectile is faster
+      than the center of mass
+
+    A reaction is allowed when all of its masses are known, the beam energy is positive
+    and above threshold, and the outgoing energy is positive. The kinematic quantities
+    of reactions which are not allowed can be NaN.
+
+    Parameters
+    ----------
+    target_mass: numpy.ndarray
+        The target masses in MeV
+    projectile_mass: numpy.ndarray
+        The projectile masses in MeV
+    ejectile_mass: numpy.ndarray
+        The ejectile masses in MeV
+    residual_mass: numpy.ndarray
+        The residual masses (ground state) in MeV
+    projectile_energy: numpy.ndarray
+        The beam kinetic energies in MeV
+    excitation: numpy.ndarray
+        The excitation energies of the residual in MeV
+
+    Returns
+    -------
+    numpy.ndarray
+        The kinematics of each reaction, a structured array of KINEMATICS_DTYPE
+    """
+    m_target, m_projectile, m_ejectile, m_residual, energy, excitation = (
+        np.broadcast_arrays(
+            *(
+                np.asarray(value, dtype=np.float64)
+                for value in (
+                    target_mass,
+                    projectile_mass,
+                    ejectile_mass,
+                    residual_mass,
+                    projectile_energy,
+                    excitation,
+                )
+            )
+        )
+    )
+    m_residual = m_residual + excitation
+    m_in = m_target + m_projectile
+    m_out = m_ejectile + m_residual
+
+    kinematics = np.empty(energy.shape, dtype=KINEMATICS_DTYPE)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        q_value = m_in - m_out
+        s = m_in**2 + 2.0 * m_target * energy
+        sqrt_s = np.sqrt(s)
+        # Squared momentum of the outgoing pair in the center of mass frame
+        p_star_sq = (s - m_out**2) * (s - (m_ejectile - m_residual) ** 2) / (4.0 * s)
+        p_star = np.sqrt(np.where(p_star_sq >= 0.0, p_star_sq, np.nan))
+        p_beam = np.sqrt(energy * (energy + 2.0 * m_projectile))
+        total_energy = energy + m_in
+        beta = p_beam / total_energy
+        gamma = total_energy / sqrt_s
+        sin_max = p_star / (m_ejectile * gamma * beta)
+
+        kinematics["projectile_energy"] = energy
+        kinematics["q_value"] = q_value
+        kinematics["threshold"] = np.maximum(
+            (m_out**2 - m_in**2) / (2.0 * m_target), 0.0
+        )
+        kinematics["incoming_cm_energy"] = sqrt_s - m_in
+        kinematics["outgoing_energy"] = energy + q_value
+        kinematics["outgoing_cm_energy"] = sqrt_s - m_out
+        kinematics["max_angle"] = np.where(
+            sin_max >= 1.0, 180.0, np.degrees(np.arcsin(np.minimum(sin_max, 1.0)))
+        )
+        kinematics["allowed"] = (
+            np.isfinite(q_value)
+            & (energy > 0.0)
+            & (energy >= kinematics["threshold"])
+            & (kinematics["outgoing_energy"] > 0.0)
+        )
+    return kinematics
+
+
+def describe_forbidden(kinematics: np.void) -> str:
+    """Explain why a reaction is not allowed
+
+    Parameters
+    ----------
+    kinematics: numpy.void
+        The kinematics of the reaction, a record of KINEMATICS_DTYPE
+
+    Returns
+    -------
+    str
+        The reason, empty if the reaction is allowed
+    """
+    energy = float(kinematics["projectile_energy"])
+    if kinematics["allowed"]:
+        return ""
+    elif not np.isfinite(kinematics["q_value"]):
+        return "A nucleus of the reaction is not in the mass table!"
+    elif not energy > 0.0:
+        return f"The beam energy {energy} MeV is not positive!"
+    elif energy < kinematics["threshold"]:
+        return f"The beam energy {energy} MeV is below the reaction threshold of {kinematics['threshold']} MeV!"
+    return f"The outgoing channel energy {kinematics['outgoing_energy']} MeV is not positive!"
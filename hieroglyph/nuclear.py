@@ -0,0 +1,246 @@
+from importlib.metadata import version, PackageNotFoundError
+from pathlib import Path
+import os
+import numpy as np
+from spyral_utils.constants import AMU_2_MEV, ELECTRON_MASS_U
+from spyral_utils.nuclear import NucleusData
+from spyral_utils.nuclear.nuclear_map import DATA_PATH
+
+from .cache import default_cache_dir, hash_key
+
+# Bump whenever the layout of the cached mass table changes
+MASS_TABLE_VERSION = "1"
+
+
+class MassTable:
+    """The AME mass evaluation bundled with spyral_utils, as arrays indexed by (Z, A)
+
+    A drop-in replacement for spyral_utils.nuclear.NuclearDataMap which is quick to
+    load. The atomic masses are kept in a (Z, A) grid (NaN where there is no nucleus)
+    which can be memory-mapped from the cache, rather than a map rebuilt by parsing
+    the text table every time. The NucleusData handed out are identical to those of
+    NuclearDataMap.
+
+    Attributes
+    ----------
+    atomic_mass: numpy.ndarray
+        The atomic mass (amu) of each nucleus, indexed by [Z, A]
+    elements: numpy.ndarray
+        The element symbol of each Z
+
+    Methods
+    -------
+    get_data(z, a)
+        Retrieve the mass data for a given nucleus
+    get_mass_array(z, a)
+        Look up the nuclear masses of many nuclei at once
+    """
+
+    def __init__(self, atomic_mass: np.ndarray, elements: np.ndarray):
+        self.atomic_mass = atomic_mass
+        self.elements = elements
+        self.nuclei: dict[tuple[int, int], NucleusData] = {}
+
+    def get_data(self, z: int, a: int) -> NucleusData:
+        """Retrieve the mass data for a given nucleus
+
+        Parameters
+        ----------
+        z: int
+            The atomic number
+        a: int
+            The mass number
+
+        Returns
+        -------
+        spyral_utils.nuclear.NucleusData
+            The mass data of the nucleus
+        """
+        nucleus = self.nuclei.get((z, a))
+        if nucleus is not None:
+            return nucleus
+        if (
+            z < 0
+            or a < 0
+            or z >= self.atomic_mass.shape[0]
+            or a >= self.atomic_mass.shape[1]
+            or np.isnan(self.atomic_mass[z, a])
+        ):
+            raise Exception(f"Nucleus with Z={z}, A={a} is not in the mass table!")
+        atomic_mass = float(self.atomic_mass[z, a])
+        element = str(self.elements[z])
+        # Same as NuclearDataMap, so the masses agree to the bit
+        nucleus = NucleusData(
+            mass=(atomic_mass - float(z) * ELECTRON_MASS_U) * AMU_2_MEV,
+            atomic_mass=atomic_mass,
+            element_symbol=element,
+            isotopic_symbol=f"{a}{element}",
+            pretty_iso_symbol=f"<sup>{a}</sup>{element}",
+            Z=z,
+            A=a,
+        )
+        self.nuclei[(z, a)] = nucleus
+        return nucleus
+
+    def get_mass_array(self, z: np.ndarray, a: np.ndarray) -> np.ndarray:
+        """Look up the nuclear masses of many nuclei at once
+
+        Parameters
+        ----------
+        z: numpy.ndarray
+            The atomic numbers
+        a: numpy.ndarray
+            The mass numbers
+
+        Returns
+        -------
+        numpy.ndarray
+            The nuclear mass of each nucleus in MeV, the same as get_data(z, a).mass.
+            NaN for nuclei which are not in the table
+        """
+        z, a = np.broadcast_arrays(
+            np.asarray(z, dtype=np.int64), np.asarray(a, dtype=np.int64)
+        )
+        inside = (
+            (z >= 0)
+            & (a >= 0)
+            & (z < self.atomic_mass.shape[0])
+            & (a < self.atomic_mass.shape[1])
+        )
+        atomic_mass = np.full(z.shape, np.nan)
+        atomic_mass[inside] = self.atomic_mass[z[inside], a[inside]]
+        return (atomic_mass - z * ELECTRON_MASS_U) * AMU_2_MEV
+
+
+def read_mass_evaluation(data_path: Path) -> MassTable:
+    """Parse the AME text table bundled with spyral_utils
+
+    Parameters
+    ----------
+    data_path: Path
+        Path to the table
+
+    Returns
+    -------
+    MassTable
+        The parsed table
+    """
+    rows = []
+    with open(data_path, "r") as data_file:
+        data_file.readline()  # Header
+        for line in data_file:
+            entries = line.split()
+            if len(entries) < 4:
+                continue
+            rows.append((int(entries[0]), int(entries[1]), entries[2], entries[3]))
+
+    z_max = max(row[0] for row in rows)
+    a_max = max(row[1] for row in rows)
+    atomic_mass = np.full((z_max + 1, a_max + 1), np.nan)
+    elements = np.full(z_max + 1, "", dtype="<U3")
+    for z, a, element, mass in rows:
+        atomic_mass[z, a] = float(mass)
+        elements[z] = element
+    return MassTable(atomic_mass, elements)
+
+
+def get_mass_table_key(data_path: Path) -> str:
+    """Get the cache key of a mass table
+
+    The key changes whenever the table file or the spyral_utils version changes
+
+    Parameters
+    ----------
+    data_path: Path
+        Path to the table
+
+    Returns
+    -------
+    str
+        The cache key
+    """
+    try:
+        spyral_version = version("spyral-utils")
+    except PackageNotFoundError:
+        spyral_version = "unknown"
+    stat = data_path.stat()
+    return hash_key(
+        str(data_path.resolve()),
+        str(stat.st_size),
+        str(stat.st_mtime_ns),
+        spyral_version,
+        MASS_TABLE_VERSION,
+    )
+
+
+def save_array(array: np.ndarray, path: Path):
+    # Write to a temporary file and move it in place, so readers never see half a file
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.partial")
+    with open(temp_path, "wb") as temp_file:
+        np.save(temp_file, array, allow_pickle=False)
+    os.replace(temp_path, path)
+
+
+def load_mass_table(
+    data_path: Path = DATA_PATH, cache_dir: Path | None = None
+) -> MassTable:
+    """Load the mass table, from the cache if possible
+
+    On the first use the text table is parsed and the arrays are saved to the
+    masses subdirectory of the cache. Afterwards they are memory-mapped straight
+    from there. If the cache can not be written, the table is parsed every time.
+
+    Parameters
+    ----------
+    data_path: Path
+        Path to the AME text table (default the one bundled with spyral_utils)
+    cache_dir: Path | None
+        The cache directory. None uses hieroglyph.cache.default_cache_dir()
+
+    Returns
+    -------
+    MassTable
+        The mass table
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    data_path = Path(data_path)
+    table_dir = Path(cache_dir) / "masses" / get_mass_table_key(data_path)
+    mass_path = table_dir / "atomic_mass.npy"
+    element_path = table_dir / "elements.npy"
+    try:
+        return MassTable(
+            np.load(mass_path, mmap_mode="r"),
+            np.load(element_path, allow_pickle=False),
+        )
+    except (OSError, ValueError):
+        pass
+
+    table = read_mass_evaluation(data_path)
+    try:
+        table_dir.mkdir(parents=True, exist_ok=True)
+        # Elements first, as the atomic masses mark the entry as complete
+        save_array(table.elements, element_path)
+        save_array(table.atomic_mass, mass_path)
+    except OSError:
+        pass
+    return table
+
+
+_mass_table: MassTable | None = None
+
+
+def get_mass_table() -> MassTable:
+    """Get the mass table shared by the whole process
+
+    The table is loaded (see load_mass_table) the first time this is called
+
+    Returns
+    -------
+    MassTable
+        The mass table
+    """
+    global _mass_table
+    if _mass_table is None:
+        _mass_table = load_mass_table()
+    return _mass_table
@@ -1,6 +1,18 @@
 from pathlib import Path
+from dataclasses import dataclass, field
+from hashlib import sha256
+from typing import Iterable, Iterator, Sequence, TextIO
+import gzip
+import os
+import re
 import numpy as np
 
+from .result import CrossSectionResult, write_result, FORMAT_NPZ_COMPRESSED
+from .cache import ResultCache, hash_file, hash_key
+
+# Bump whenever a change to the parsers changes their results, invalidating the cache
+PARSER_VERSION = "1"
+
 # The heinous mess of keylines I use to decide where to parse
 ELASTIC_CS_HEADER = "0    ANGLE          SIGMA/             SIGMA              RUTHERFORD         % PER    % PER"
 ELASTIC_CS_FOOTER = "1                                              P T O L E M Y"
@@ -11,171 +23,899 @@ DWBA_CS_HEADER = "0  C.M.  REACTION     REACTION   LOW L  HIGH L   % FROM"
 DWBA_CS_FOOTER = "1                                                      P T O L E M Y"
 DWBA_CS_FOOTER_ALT = "0TOTAL:"
 
+# Keyword for each kind of PTOLEMY output
+ELASTIC = "elastic"
+DWBA = "dwba"
+UNKNOWN = "unknown"
+
 # Don't even @ me about the LX's
 DWBA_LXS_PER_ROW = 3
 DWBA_HEADER_WORDS_PER_LX = 3
 
+# Lines of each block before the table starts (the Lx lines follow the DWBA header lines)
+ELASTIC_HEADER_LINES = 2
+DWBA_HEADER_LINES = 4
+# Whitespace separated columns of the tables we keep
+ELASTIC_ANGLE_COLUMN = 0
+ELASTIC_CROSS_COLUMN = 3
+DWBA_ANGLE_COLUMN = 0
+DWBA_CROSS_COLUMN = 1
+# Columns before the first Lx on the first line of a DWBA row
+DWBA_LEADING_COLUMNS = 9
+# Whitespace separated columns of the extra tables
+ELASTIC_RATIO_COLUMN = 1
+DWBA_ANALYZING_POWER_COLUMN = 2
+# Lines after the DWBA total line kept, in case the per-L totals are broken over lines
+DWBA_TOTAL_MAX_LINES = 16
 
-def parse_elastic_differential_cross_section(
-    ptolemy_path: Path, parsed_path: Path
-) -> None:
-    """Parse the PTOLEMY output of elastic scattering
+# Fortran number formatting quirks
+FORTRAN_D_EXPONENT = re.compile(r"(?<=[\d.])[dD](?=[+-]?\d)")
+FORTRAN_BARE_EXPONENT = re.compile(r"(\d\.\d*)([+-]\d{3})(?![\d.])")
+FORTRAN_RUN_TOGETHER = re.compile(r"(?<=[\d.])(?=[+-][\d.])")
 
-    Writes the result to a Numpy (.npz) file
-    This is the easy case
+# Number of table rows to allocate room for before growing
+INITIAL_ROW_CAPACITY = 256
+
+
+@dataclass
+class DWBALayout:
+    """The layout of the Lx columns in a DWBA cross section table
+
+    PTOLEMY breaks each row of the DWBA table over several lines once there are
+    more Lx's than fit on one line. The layout records which l-values were found
+    and how many of them are printed on each line of a row.
+
+    Attributes
+    ----------
+    l_values: list[int]
+        The orbital angular momenta of each Lx column
+    lxs_per_row: list[int]
+        The number of Lx values printed on each line of a table row
+    """
+
+    l_values: list[int] = field(default_factory=list)
+    lxs_per_row: list[int] = field(default_factory=list)
+
+    @property
+    def rows_per_line(self) -> int:
+        """The number of printed lines making up one row of the table"""
+        return int(np.ceil(float(sum(self.lxs_per_row)) / float(DWBA_LXS_PER_ROW)))
+
+
+def iter_cross_section_blocks(
+    lines: Iterable[str], header: str, footers: tuple[str, ...]
+) -> Iterator[list[str]]:
+    """Lazily yield each cross section block of a PTOLEMY output
+
+    This is a small state machine over the lines of the output. It either is searching
+    for a block header or is inside of a block collecting lines until a footer is found.
+    Only one block is ever held in memory, so the file can be arbitrarily large.
 
     Parameters
     ----------
-    ptolemy_path: Path
-        Path to the PTOLEMY output
-    parsed_path: Path
-        Path to which the parsed data will be written
+    lines: Iterable[str]
+        The lines of the PTOLEMY output (an open file works)
+    header: str
+        The keyline marking the start of a block
+    footers: tuple[str, ...]
+        The keylines marking the end of a block
+
+    Yields
+    ------
+    list[str]
+        The lines of the block, starting with the header line and excluding the footer
+    """
+    block: list[str] | None = None
+    for line in lines:
+        if block is None:
+            if line.startswith(header):
+                block = [line]
+        elif line.startswith(footers):
+            yield block
+            block = None
+        else:
+            block.append(line)
+    # Ran out of file in the middle of a block, give back what we have
+    if block is not None:
+        yield block
+
+
+def iter_elastic_tables(lines: Iterable[str]) -> Iterator[list[str]]:
+    """Lazily yield the table body of each elastic cross section block
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+
+    Yields
+    ------
+    list[str]
+        The lines of the table, with the block headers removed
+    """
+    for block in iter_cross_section_blocks(
+        lines, ELASTIC_CS_HEADER, (ELASTIC_CS_FOOTER, ELASTIC_CS_FOOTER_ALT)
+    ):
+        yield block[ELASTIC_HEADER_LINES:]
+
+
+def parse_dwba_layout(block: list[str]) -> DWBALayout:
+    """Determine the Lx layout from the header of a DWBA cross section block
+
+    Parameters
+    ----------
+    block: list[str]
+        The lines of the block, starting with the header line
+
+    Returns
+    -------
+    DWBALayout
+        The Lx layout of the block
     """
+    layout = DWBALayout()
+    for line in block[DWBA_HEADER_LINES:]:
+        lx_entries = line.replace("+", "").split()
+        if len(lx_entries) == 0:
+            break
+        line_lxs = int(len(lx_entries) / DWBA_HEADER_WORDS_PER_LX)
+        layout.lxs_per_row.append(line_lxs)
+        for lidx in range(line_lxs):
+            layout.l_values.append(int(lx_entries[2 + lidx * DWBA_HEADER_WORDS_PER_LX]))
+    return layout
+
+
+def iter_dwba_tables(
+    lines: Iterable[str], layout: DWBALayout | None = None
+) -> Iterator[tuple[DWBALayout, list[str]]]:
+    """Lazily yield the layout and table body of each DWBA cross section block
+
+    The Lx layout is read from the header of every block, as each reaction in
+    an output can have its own set of Lx's.
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+    layout: DWBALayout | None
+        If given, this layout is used for every block instead of reading it from
+        the block headers
+
+    Yields
+    ------
+    tuple[DWBALayout, list[str]]
+        The Lx layout and the lines of the table, with the block headers removed
+    """
+    for block in iter_cross_section_blocks(
+        lines, DWBA_CS_HEADER, (DWBA_CS_FOOTER, DWBA_CS_FOOTER_ALT)
+    ):
+        block_layout = layout if layout is not None else parse_dwba_layout(block)
+        yield block_layout, block[DWBA_HEADER_LINES + block_layout.rows_per_line :]
+
+
+def tap_lines(
+    lines: Iterable[str], keyline: str, taps: list[list[str]], n_following: int = 0
+) -> Iterator[str]:
+    """Pass the lines of an output through, keeping each line starting with a keyline
+
+    Used to pick the total cross section lines out of the same pass which parses the
+    tables. The kept lines are appended to taps as the lines are consumed.
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+    keyline: str
+        The keyline of the lines to keep
+    taps: list[list[str]]
+        Each kept line, together with the n_following lines after it, is appended here
+    n_following: int
+        The number of lines after each keyline to keep with it (default 0)
+
+    Yields
+    ------
+    str
+        The lines of the PTOLEMY output, unchanged
+    """
+    remaining = 0
+    for line in lines:
+        if line.startswith(keyline):
+            taps.append([line])
+            remaining = n_following
+        elif remaining > 0:
+            taps[-1].append(line)
+            remaining -= 1
+        yield line
+
+
+def tee_lines(lines: Iterable[str], copy: TextIO) -> Iterator[str]:
+    """Pass lines through unchanged, writing each one to a copy as it goes by
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines
+    copy: TextIO
+        The handle the lines are copied to
+
+    Yields
+    ------
+    str
+        Each line
+    """
+    for line in lines:
+        copy.write(line)
+        yield line
+
+
+def is_ptolemy_path(ptolemy_path: Path | str | Iterable[str]) -> bool:
+    """Check whether a PTOLEMY output is given by its path, rather than its lines
+
+    Parameters
+    ----------
+    ptolemy_path: Path | str | Iterable[str]
+        The path to the output, or its lines
+
+    Returns
+    -------
+    bool
+        True for a path
+    """
+    return isinstance(ptolemy_path, (str, os.PathLike))
+
+
+def parse_numbers(line: str) -> list[float]:
+    """Pick out every number of a line of text
+
+    Parameters
+    ----------
+    line: str
+        The line
+
+    Returns
+    -------
+    list[float]
+        The whitespace separated words of the line which are numbers, in order
+    """
+    numbers = []
+    for word in normalize_fortran_line(line).split():
+        try:
+            numbers.append(float(word))
+        except ValueError:
+            continue
+    return numbers
+
+
+def parse_elastic_total(tap: list[str]) -> float:
+    """Read the total reaction cross section of an elastic calculation
+
+    Parameters
+    ----------
+    tap: list[str]
+        The total reaction cross section line, as kept by tap_lines
+
+    Returns
+    -------
+    float
+        The total reaction cross section (mb), NaN if the line has no number
+    """
+    numbers = parse_numbers(tap[0][len(ELASTIC_CS_FOOTER_ALT) :])
+    return numbers[0] if len(numbers) > 0 else np.nan
+
+
+def is_dwba_total_continuation(line: str, n_lxs: int) -> bool:
+    """Check whether a line continues the DWBA total line with the totals of more Lx's
+
+    Only lines holding nothing but the expected number of values are continuations
+
+    Parameters
+    ----------
+    line: str
+        The line following the total line
+    n_lxs: int
+        The number of Lx's expected on the line (see DWBALayout.lxs_per_row)
+
+    Returns
+    -------
+    bool
+        True if the line is a continuation
+    """
+    return len(line.split()) == n_lxs and len(parse_numbers(line)) == n_lxs
+
+
+def parse_dwba_totals(tap: list[str], layout: DWBALayout) -> np.ndarray:
+    """Read the total cross section and the total for each Lx of a DWBA calculation
+
+    The total line starts with the total cross section and ends with the totals of the
+    Lx's. When the Lx's are broken over several lines, the totals of the remaining Lx's
+    are on the lines which follow it, like the rows of the table.
+
+    Parameters
+    ----------
+    tap: list[str]
+        The total line and the lines following it, as kept by tap_lines
+    layout: DWBALayout
+        The Lx layout of the calculation
+
+    Returns
+    -------
+    numpy.ndarray
+        The total cross section followed by the total of each Lx (mb), with shape
+        (1 + Lx's,). Values which could not be found are NaN
+    """
+    n_ls = len(layout.l_values)
+    totals = np.full(1 + n_ls, np.nan)
+    numbers = parse_numbers(tap[0][len(DWBA_CS_FOOTER_ALT) :])
+    if len(numbers) == 0:
+        return totals
+    totals[0] = numbers[0]
+
+    lx_totals = numbers[1:]
+    wrapped_lines = tap[1 : len(layout.lxs_per_row)]
+    if len(wrapped_lines) == len(layout.lxs_per_row) - 1 and all(
+        is_dwba_total_continuation(line, n_lxs)
+        for line, n_lxs in zip(wrapped_lines, layout.lxs_per_row[1:])
+    ):
+        lx_totals = lx_totals[-layout.lxs_per_row[0] :]
+        for line in wrapped_lines:
+            lx_totals += parse_numbers(line)
+    if len(lx_totals) >= n_ls:
+        totals[1:] = lx_totals[len(lx_totals) - n_ls :]
+    return totals
+
+
+def normalize_fortran_line(line: str) -> str:
+    """Rewrite the quirks of Fortran number formatting into something numpy can read
+
+    Handles D exponents (1.0D+01), exponents missing the E (1.0-100), and fields
+    which run together when a negative number fills its column (1.0E+01-2.0E+00)
+
+    Parameters
+    ----------
+    line: str
+        A line of a PTOLEMY table
+
+    Returns
+    -------
+    str
+        The line with every number separated by whitespace and in E notation
+    """
+    line = FORTRAN_D_EXPONENT.sub("E", line)
+    line = FORTRAN_BARE_EXPONENT.sub(r"\1E\2", line)
+    return FORTRAN_RUN_TOGETHER.sub(" ", line)
+
+
+def load_table_columns(lines: list[str], columns: Sequence[int]) -> np.ndarray:
+    """Convert columns of the lines of a table to a float array in one pass
+
+    The conversion is done by numpy rather than per value in Python. Only if that fails
+    are the lines normalized for Fortran formatting quirks and converted again.
+
+    Parameters
+    ----------
+    lines: list[str]
+        The (non-blank) lines of the table
+    columns: Sequence[int]
+        The whitespace separated columns to read
+
+    Returns
+    -------
+    numpy.ndarray
+        The values, with shape (lines, columns)
+    """
+    if len(lines) == 0:
+        return np.empty((0, len(columns)), dtype=np.float64)
+    try:
+        return np.loadtxt(
+            lines, dtype=np.float64, usecols=columns, ndmin=2, comments=None
+        )
+    except ValueError:
+        return np.loadtxt(
+            [normalize_fortran_line(line) for line in lines],
+            dtype=np.float64,
+            usecols=columns,
+            ndmin=2,
+            comments=None,
+        )
+
+
+def parse_elastic_table(table: list[str], extras: bool = False) -> np.ndarray:
+    """Convert the lines of an elastic table into (angle, cross section) rows
+
+    Parameters
+    ----------
+    table: list[str]
+        The lines of the table body
+    extras: bool
+        If True, the ratio to the Rutherford cross section is added as a third column
+        (default False)
+
+    Returns
+    -------
+    numpy.ndarray
+        The center-of-mass angle and differential cross section of each row,
+        with shape (rows, 2), or (rows, 3) with extras
+    """
+    lines = [line for line in table if not line.isspace() and line != ""]
+    columns = [ELASTIC_ANGLE_COLUMN, ELASTIC_CROSS_COLUMN]
+    if extras:
+        columns.append(ELASTIC_RATIO_COLUMN)
+    return load_table_columns(lines, columns)
+
+
+def parse_dwba_table(
+    table: list[str], layout: DWBALayout, extras: bool = False
+) -> np.ndarray:
+    """Convert the lines of a DWBA table into (angle, cross section, Lx cross sections) rows
+
+    Each row of the table is printed over layout.rows_per_line lines. The first line of
+    each row holds the angle, cross section, and the first Lx's. The following lines
+    hold only the remaining Lx's. Each set of lines is converted in bulk.
+
+    Parameters
+    ----------
+    table: list[str]
+        The lines of the table body
+    layout: DWBALayout
+        The Lx layout of the table
+    extras: bool
+        If True, the analyzing power is added as a column between the cross section and
+        the Lx's (default False)
+
+    Returns
+    -------
+    numpy.ndarray
+        The center-of-mass angle, differential cross section, and the differential
+        cross section of each Lx for each row, with shape (rows, 2 + Lx's), or
+        (rows, 3 + Lx's) with extras
+    """
+    lines = [line for line in table if not line.isspace() and line != ""]
+    rows_per_line = layout.rows_per_line
+    n_rows = len(lines) // rows_per_line
+    columns = []
+    for ridx in range(rows_per_line):
+        if ridx == 0:
+            usecols = [DWBA_ANGLE_COLUMN, DWBA_CROSS_COLUMN]
+            if extras:
+                usecols.append(DWBA_ANALYZING_POWER_COLUMN)
+            usecols += [DWBA_LEADING_COLUMNS + i for i in range(layout.lxs_per_row[0])]
+        else:
+            usecols = list(range(layout.lxs_per_row[ridx]))
+        columns.append(
+            load_table_columns(
+                lines[ridx : n_rows * rows_per_line : rows_per_line], usecols
+            )
+        )
+    return np.hstack(columns)
+
+
+class _RowBuffer:
+    """A preallocated, growable table of float64 rows
+
+    Blocks of rows are written straight into a contiguous array which doubles
+    in size when full, so parsing never builds lists of Python floats.
+    """
+
+    def __init__(self, width: int, capacity: int = INITIAL_ROW_CAPACITY):
+        self.data = np.empty((capacity, width), dtype=np.float64)
+        self.size = 0
+
+    def extend(self, rows: np.ndarray):
+        new_size = self.size + len(rows)
+        if new_size > len(self.data):
+            capacity = len(self.data)
+            while capacity < new_size:
+                capacity *= 2
+            grown = np.empty((capacity, self.data.shape[1]), dtype=np.float64)
+            grown[: self.size] = self.data[: self.size]
+            self.data = grown
+        self.data[self.size : new_size] = rows
+        self.size = new_size
+
+    def finish(self) -> np.ndarray:
+        return self.data[: self.size]
+
+
+def collect_elastic_result(
+    lines: Iterable[str], extras: bool = False
+) -> CrossSectionResult:
+    """Parse the lines of the PTOLEMY output of elastic scattering
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+    extras: bool
+        If True, also collect the ratio to Rutherford and the total reaction cross
+        section of each calculation in the same pass (default False)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed angles and cross section
+    """
+    taps: list[list[str]] = []
+    if extras:
+        lines = tap_lines(lines, ELASTIC_CS_FOOTER_ALT, taps)
+
     # We have no idea how much data there is
-    cm_angles = []
-    cm_cross = []
+    buffer = _RowBuffer(3 if extras else 2)
+    for table in iter_elastic_tables(lines):
+        buffer.extend(parse_elastic_table(table, extras))
 
+    rows = buffer.finish()
+    result = CrossSectionResult(
+        angle=np.ascontiguousarray(rows[:, 0]),
+        cross=np.ascontiguousarray(rows[:, 1]),
+    )
+    if extras:
+        result.ratio_rutherford = np.ascontiguousarray(rows[:, 2])
+        result.total_cross = np.array(
+            [parse_elastic_total(tap) for tap in taps], dtype=np.float64
+        )
+    return result
+
+
+def collect_dwba_result(
+    lines: Iterable[str],
+    verbose: bool = True,
+    layout: DWBALayout | None = None,
+    extras: bool = False,
+) -> CrossSectionResult:
+    """Parse the lines of the PTOLEMY output of DWBA scattering
+
+    Every table must have the same set of Lx's. Outputs with several reactions
+    can be split with hieroglyph.index and each reaction parsed separately.
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+    verbose: bool
+        If True, report the lxs that were found (default True)
+    layout: DWBALayout | None
+        If given, the Lx layout of every table is taken to be this one rather than
+        read from the tables. The lines may then contain no tables at all
+    extras: bool
+        If True, also collect the analyzing power, and the total cross section and
+        total of each Lx of each calculation in the same pass (default False)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed angles, cross section, l-values, and cross section for each l
+    """
+    taps: list[list[str]] = []
+    if extras:
+        lines = tap_lines(lines, DWBA_CS_FOOTER_ALT, taps, DWBA_TOTAL_MAX_LINES)
+    n_leading = 3 if extras else 2
+
+    # We reeaally don't know how much data there is
+    buffer: _RowBuffer | None = None
+    l_values = []
+    if layout is not None:
+        l_values = layout.l_values
+        buffer = _RowBuffer(n_leading + len(l_values))
+
+    for table_layout, table in iter_dwba_tables(lines, layout):
+        if buffer is None:
+            layout = table_layout
+            l_values = table_layout.l_values
+            buffer = _RowBuffer(n_leading + len(l_values))
+            if verbose:
+                print(f"Found {len(l_values)} lxs: {l_values}")
+        elif table_layout.l_values != l_values:
+            raise Exception(
+                f"Found DWBA tables with different lxs ({l_values} and {table_layout.l_values})! Parse each reaction separately using hieroglyph.index"
+            )
+        buffer.extend(parse_dwba_table(table, table_layout, extras))
+
+    if buffer is None or layout is None:
+        raise Exception("Did not find any lxs while parsing DWBA!")
+
+    rows = buffer.finish()
+    result = CrossSectionResult(
+        angle=np.ascontiguousarray(rows[:, 0]),
+        cross=np.ascontiguousarray(rows[:, 1]),
+        cross_ls=np.ascontiguousarray(rows[:, n_leading:].T),
+        l_values=np.array(l_values, dtype=np.int64),
+    )
+    if extras:
+        result.analyzing_power = np.ascontiguousarray(rows[:, 2])
+        totals = np.array(
+            [parse_dwba_totals(tap, layout) for tap in taps], dtype=np.float64
+        ).reshape(len(taps), 1 + len(l_values))
+        result.total_cross = np.ascontiguousarray(totals[:, 0])
+        result.total_cross_ls = np.ascontiguousarray(totals[:, 1:].T)
+    return result
+
+
+def read_elastic_differential_cross_section(
+    ptolemy_path: Path | Iterable[str], extras: bool = False
+) -> CrossSectionResult:
+    """Parse the PTOLEMY output of elastic scattering
+
+    This is the easy case
+
+    Parameters
+    ----------
+    ptolemy_path: Path | Iterable[str]
+        Path to the PTOLEMY output, or its lines (an open file, a pipe, ...)
+    extras: bool
+        If True, also collect the ratio to Rutherford and the total reaction cross
+        section (default False)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed angles and cross section
+    """
+    if not is_ptolemy_path(ptolemy_path):
+        return collect_elastic_result(ptolemy_path, extras)
     with open(ptolemy_path, "r") as pt_file:
-        pt_lines = pt_file.readlines()
-        idx = 0
-        while idx < len(pt_lines):
-            cur_line = pt_lines[idx]
-            # The outputs contain a ton of extra crap
-            # that is good to check, but not relevant for use in experiment
-            # There's no way to know how far to jump to reach the actual
-            # cross section
-            # The cross section is also for some unknowable reason broken into
-            # blocks each with a header and footer. These blocks are not
-            # fixed in size soooooooo we just go until we don't
-            if cur_line.startswith(ELASTIC_CS_HEADER):  # This is objectively bad
-                idx += 2  # Skip current line, next line as headers
-                while not (
-                    pt_lines[idx].startswith(ELASTIC_CS_FOOTER)
-                    or pt_lines[idx].startswith(ELASTIC_CS_FOOTER_ALT)
-                ):
-                    row = pt_lines[idx]
-                    entries = row.split()
-                    if len(entries) == 0:
-                        idx += 1
-                        continue
-                    cm_angles.append(float(entries[0]))
-                    cm_cross.append(float(entries[3]))
-                    idx += 1
-            else:
-                idx += 1
-
-    cm_angle_array = np.array(cm_angles)
-    cm_cross_array = np.array(cm_cross)
-
-    np.savez_compressed(parsed_path, angle=cm_angle_array, cross=cm_cross_array)
+        return collect_elastic_result(pt_file, extras)
 
 
-def parse_dwba_differential_cross_section(
-    ptolemy_path: Path, parsed_path: Path
-) -> None:
+def read_dwba_differential_cross_section(
+    ptolemy_path: Path | Iterable[str], verbose: bool = True, extras: bool = False
+) -> CrossSectionResult:
     """Parse the PTOLEMY output of DWBA scattering
 
-    Writes the result to a Numpy (.npz) file
     This is the not easy case
 
+    Parameters
+    ----------
+    ptolemy_path: Path | Iterable[str]
+        Path to the PTOLEMY output, or its lines (an open file, a pipe, ...)
+    verbose: bool
+        If True, report the lxs that were found (default True)
+    extras: bool
+        If True, also collect the analyzing power, and the total cross section and
+        total of each Lx (default False)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed angles, cross section, l-values, and cross section for each l
+    """
+    if not is_ptolemy_path(ptolemy_path):
+        return collect_dwba_result(ptolemy_path, verbose, extras=extras)
+    with open(ptolemy_path, "r") as pt_file:
+        return collect_dwba_result(pt_file, verbose, extras=extras)
+
+
+def get_parse_key(ptolemy_path: Path, kind: str, extras: bool) -> str:
+    """Get the parse cache key of a PTOLEMY output
+
     Parameters
     ----------
     ptolemy_path: Path
         Path to the PTOLEMY output
+    kind: str
+        The kind of calculation (ELASTIC or DWBA)
+    extras: bool
+        Whether the extra tables of the output are collected
+
+    Returns
+    -------
+    str
+        The hash of the output's contents together with the kind, extras, and
+        PARSER_VERSION
+    """
+    return hash_key(hash_file(ptolemy_path), kind, str(extras), PARSER_VERSION)
+
+
+def read_differential_cross_section(
+    ptolemy_path: Path | Iterable[str],
+    kind: str,
+    cache: ResultCache | None = None,
+    verbose: bool = True,
+    extras: bool = False,
+    raw_path: Path | None = None,
+) -> CrossSectionResult:
+    """Parse a PTOLEMY output, skipping the parse if the result is cached
+
+    The cache key is the hash of the output's contents together with the kind, whether
+    extras were collected, and PARSER_VERSION, so a cached result is only used for an
+    identical output parsed the same way by the same version of the parser.
+
+    The output can also be given as its lines (stdin, the stdout pipe of PTOLEMY, ...),
+    which are parsed as they arrive without the text ever being written to disk.
+    Lines can only be read once, so they are always parsed. The contents are hashed on
+    the way through, and the result is still stored in the cache for the next time.
+
+    Parameters
+    ----------
+    ptolemy_path: Path | Iterable[str]
+        Path to the PTOLEMY output, or its lines
+    kind: str
+        The kind of calculation (ELASTIC or DWBA)
+    cache: ResultCache | None
+        The cache of parsed results. None always parses (default None)
+    verbose: bool
+        If True, report the lxs that were found when parsing DWBA (default True)
+    extras: bool
+        If True, also collect the extra tables of the output (see collect_elastic_result
+        and collect_dwba_result) (default False)
+    raw_path: Path | None
+        When parsing lines, a gzip-compressed copy of the text is written here. None
+        keeps no copy (default None)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed result
+    """
+    if not is_ptolemy_path(ptolemy_path):
+        return read_differential_cross_section_lines(
+            ptolemy_path, kind, cache, verbose, extras, raw_path
+        )
+
+    key = None
+    if cache is not None:
+        key = get_parse_key(ptolemy_path, kind, extras)
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+    if kind == DWBA:
+        result = read_dwba_differential_cross_section(ptolemy_path, verbose, extras)
+    else:
+        result = read_elastic_differential_cross_section(ptolemy_path, extras)
+
+    if cache is not None and key is not None:
+        cache.put(key, result)
+    return result
+
+
+def read_differential_cross_section_lines(
+    lines: Iterable[str],
+    kind: str,
+    cache: ResultCache | None = None,
+    verbose: bool = True,
+    extras: bool = False,
+    raw_path: Path | None = None,
+) -> CrossSectionResult:
+    """Parse a PTOLEMY output from its lines, as they arrive
+
+    The lines are read to the end, so the copy and the hash cover the whole output
+    and a pipe is never left blocked.
+
+    Parameters
+    ----------
+    lines: Iterable[str]
+        The lines of the PTOLEMY output
+    kind: str
+        The kind of calculation (ELASTIC or DWBA)
+    cache: ResultCache | None
+        The result is stored here, under the same key as the output would have as a
+        file (see read_differential_cross_section). None stores nothing (default None)
+    verbose: bool
+        If True, report the lxs that were found when parsing DWBA (default True)
+    extras: bool
+        If True, also collect the extra tables of the output (default False)
+    raw_path: Path | None
+        A gzip-compressed copy of the text is written here. None keeps no copy
+        (default None)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed result
+    """
+    digest = sha256()
+
+    def hash_lines(lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            digest.update(line.encode())
+            yield line
+
+    source = hash_lines(lines)
+    raw_file = None if raw_path is None else gzip.open(raw_path, "wt")
+    try:
+        if raw_file is not None:
+            source = tee_lines(source, raw_file)
+        if kind == DWBA:
+            result = collect_dwba_result(source, verbose, extras=extras)
+        else:
+            result = collect_elastic_result(source, extras)
+        for _ in source:
+            pass
+    finally:
+        if raw_file is not None:
+            raw_file.close()
+
+    if cache is not None:
+        cache.put(
+            hash_key(digest.hexdigest(), kind, str(extras), PARSER_VERSION), result
+        )
+    return result
+
+
+def parse_elastic_differential_cross_section(
+    ptolemy_path: Path | Iterable[str],
+    parsed_path: Path,
+    output_format: str = FORMAT_NPZ_COMPRESSED,
+    compression_level: int | None = None,
+    cache: ResultCache | None = None,
+    extras: bool = False,
+    raw_path: Path | None = None,
+) -> None:
+    """Parse the PTOLEMY output of elastic scattering
+
+    Writes the result to a Numpy (.npz) file, or a directory of .npy files
+
+    Parameters
+    ----------
+    ptolemy_path: Path | Iterable[str]
+        Path to the PTOLEMY output, or its lines (an open file, a pipe, ...), which
+        are parsed as they arrive
     parsed_path: Path
         Path to which the parsed data will be written
+    output_format: str
+        One of hieroglyph.result.OUTPUT_FORMATS (default npz-compressed)
+    compression_level: int | None
+        The zlib compression level (0-9) of the npz-compressed format. None uses
+        the zlib default
+    cache: ResultCache | None
+        If given, a cached result for an identical output is used instead of parsing
+        (default None)
+    extras: bool
+        If True, also write the ratio to Rutherford and the total reaction cross
+        section (default False)
+    raw_path: Path | None
+        When parsing lines, a gzip-compressed copy of the text is written here
+        (default None)
     """
+    write_result(
+        read_differential_cross_section(
+            ptolemy_path, ELASTIC, cache, extras=extras, raw_path=raw_path
+        ),
+        parsed_path,
+        output_format,
+        compression_level,
+    )
 
-    # We reeaally don't know how much data there is
-    cm_angles = []
-    cm_cross = []
-    cm_cross_ls = None
-    l_values = []
-    lxs_per_row = []
-    rows_per_line = 0  # Gross
 
-    with open(ptolemy_path, "r") as pt_file:
-        pt_lines = pt_file.readlines()
-        idx = 0
-
-        # The problem with the DWBA output is that in addition to all the madness of
-        # the problems we had with elastic, we now also have the fun of each "output" line
-        # no longer is equivalent to one row of the data table in the file. The lines get too
-        # long and because Fortran sucks they handle this by making a new line underneath with partial
-        # data. This happens for the L-values of the transfer. We need to pre parse these and determine how
-        # many rows go to one line
-        while idx < len(pt_lines):
-            cur_line = pt_lines[idx]
-            if cur_line.startswith(DWBA_CS_HEADER):
-                idx += 4  # Skip current line, next line as headers
-                # Figure out how many l-values encountered, number of extra line breaks
-                while True:
-                    lx_entries = pt_lines[idx].replace("+", "").split()
-                    if len(lx_entries) == 0:
-                        idx += 1
-                        break
-                    line_lxs = int(len(lx_entries) / DWBA_HEADER_WORDS_PER_LX)
-                    lxs_per_row.append(line_lxs)
-                    for lidx in range(line_lxs):
-                        l_values.append(
-                            int(lx_entries[2 + lidx * DWBA_HEADER_WORDS_PER_LX])
-                        )
-                    idx += 1
-
-                cm_cross_ls = [[] for _ in range(sum(lxs_per_row))]
-                rows_per_line = int(
-                    np.ceil(float(sum(lxs_per_row)) / float(DWBA_LXS_PER_ROW))
-                )
-                break
-            else:
-                idx += 1
-
-        if cm_cross_ls is None:
-            raise Exception("Did not find any lxs while parsing DWBA!")
-
-        print(f"Found {sum(lxs_per_row)} lxs: {l_values}")
-        # Now that we know how many rows go to a line, parsing is mostly the same as before
-        # except we also need to extract the different Lx's from the table
-        idx = 0
-        while idx < len(pt_lines):
-            cur_line = pt_lines[idx]
-            if cur_line.startswith(DWBA_CS_HEADER):
-                idx += 4 + rows_per_line  # Skip current line, next line as headers
-                # Parse the cross-section
-                while not (
-                    pt_lines[idx].startswith(DWBA_CS_FOOTER)
-                    or pt_lines[idx].startswith(DWBA_CS_FOOTER_ALT)
-                ):
-                    row = pt_lines[idx]
-                    entries = row.split()
-                    if len(entries) == 0:
-                        idx += 1
-                        continue
-                    cm_angles.append(float(entries[0]))
-                    cm_cross.append(float(entries[1]))
-                    for ridx in range(rows_per_line):
-                        lx_row = pt_lines[idx + ridx]
-                        lx_entries = lx_row.split()
-                        for i in range(lxs_per_row[ridx]):
-                            start_idx = 0
-                            array_idx = ridx * DWBA_LXS_PER_ROW + i
-                            if ridx == 0:
-                                start_idx = 9
-                            cm_cross_ls[array_idx].append(
-                                float(lx_entries[start_idx + i])
-                            )
-                    idx += rows_per_line
-            else:
-                idx += 1
-
-    cm_angle_array = np.array(cm_angles)
-    cm_cross_array = np.array(cm_cross)
-    cm_cross_ls_array = np.array(cm_cross_ls)
-    ls_array = np.array(l_values)
-    np.savez_compressed(
+def parse_dwba_differential_cross_section(
+    ptolemy_path: Path | Iterable[str],
+    parsed_path: Path,
+    output_format: str = FORMAT_NPZ_COMPRESSED,
+    compression_level: int | None = None,
+    cache: ResultCache | None = None,
+    extras: bool = False,
+    raw_path: Path | None = None,
+) -> None:
+    """Parse the PTOLEMY output of DWBA scattering
+
+    Writes the result to a Numpy (.npz) file, or a directory of .npy files
+
+    Parameters
+    ----------
+    ptolemy_path: Path | Iterable[str]
+        Path to the PTOLEMY output, or its lines (an open file, a pipe, ...), which
+        are parsed as they arrive
+    parsed_path: Path
+        Path to which the parsed data will be written
+    output_format: str
+        One of hieroglyph.result.OUTPUT_FORMATS (default npz-compressed)
+    compression_level: int | None
+        The zlib compression level (0-9) of the npz-compressed format. None uses
+        the zlib default
+    cache: ResultCache | None
+        If given, a cached result for an identical output is used instead of parsing
+        (default None)
+    extras: bool
+        If True, also write the analyzing power, and the total cross section and
+        total of each Lx (default False)
+    raw_path: Path | None
+        When parsing lines, a gzip-compressed copy of the text is written here
+        (default None)
+    """
+    write_result(
+        read_differential_cross_section(
+            ptolemy_path, DWBA, cache, extras=extras, raw_path=raw_path
+        ),
         parsed_path,
-        angle=cm_angle_array,
-        cross=cm_cross_array,
-        cross_ls=cm_cross_ls_array,
-        l_values=ls_array,
+        output_format,
+        compression_level,
     )
@@ -1,5 +1,7 @@
 import math
-from typing import Callable
+from functools import lru_cache
+from typing import Callable, Iterator
+import numpy as np
 
 # Keyword for each potential
 AN_CAI = "an-cai"
@@ -8,8 +10,90 @@ BOJOWALD = "bojowald"
 KONING_DELAROCHE_PROTON = "koning-delaroche-proton"
 LI_LIANG_CAI_TRITON = "li-liang-cai-triton"
 
+# The optical model parameters, in the order PTOLEMY expects them
+PARAMETER_NAMES = (
+    "V",
+    "Vi",
+    "Vsi",
+    "Vso",
+    "Vsoi",
+    "r0",
+    "ri0",
+    "rsi0",
+    "rso0",
+    "rsoi0",
+    "rc0",
+    "a",
+    "ai",
+    "asi",
+    "aso",
+    "asoi",
+)
+
+# Structured dtype with one float field per parameter
+PARAMETER_DTYPE = np.dtype([(name, np.float64) for name in PARAMETER_NAMES])
+
+# Number of parameter sets create_parameters remembers
+PARAMETER_CACHE_SIZE = 4096
+
+
+class PotentialParameters:
+    """The optical model parameters of a single potential evaluation
+
+    A fixed record with one slot per parameter (PARAMETER_NAMES), so no per-instance
+    dictionary is allocated. Parameters can be read and written by name like a
+    dictionary, and keys() and items() give them in the order PTOLEMY expects.
+
+    Methods
+    -------
+    keys()
+        Get the parameter names
+    values()
+        Get the parameter values
+    items()
+        Get the (name, value) pairs
+    """
+
+    __slots__ = PARAMETER_NAMES
+
+    def __init__(self):
+        for name in PARAMETER_NAMES:
+            setattr(self, name, 0.0)
+
+    def __getitem__(self, name: str) -> float:
+        if name not in PARAMETER_NAMES:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name: str, value: float):
+        if name not in PARAMETER_NAMES:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(PARAMETER_NAMES)
 
-def an_cai_potential(E: float, zt: int, at: int, params: dict[str, float]):
+    def __len__(self) -> int:
+        return len(PARAMETER_NAMES)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={value}" for name, value in self.items())
+        return f"PotentialParameters({values})"
+
+    def keys(self) -> tuple[str, ...]:
+        """Get the parameter names"""
+        return PARAMETER_NAMES
+
+    def values(self) -> list[float]:
+        """Get the parameter values"""
+        return [getattr(self, name) for name in PARAMETER_NAMES]
+
+    def items(self) -> list[tuple[str, float]]:
+        """Get the (name, value) pairs"""
+        return [(name, getattr(self, name)) for name in PARAMETER_NAMES]
+
+
+def an_cai_potential(E: float, zt: int, at: int, params: PotentialParameters):
     """An-Cai detueron scattering optical model potential
 
     From  An, H. and Cai, C., "Global deuteron optical model potential for the energy range up to 183 MeV", Phys. Rev. C. 73, 2006
@@ -23,8 +107,8 @@ def an_cai_potential(E: float, zt: int, at: int, params: dict[str, float]):
         The target Z
     at: int
         The target A
-    params: dict[str, float]
-        The dictionary of optical model parameters to be filled out
+    params: PotentialParameters
+        The optical model parameters to be filled out
     """
     a3 = at ** (0.333)
 
@@ -46,7 +130,7 @@ def an_cai_potential(E: float, zt: int, at: int, params: dict[str, float]):
     params["asoi"] = 0.0
 
 
-def daehnick_potential(E: float, zt: int, at: int, params: dict[str, float]):
+def daehnick_potential(E: float, zt: int, at: int, params: PotentialParameters):
     """Daehnick detueron scattering optical model potential
 
     From  Daehnick, W.W., Childs, J.D., Vrcelj, Z., "Global optical model potential for elastic deuteron scattering from 12 to 90 MeV", Phys. Rev. C. 21, 1980
@@ -60,8 +144,8 @@ def daehnick_potential(E: float, zt: int, at: int, params: dict[str, float]):
         The target Z
     at: int
         The target A
-    params: dict[str, float]
-        The dictionary of optical model parameters to be filled out
+    params: PotentialParameters
+        The optical model parameters to be filled out
     """
     nt = at - zt
     a3 = at ** (0.333)
@@ -93,7 +177,7 @@ def daehnick_potential(E: float, zt: int, at: int, params: dict[str, float]):
     params["asoi"] = 0.0
 
 
-def bojowald_potential(E: float, zt: int, at: int, params: dict[str, float]):
+def bojowald_potential(E: float, zt: int, at: int, params: PotentialParameters):
     """Bojowald detueron scattering optical model potential
 
     From  Bojowald, J., Machner, et al. "Elastic deuteron scattering adn optical model parameters at energies up to 100 MeV", Phys. Rev. C. 38, 1988
@@ -107,8 +191,8 @@ def bojowald_potential(E: float, zt: int, at: int, params: dict[str, float]):
         The target Z
     at: int
         The target A
-    params: dict[str, float]
-        The dictionary of optical model parameters to be filled out
+    params: PotentialParameters
+        The optical model parameters to be filled out
     """
     # nt = at - zt
     a3 = at ** (0.333)
@@ -132,7 +216,7 @@ def bojowald_potential(E: float, zt: int, at: int, params: dict[str, float]):
 
 
 def koning_delaroche_proton_potential(
-    E: float, zt: int, at: int, params: dict[str, float]
+    E: float, zt: int, at: int, params: PotentialParameters
 ):
     """Koning-Delaroche proton scattering optical model potential
 
@@ -147,8 +231,8 @@ def koning_delaroche_proton_potential(
         The target Z
     at: int
         The target A
-    params: dict[str, float]
-        The dictionary of optical model parameters to be filled out
+    params: PotentialParameters
+        The optical model parameters to be filled out
     """
     nt = at - zt
     a3 = at ** (0.333)
@@ -198,7 +282,9 @@ def koning_delaroche_proton_potential(
     params["asoi"] = 0.59
 
 
-def li_liang_cai_triton_potential(E: float, zt: int, at: int, params: dict[str, float]):
+def li_liang_cai_triton_potential(
+    E: float, zt: int, at: int, params: PotentialParameters
+):
     """Global triton optical model potential
 
     From: Li, Liang, Cai, (2007) E < 40 | All masses | 48 < A < 232 | Tritons
@@ -210,13 +296,15 @@ def li_liang_cai_triton_potential(E: float, zt: int, at: int, params: dict[str,
         The target Z
     at: int
         The target A
-    params: dict[str, float]
-        The dictionary of optical model parameters to be filled out
+    params: PotentialParameters
+        The optical model parameters to be filled out
     """
     nt = at - zt
     a3 = at ** (1.0 / 3.0)
-    
-    params["V"] = 137.6 - 0.1456 * E + 0.0436 * E**2 + 4.3751 * (nt - zt) / at + 1.0474 * zt / a3
+
+    params["V"] = (
+        137.6 - 0.1456 * E + 0.0436 * E**2 + 4.3751 * (nt - zt) / at + 1.0474 * zt / a3
+    )
     params["r0"] = 1.1201 - 0.1504 / a3
     params["a"] = 0.6833 + 0.0191 * a3
 
@@ -240,7 +328,7 @@ def li_liang_cai_triton_potential(E: float, zt: int, at: int, params: dict[str,
 
 
 # Dictionary connecting each keyword to the function for each potential
-POTENTIALS: dict[str, Callable[[float, int, int, dict[str, float]], None]] = {
+POTENTIALS: dict[str, Callable[[float, int, int, PotentialParameters], None]] = {
     AN_CAI: an_cai_potential,
     DAEHNICK: daehnick_potential,
     BOJOWALD: bojowald_potential,
@@ -248,10 +336,34 @@ POTENTIALS: dict[str, Callable[[float, int, int, dict[str, float]], None]] = {
     LI_LIANG_CAI_TRITON: li_liang_cai_triton_potential,
 }
 
+# The range (min, max) of E, zt, and at each potential was fit over, where it is known
+POTENTIAL_VALIDITY: dict[str, dict[str, tuple[float, float]]] = {
+    AN_CAI: {"E": (0.0, 183.0)},
+    DAEHNICK: {"E": (12.0, 90.0)},
+    BOJOWALD: {"E": (0.0, 100.0)},
+    KONING_DELAROCHE_PROTON: {"E": (0.001, 200.0)},
+    LI_LIANG_CAI_TRITON: {"E": (0.0, 40.0), "at": (48.0, 232.0)},
+}
+
+
+@lru_cache(maxsize=PARAMETER_CACHE_SIZE)
+def _evaluate_potential(
+    potential: str, E: float, zt: int, at: int
+) -> PotentialParameters:
+    params = PotentialParameters()
+    POTENTIALS[potential](E, zt, at, params)
+    return params
+
 
-def create_parameters(E: float, zt: int, at: int, potential: str) -> dict[str, float]:
+def create_parameters(
+    E: float, zt: int, at: int, potential: str
+) -> PotentialParameters:
     """Create the optical model potential parameters
 
+    Evaluations are memoized on (potential, E, zt, at), keeping the last
+    PARAMETER_CACHE_SIZE of them, so repeated calls with the same arguments
+    hand back the same record. The record is shared and should not be modified.
+
     Parameters
     ----------
     E: float
@@ -265,33 +377,357 @@ def create_parameters(E: float, zt: int, at: int, potential: str) -> dict[str, f
 
     Returns
     -------
-    dict[str, float]
-        A dictionary of optical model parameters
+    PotentialParameters
+        The optical model parameters
     """
     if potential not in POTENTIALS.keys():
         raise Exception(
             f"Potential {potential} is not in the set of allowed Potentials {POTENTIALS.keys()}!"
         )
 
-    params = {
-        "V": 0.0,
-        "Vi": 0.0,
-        "Vsi": 0.0,
-        "Vso": 0.0,
-        "Vsoi": 0.0,
-        "r0": 0.0,
-        "ri0": 0.0,
-        "rsi0": 0.0,
-        "rso0": 0.0,
-        "rsoi0": 0.0,
-        "rc0": 0.0,
-        "a": 0.0,
-        "ai": 0.0,
-        "asi": 0.0,
-        "aso": 0.0,
-        "asoi": 0.0,
-    }
+    return _evaluate_potential(potential, E, zt, at)
 
-    POTENTIALS[potential](E, zt, at, params)
+
+def parameter_cache_info() -> tuple[int, int, int | None, int]:
+    """Get the statistics of the memoization of create_parameters
+
+    Returns
+    -------
+    tuple[int, int, int | None, int]
+        The hits, misses, maximum size, and current size of the cache (a
+        functools CacheInfo, so each is also available by name)
+    """
+    return _evaluate_potential.cache_info()
+
+
+def clear_parameter_cache():
+    """Forget every parameter set remembered by create_parameters"""
+    _evaluate_potential.cache_clear()
+
+
+def find_out_of_range(
+    E: np.ndarray, zt: np.ndarray, at: np.ndarray, potential: str
+) -> np.ndarray:
+    """Flag the points which lie outside of the range of validity of a potential
+
+    The arguments are broadcast against each other like create_parameters_array.
+    Potentials without a known range of validity never flag anything.
+
+    Parameters
+    ----------
+    E: numpy.ndarray
+        The normal kinematics beam energies in MeV
+    zt: numpy.ndarray
+        The target Z's
+    at: numpy.ndarray
+        The target A's
+    potential: str
+        The potential keyword
+
+    Returns
+    -------
+    numpy.ndarray
+        True for each point where the potential would be extrapolated
+    """
+    inputs = dict(
+        zip(
+            ("E", "zt", "at"),
+            np.broadcast_arrays(
+                np.asarray(E, dtype=np.float64),
+                np.asarray(zt, dtype=np.float64),
+                np.asarray(at, dtype=np.float64),
+            ),
+        )
+    )
+    out_of_range = np.zeros(inputs["E"].shape, dtype=bool)
+    for name, (low, high) in POTENTIAL_VALIDITY.get(potential, {}).items():
+        out_of_range |= (inputs[name] < low) | (inputs[name] > high)
+    return out_of_range
+
+
+def an_cai_potential_array(
+    E: np.ndarray, zt: np.ndarray, at: np.ndarray, params: np.ndarray
+):
+    """An-Cai detueron scattering optical model potential, evaluated over arrays
+
+    See an_cai_potential
+
+    Parameters
+    ----------
+    E: numpy.ndarray
+        The projectile energies in MeV
+    zt: numpy.ndarray
+        The target Z's
+    at: numpy.ndarray
+        The target A's
+    params: numpy.ndarray
+        The structured array (PARAMETER_DTYPE) of parameters to be filled out
+    """
+    a3 = at ** (0.333)
+
+    params["V"] = 91.85 - 0.249 * E + 1.116e-4 * E**2.0 + 0.642 * zt / a3
+    params["Vi"] = 1.104 + 0.0622 * E
+    params["Vsi"] = 10.83 - 0.0306 * E
+    params["Vso"] = 3.557
+    params["Vsoi"] = 0.0
+    params["r0"] = 1.152 - 0.00776 / a3
+    params["ri0"] = 1.305 + 0.0997 / a3
+    params["rsi0"] = 1.334 + 0.152 / a3
+    params["rso0"] = 0.972
+    params["rsoi0"] = 0.0
+    params["rc0"] = 1.303
+    params["a"] = 0.719 + 0.0126 * a3
+    params["ai"] = 0.855 - 0.1 * a3
+    params["asi"] = 0.531 + 0.062 * a3
+    params["aso"] = 1.011
+    params["asoi"] = 0.0
+
+
+def daehnick_potential_array(
+    E: np.ndarray, zt: np.ndarray, at: np.ndarray, params: np.ndarray
+):
+    """Daehnick detueron scattering optical model potential, evaluated over arrays
+
+    See daehnick_potential
+
+    Parameters
+    ----------
+    E: numpy.ndarray
+        The projectile energies in MeV
+    zt: numpy.ndarray
+        The target Z's
+    at: numpy.ndarray
+        The target A's
+    params: numpy.ndarray
+        The structured array (PARAMETER_DTYPE) of parameters to be filled out
+    """
+    nt = at - zt
+    a3 = at ** (0.333)
+    beta = -1.0 * (E * 0.01) ** 2.0
+    # Sum over the neutron magic numbers
+    mu = sum(
+        np.exp(-1.0 * ((magic - nt) * 0.5) ** 2.0)
+        for magic in (8.0, 20.0, 28.0, 50.0, 82.0, 126.0)
+    )
+
+    params["V"] = 88.0 - 0.283 * E + 0.88 * zt / a3
+    params["Vi"] = (12.0 + 0.031 * E) * (1.0 - np.exp(beta))
+    params["Vsi"] = (12.0 + 0.031 * E) * (np.exp(beta))
+    params["Vso"] = 7.2 - 0.032 * E
+    params["Vsoi"] = 0.0
+    params["r0"] = 1.17
+    params["ri0"] = 1.376 - 0.01 * np.sqrt(E)
+    params["rsi0"] = 1.376 - 0.01 * np.sqrt(E)
+    params["rso0"] = 1.07
+    params["rsoi0"] = 0.0
+    params["rc0"] = 1.3
+    params["a"] = 0.717 + 0.0012 * E
+    params["ai"] = 0.52 + 0.07 * a3 - 0.04 * mu
+    params["asi"] = 0.52 + 0.07 * a3 - 0.04 * mu
+    params["aso"] = 0.66
+    params["asoi"] = 0.0
+
+
+def bojowald_potential_array(
+    E: np.ndarray, zt: np.ndarray, at: np.ndarray, params: np.ndarray
+):
+    """Bojowald detueron scattering optical model potential, evaluated over arrays
+
+    See bojowald_potential
+
+    Parameters
+    ----------
+    E: numpy.ndarray
+        The projectile energies in MeV
+    zt: numpy.ndarray
+        The target Z's
+    at: numpy.ndarray
+        The target A's
+    params: numpy.ndarray
+        The structured array (PARAMETER_DTYPE) of parameters to be filled out
+    """
+    a3 = at ** (0.333)
+
+    params["V"] = 81.33 - 0.24 * E + 1.43 * zt / a3
+    params["Vi"] = np.where(E > 45.0, 0.132 * (E - 45.0), 0.0)
+    params["Vsi"] = 7.8 + 1.04 * a3 - 0.712 * params["Vi"]
+    params["Vso"] = 6.0
+    params["Vsoi"] = 0.0
+    params["r0"] = 1.18
+    params["ri0"] = 1.27
+    params["rsi0"] = 1.27
+    params["rso0"] = 0.78 + 0.038 * a3
+    params["rsoi0"] = 0.0
+    params["rc0"] = 1.3
+    params["a"] = 0.636 + 0.035 * a3
+    params["ai"] = 0.768 + 0.021 * a3
+    params["asi"] = 0.768 + 0.021 * a3
+    params["aso"] = 0.78 + 0.038 * a3
+    params["asoi"] = 0.0
+
+
+def koning_delaroche_proton_potential_array(
+    E: np.ndarray, zt: np.ndarray, at: np.ndarray, params: np.ndarray
+):
+    """Koning-Delaroche proton scattering optical model potential, evaluated over arrays
+
+    See koning_delaroche_proton_potential
+
+    Parameters
+    ----------
+    E: numpy.ndarray
+        The projectile energies in MeV
+    zt: numpy.ndarray
+        The target Z's
+    at: numpy.ndarray
+        The target A's
+    params: numpy.ndarray
+        The structured array (PARAMETER_DTYPE) of parameters to be filled out
+    """
+    nt = at - zt
+    a3 = at ** (0.333)
+
+    v1 = 59.30 + 21.0 * (nt - zt) / at - 0.024 * at
+    v2 = 0.007067 + 4.23e-6 * at
+    v3 = 1.729e-5 + 1.136e-8 * at
+    v4 = 7.0e-9
+
+    w1 = 14.667 + 0.009629 * at
+    w2 = 73.55 + 0.0795 * at
+
+    d1 = 16.0 + 16.0 * (nt - zt) / at
+    d2 = 0.0180 + 0.003802 / (1.0 + np.exp((at - 156.0) / 8.0))
+    d3 = 11.5
+
+    vso1 = 5.922 + 0.0030 * at
+    vso2 = 0.0040
+
+    wso1 = -3.1
+    wso2 = 160
+
+    ef = -8.4075 + 0.01378 * at
+    rc = 1.198 + 0.697 * at ** (-0.666) + 12.994 * at ** (-1.666)
+    vc = 1.73 / rc * zt * a3
+
+    delta_e = E - ef
+    params["V"] = v1 * (
+        1.0 - v2 * delta_e + v3 * delta_e**2.0 - v4 * delta_e**3.0
+    ) + vc * v1 * (v2 - 2.0 * v3 * delta_e + 3.0 * v4 * delta_e**2.0)
+    params["Vi"] = w1 * delta_e**2.0 / (delta_e**2.0 + w2**2.0)
+    params["Vsi"] = (
+        d1 * delta_e**2.0 / (delta_e**2.0 + d3**2.0) * np.exp(-1.0 * d2 * delta_e)
+    )
+    params["Vso"] = vso1 * np.exp(-1.0 * vso2 * delta_e)
+    params["Vsoi"] = wso1 * delta_e**2.0 / (delta_e**2.0 + wso2**2.0)
+    params["r0"] = 1.3039 - 0.4054 / a3
+    params["ri0"] = params["r0"]
+    params["rsi0"] = 1.3424 - 0.01585 * a3
+    params["rso0"] = 1.1854 - 0.647 / a3
+    params["rsoi0"] = params["rso0"]
+    params["rc0"] = rc
+    params["a"] = 0.6778 - 1.487e-4 * at
+    params["ai"] = 0.6778 - 1.487e-4 * at
+    params["asi"] = 0.5187 + 5.205e-4 * at
+    params["aso"] = 0.59
+    params["asoi"] = 0.59
+
+
+def li_liang_cai_triton_potential_array(
+    E: np.ndarray, zt: np.ndarray, at: np.ndarray, params: np.ndarray
+):
+    """Global triton optical model potential, evaluated over arrays
+
+    See li_liang_cai_triton_potential
+
+    Parameters
+    ----------
+    E: numpy.ndarray
+        The projectile energies in MeV
+    zt: numpy.ndarray
+        The target Z's
+    at: numpy.ndarray
+        The target A's
+    params: numpy.ndarray
+        The structured array (PARAMETER_DTYPE) of parameters to be filled out
+    """
+    nt = at - zt
+    a3 = at ** (1.0 / 3.0)
+
+    params["V"] = (
+        137.6 - 0.1456 * E + 0.0436 * E**2 + 4.3751 * (nt - zt) / at + 1.0474 * zt / a3
+    )
+    params["r0"] = 1.1201 - 0.1504 / a3
+    params["a"] = 0.6833 + 0.0191 * a3
+
+    params["Vi"] = 7.383 + 0.5025 * E - 0.0097 * E**2
+    params["ri0"] = 1.3202 - 0.1776 / a3
+    params["ai"] = 1.119 + 0.01913 * a3
+
+    params["Vsi"] = 37.06 - 0.6451 * E - 47.19 * (nt - zt) / at
+    params["rsi0"] = 1.251 - 0.4622 / a3
+    params["asi"] = 0.8114 + 0.01159 * a3
+
+    params["Vso"] = 1.9029
+    params["rso0"] = 0.46991 + 0.1294 / a3
+    params["aso"] = 0.3545 - 0.0522 * a3
+
+    params["Vsoi"] = 0.0
+    params["rsoi0"] = 0.0
+    params["asoi"] = 0.0
+
+    params["rc0"] = 1.422
+
+
+# Dictionary connecting each keyword to the array function for each potential
+POTENTIALS_ARRAY: dict[
+    str, Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], None]
+] = {
+    AN_CAI: an_cai_potential_array,
+    DAEHNICK: daehnick_potential_array,
+    BOJOWALD: bojowald_potential_array,
+    KONING_DELAROCHE_PROTON: koning_delaroche_proton_potential_array,
+    LI_LIANG_CAI_TRITON: li_liang_cai_triton_potential_array,
+}
+
+
+def create_parameters_array(
+    E: np.ndarray, zt: np.ndarray, at: np.ndarray, potential: str
+) -> np.ndarray:
+    """Create the optical model potential parameters for many energies and targets at once
+
+    The arguments are broadcast against each other, so a grid of energies can be paired
+    with a single target, or a set of targets with a single energy. The parameters are
+    evaluated with numpy over the whole grid, rather than one call per point.
+
+    Parameters
+    ----------
+    E: numpy.ndarray
+        The normal kinematics beam energies in MeV
+    zt: numpy.ndarray
+        The target Z's
+    at: numpy.ndarray
+        The target A's
+    potential: str
+        The potential keyword
+
+    Returns
+    -------
+    numpy.ndarray
+        A structured array (PARAMETER_DTYPE) of optical model parameters with the
+        broadcast shape of the arguments. params["V"][i] is the V of point i
+    """
+    if potential not in POTENTIALS_ARRAY.keys():
+        raise Exception(
+            f"Potential {potential} is not in the set of allowed Potentials {POTENTIALS_ARRAY.keys()}!"
+        )
+
+    E, zt, at = np.broadcast_arrays(
+        np.asarray(E, dtype=np.float64),
+        np.asarray(zt, dtype=np.float64),
+        np.asarray(at, dtype=np.float64),
+    )
+    params = np.zeros(E.shape, dtype=PARAMETER_DTYPE)
+
+    POTENTIALS_ARRAY[potential](E, zt, at, params)
 
     return params
@@ -0,0 +1,296 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import CodeType
+from typing import Any, Callable, Iterator
+from json import load
+import ast
+import numpy as np
+
+from .potentials import (
+    PARAMETER_NAMES,
+    POTENTIALS,
+    POTENTIALS_ARRAY,
+    POTENTIAL_VALIDITY,
+    PotentialParameters,
+    clear_parameter_cache,
+)
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11, only JSON definitions can be read
+    tomllib = None
+
+# The names every expression can use for the projectile energy, target Z, and target A
+INPUT_NAMES = ("E", "zt", "at")
+
+# The functions expressions can call. All of them work on scalars and arrays alike
+EXPRESSION_FUNCTIONS: dict[str, Callable[..., Any]] = {
+    "exp": np.exp,
+    "log": np.log,
+    "sqrt": np.sqrt,
+    "abs": np.abs,
+    "where": np.where,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+}
+
+# The syntax allowed in an expression: arithmetic, comparisons, names, and calls
+EXPRESSION_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.Pow,
+    ast.USub,
+    ast.UAdd,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+)
+
+
+@dataclass
+class PotentialDefinition:
+    """A declarative definition of an optical model potential
+
+    Each parameter is given as an expression of the projectile energy E, target Z zt,
+    and target A at, written like the Python of hieroglyph.potentials (for example
+    "88.0 - 0.283 * E + 0.88 * zt / at ** 0.333"). Expressions can also use the
+    functions of EXPRESSION_FUNCTIONS (where(cond, a, b) in place of an if), any of the
+    variables, and any parameter defined before them. Parameters which are not given
+    are 0.0.
+
+    Attributes
+    ----------
+    name: str
+        The potential keyword
+    parameters: dict[str, str]
+        The expression for each parameter, keyed by the names of PARAMETER_NAMES
+    variables: dict[str, str]
+        Named intermediate expressions, evaluated in order before the parameters
+    validity: dict[str, tuple[float, float]]
+        The range (min, max) of E, zt, and at the potential was fit over
+    reference: str
+        Where the potential comes from
+    """
+
+    name: str = "Invalid"
+    parameters: dict[str, str] = field(default_factory=dict)
+    variables: dict[str, str] = field(default_factory=dict)
+    validity: dict[str, tuple[float, float]] = field(default_factory=dict)
+    reference: str = ""
+
+
+def compile_expression(expression: str, known_names: set[str]) -> CodeType:
+    """Check and compile a single expression of a potential definition
+
+    Parameters
+    ----------
+    expression: str
+        The expression
+    known_names: set[str]
+        The names the expression may use
+
+    Returns
+    -------
+    types.CodeType
+        The compiled expression
+    """
+    tree = ast.parse(str(expression), mode="eval")
+    for node in ast.walk(tree):
+        if not isinstance(node, EXPRESSION_NODES):
+            raise Exception(
+                f"Expression {expression} uses {type(node).__name__}, which is not allowed in a potential!"
+            )
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise Exception(
+                f"Expression {expression} has the non-numeric constant {node.value!r}!"
+            )
+        if isinstance(node, ast.Call):
+            if (
+                not isinstance(node.func, ast.Name)
+                or node.func.id not in EXPRESSION_FUNCTIONS
+            ):
+                raise Exception(
+                    f"Expression {expression} calls a function which is not in the set of allowed functions {EXPRESSION_FUNCTIONS.keys()}!"
+                )
+            if len(node.keywords) > 0:
+                raise Exception(
+                    f"Expression {expression} passes keyword arguments, which are not allowed in a potential!"
+                )
+        elif (
+            isinstance(node, ast.Name)
+            and node.id not in known_names
+            and node.id not in EXPRESSION_FUNCTIONS
+        ):
+            raise Exception(
+                f"Expression {expression} uses {node.id}, which is not defined before it!"
+            )
+    return compile(tree, f"<potential expression {expression}>", "eval")
+
+
+def compile_potential(
+    definition: PotentialDefinition,
+) -> Callable[[Any, Any, Any], Iterator[tuple[str, Any]]]:
+    """Check and compile every expression of a potential definition
+
+    Parameters
+    ----------
+    definition: PotentialDefinition
+        The potential definition
+
+    Returns
+    -------
+    Callable[[Any, Any, Any], Iterator[tuple[str, Any]]]
+        A function of (E, zt, at) giving back each (parameter name, value). It works
+        on floats and on (broadcastable) numpy arrays alike
+    """
+    for name in definition.parameters.keys():
+        if name not in PARAMETER_NAMES:
+            raise Exception(
+                f"Potential {definition.name} defines {name}, which is not in the set of parameters {PARAMETER_NAMES}!"
+            )
+    for name in definition.validity.keys():
+        if name not in INPUT_NAMES:
+            raise Exception(
+                f"Potential {definition.name} has a range of validity for {name}, which is not in {INPUT_NAMES}!"
+            )
+
+    known_names = set(INPUT_NAMES)
+    variables = []
+    for name, expression in definition.variables.items():
+        if name in EXPRESSION_FUNCTIONS or name in INPUT_NAMES:
+            raise Exception(
+                f"Potential {definition.name} defines the variable {name}, which would hide an input or function!"
+            )
+        variables.append((name, compile_expression(expression, known_names)))
+        known_names.add(name)
+    parameters = []
+    for name, expression in definition.parameters.items():
+        parameters.append((name, compile_expression(expression, known_names)))
+        known_names.add(name)
+
+    def evaluate(E: Any, zt: Any, at: Any) -> Iterator[tuple[str, Any]]:
+        namespace: dict[str, Any] = {"E": E, "zt": zt, "at": at}
+        namespace.update(EXPRESSION_FUNCTIONS)
+        for name, code in variables:
+            namespace[name] = eval(code, {"__builtins__": {}}, namespace)
+        for name, code in parameters:
+            namespace[name] = eval(code, {"__builtins__": {}}, namespace)
+            yield name, namespace[name]
+
+    return evaluate
+
+
+def register_potential(definition: PotentialDefinition, replace: bool = False):
+    """Compile a potential definition and make it available by its keyword
+
+    The potential is compiled once here. Afterwards it is used like the built-in
+    potentials, by create_parameters, create_parameters_array, find_out_of_range,
+    and the configurations of hieroglyph create.
+
+    Parameters
+    ----------
+    definition: PotentialDefinition
+        The potential definition
+    replace: bool
+        If True, a potential which already has the keyword is replaced. Otherwise
+        this is an error (default False)
+    """
+    if definition.name in POTENTIALS.keys() and not replace:
+        raise Exception(
+            f"Potential {definition.name} is already defined! Pass replace=True to replace it"
+        )
+    evaluate = compile_potential(definition)
+
+    def potential(E: float, zt: int, at: int, params: PotentialParameters):
+        for name, value in evaluate(E, zt, at):
+            params[name] = float(value)
+
+    def potential_array(
+        E: np.ndarray, zt: np.ndarray, at: np.ndarray, params: np.ndarray
+    ):
+        for name, value in evaluate(E, zt, at):
+            params[name] = value
+
+    POTENTIALS[definition.name] = potential
+    POTENTIALS_ARRAY[definition.name] = potential_array
+    POTENTIAL_VALIDITY[definition.name] = {
+        name: (float(low), float(high))
+        for name, (low, high) in definition.validity.items()
+    }
+    # Anything remembered under this keyword is now stale
+    clear_parameter_cache()
+
+
+def load_potential_definitions(path: Path) -> list[PotentialDefinition]:
+    """Read the potential definitions of a JSON or TOML file
+
+    The file holds a list of potentials under the key "potentials" (an array of
+    tables, [[potentials]], in TOML), each with the fields of PotentialDefinition.
+
+    Parameters
+    ----------
+    path: Path
+        The path to the .json or .toml file
+
+    Returns
+    -------
+    list[PotentialDefinition]
+        The potential definitions, in the order of the file
+    """
+    path = Path(path)
+    if path.suffix == ".toml":
+        if tomllib is None:
+            raise Exception(
+                "Reading TOML potential definitions requires Python 3.11 or newer!"
+            )
+        with open(path, "rb") as definition_file:
+            data = tomllib.load(definition_file)
+    else:
+        with open(path, "r") as definition_file:
+            data = load(definition_file)
+
+    if "potentials" not in data:
+        raise Exception(f"Potential definition file {path} has no potentials!")
+    definitions = []
+    for entry in data["potentials"]:
+        definition = PotentialDefinition()
+        for key in entry.keys():
+            if key not in definition.__dict__:
+                raise Exception(
+                    f"Potential definition field {key} in {path} is not in the set of allowed fields {tuple(definition.__dict__.keys())}!"
+                )
+            definition.__dict__[key] = entry[key]
+        definitions.append(definition)
+    return definitions
+
+
+def register_potential_file(path: Path, replace: bool = False) -> list[str]:
+    """Register every potential defined in a JSON or TOML file
+
+    Parameters
+    ----------
+    path: Path
+        The path to the .json or .toml file
+    replace: bool
+        If True, potentials which already have a keyword are replaced (default False)
+
+    Returns
+    -------
+    list[str]
+        The keywords of the registered potentials
+    """
+    definitions = load_potential_definitions(path)
+    for definition in definitions:
+        register_potential(definition, replace)
+    return [definition.name for definition in definitions]
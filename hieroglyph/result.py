@@ -0,0 +1,253 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+import numpy as np
+
+# Keyword for each output format
+FORMAT_NPZ_COMPRESSED = "npz-compressed"
+FORMAT_NPZ = "npz"
+FORMAT_NPY = "npy"
+
+OUTPUT_FORMATS = (FORMAT_NPZ_COMPRESSED, FORMAT_NPZ, FORMAT_NPY)
+
+# Bytes reserved for the header of a growing .npy file, so it can be rewritten in place
+NPY_APPEND_HEADER_SIZE = 128
+
+
+@dataclass
+class CrossSectionResult:
+    """The parsed differential cross section of a PTOLEMY calculation
+
+    Elastic results only fill the angle and cross arrays. DWBA results
+    also fill cross_ls and l_values. The remaining arrays are only filled
+    when the extra tables are asked for.
+
+    Attributes
+    ----------
+    angle: numpy.ndarray
+        The center-of-mass angles (degrees)
+    cross: numpy.ndarray
+        The center-of-mass differential cross section (mb/sr)
+    cross_ls: numpy.ndarray | None
+        The center-of-mass differential cross section for each l, shape (l, angle)
+    l_values: numpy.ndarray | None
+        The orbital angular momenta of each row of cross_ls
+    ratio_rutherford: numpy.ndarray | None
+        The ratio of the elastic cross section to the Rutherford cross section
+    analyzing_power: numpy.ndarray | None
+        The analyzing power of the DWBA reaction
+    total_cross: numpy.ndarray | None
+        The total (reaction) cross section of each calculation (mb)
+    total_cross_ls: numpy.ndarray | None
+        The total cross section for each l of each calculation (mb), shape (l, calculation)
+
+    Methods
+    -------
+    arrays()
+        Get the named arrays of the result
+    """
+
+    angle: np.ndarray = field(default_factory=lambda: np.empty(0))
+    cross: np.ndarray = field(default_factory=lambda: np.empty(0))
+    cross_ls: np.ndarray | None = None
+    l_values: np.ndarray | None = None
+    ratio_rutherford: np.ndarray | None = None
+    analyzing_power: np.ndarray | None = None
+    total_cross: np.ndarray | None = None
+    total_cross_ls: np.ndarray | None = None
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Get the named arrays of the result
+
+        Arrays which were not filled are left out.
+
+        Returns
+        -------
+        dict[str, numpy.ndarray]
+            The arrays keyed by the names used in the .npz files
+        """
+        return {key: value for key, value in self.__dict__.items() if value is not None}
+
+
+def write_arrays(
+    arrays: dict[str, np.ndarray],
+    parsed_path: Path,
+    output_format: str = FORMAT_NPZ_COMPRESSED,
+    compression_level: int | None = None,
+) -> None:
+    """Write a set of named arrays to disk
+
+    Parameters
+    ----------
+    arrays: dict[str, numpy.ndarray]
+        The arrays to write
+    parsed_path: Path
+        Path to which the data will be written. For the npy format this is a directory
+    output_format: str
+        One of OUTPUT_FORMATS (default npz-compressed)
+    compression_level: int | None
+        The zlib compression level (0-9) of the npz-compressed format. None uses
+        the zlib default
+    """
+    parsed_path = Path(parsed_path)
+    if output_format == FORMAT_NPY:
+        parsed_path.mkdir(parents=True, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(parsed_path / f"{name}.npy", array, allow_pickle=False)
+        return
+    elif output_format == FORMAT_NPZ_COMPRESSED:
+        compression = ZIP_DEFLATED
+    elif output_format == FORMAT_NPZ:
+        compression = ZIP_STORED
+        compression_level = None
+    else:
+        raise Exception(
+            f"Output format {output_format} is not in the set of allowed formats {OUTPUT_FORMATS}!"
+        )
+
+    # Same as numpy.savez, but lets us pick the compression level
+    if parsed_path.suffix != ".npz":
+        parsed_path = parsed_path.with_name(f"{parsed_path.name}.npz")
+    with ZipFile(
+        parsed_path, "w", compression=compression, compresslevel=compression_level
+    ) as npz_file:
+        for name, array in arrays.items():
+            with npz_file.open(f"{name}.npy", "w", force_zip64=True) as npy_file:
+                np.lib.format.write_array(
+                    npy_file, np.asanyarray(array), allow_pickle=False
+                )
+
+
+def load_arrays(parsed_path: Path, mmap: bool = False) -> dict[str, np.ndarray]:
+    """Load a set of named arrays written by write_arrays
+
+    Parameters
+    ----------
+    parsed_path: Path
+        Path to the .npz file or npy directory
+    mmap: bool
+        If True, the arrays of an npy directory are memory-mapped read-only instead of
+        read into memory. Ignored for .npz files (default False)
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        The arrays keyed by name
+    """
+    parsed_path = Path(parsed_path)
+    if parsed_path.is_dir():
+        mmap_mode = "r" if mmap else None
+        return {
+            npy_path.stem: np.load(npy_path, mmap_mode=mmap_mode)
+            for npy_path in sorted(parsed_path.glob("*.npy"))
+        }
+    with np.load(parsed_path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def write_result(
+    result: CrossSectionResult,
+    parsed_path: Path,
+    output_format: str = FORMAT_NPZ_COMPRESSED,
+    compression_level: int | None = None,
+) -> None:
+    """Write a parsed result to disk
+
+    Parameters
+    ----------
+    result: CrossSectionResult
+        The parsed result
+    parsed_path: Path
+        Path to which the parsed data will be written
+    output_format: str
+        One of OUTPUT_FORMATS (default npz-compressed)
+    compression_level: int | None
+        The zlib compression level (0-9) of the npz-compressed format. None uses
+        the zlib default
+    """
+    write_arrays(result.arrays(), parsed_path, output_format, compression_level)
+
+
+def load_result(parsed_path: Path, mmap: bool = False) -> CrossSectionResult:
+    """Load a parsed result written by write_result
+
+    Parameters
+    ----------
+    parsed_path: Path
+        Path to the .npz file or npy directory
+    mmap: bool
+        If True, the arrays of an npy directory are memory-mapped read-only (default False)
+
+    Returns
+    -------
+    CrossSectionResult
+        The parsed result
+    """
+    return CrossSectionResult(**load_arrays(parsed_path, mmap))
+
+
+class NpyAppender:
+    """A .npy file of float64 which rows can be appended to
+
+    The header is given a fixed amount of space so that it can be rewritten in place
+    with the new shape after every append, and the file stays a valid .npy which can
+    be loaded (or memory-mapped) at any time. Two dimensional arrays are stored in
+    Fortran order with the rows along the second axis, so that the cross_ls layout
+    (l, angle) can grow along the angle axis.
+
+    Attributes
+    ----------
+    path: Path
+        The path to the .npy file
+    width: int | None
+        The length of each row, None for a one dimensional array
+    size: int
+        The number of rows written
+
+    Methods
+    -------
+    append(rows)
+        Append rows to the file
+    close()
+        Close the file
+    """
+
+    def __init__(self, path: Path, width: int | None = None):
+        self.path = path
+        self.width = width
+        self.size = 0
+        self.file = open(path, "wb")
+        self.write_header()
+
+    def write_header(self):
+        if self.width is None:
+            header = (
+                f"{{'descr': '<f8', 'fortran_order': False, 'shape': ({self.size},), }}"
+            )
+        else:
+            header = f"{{'descr': '<f8', 'fortran_order': True, 'shape': ({self.width}, {self.size}), }}"
+        header_length = NPY_APPEND_HEADER_SIZE - len(np.lib.format.MAGIC_PREFIX) - 4
+        self.file.seek(0)
+        self.file.write(np.lib.format.MAGIC_PREFIX + bytes([1, 0]))
+        self.file.write(header_length.to_bytes(2, "little"))
+        self.file.write(header.ljust(header_length - 1).encode("latin1") + b"\n")
+        self.file.seek(0, 2)
+
+    def append(self, rows: np.ndarray):
+        """Append rows to the file
+
+        Parameters
+        ----------
+        rows: numpy.ndarray
+            The rows, with shape (rows,) or (rows, width)
+        """
+        self.file.write(np.ascontiguousarray(rows, dtype="<f8").tobytes())
+        self.size += len(rows)
+        # Data first, then the header, so readers never see rows that are not there
+        self.file.flush()
+        self.write_header()
+        self.file.flush()
+
+    def close(self):
+        """Close the file"""
+        self.file.close()
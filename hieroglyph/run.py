@@ -0,0 +1,725 @@
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    FIRST_COMPLETED,
+    wait,
+)
+from json import load
+from pathlib import Path
+from typing import Iterator, TextIO
+import gzip
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+
+from .cache import RunCache, hash_file, hash_key
+from .config import Config, deserialize_config
+from .create import create_input, unbundle_input
+from .index import read_reactions
+from .parse import PARSER_VERSION
+from .result import CrossSectionResult
+from .sweep import (
+    SweepPoint,
+    DEFAULT_OUTPUT_SUFFIX,
+    get_sweep_output_path,
+    match_sweep_outputs,
+    read_manifest,
+    read_manifest_base,
+)
+
+# Environment variable naming the PTOLEMY executable
+PTOLEMY_ENV = "HIEROGLYPH_PTOLEMY"
+DEFAULT_PTOLEMY = "ptolemy"
+
+# Attempts after the first for a job which fails or times out
+DEFAULT_RETRIES = 1
+
+# Characters of PTOLEMY's stderr kept in the error of a failed job
+STDERR_TAIL_LENGTH = 500
+
+# Characters of PTOLEMY's output held in memory per run, past which the output is
+# spilled to a temporary file next to it, so a huge output is never held whole
+OUTPUT_SPOOL_SIZE = 64 << 20
+# Characters read from PTOLEMY's stdout at a time
+OUTPUT_READ_SIZE = 1 << 20
+
+# How the raw text of PTOLEMY's output is kept: not at all, as is, or gzip-compressed
+RAW_NONE = "none"
+RAW_TEXT = "text"
+RAW_GZIP = "gzip"
+RAW_FORMATS = (RAW_NONE, RAW_TEXT, RAW_GZIP)
+
+
+def default_ptolemy() -> str:
+    """Get the PTOLEMY executable to run
+
+    This is $HIEROGLYPH_PTOLEMY if set, otherwise ptolemy (found on the PATH)
+
+    Returns
+    -------
+    str
+        The executable
+    """
+    return os.environ.get(PTOLEMY_ENV, DEFAULT_PTOLEMY)
+
+
+def find_ptolemy(executable: str) -> str:
+    """Resolve the PTOLEMY executable to a path
+
+    Parameters
+    ----------
+    executable: str
+        A path, or a name to look up on the PATH
+
+    Returns
+    -------
+    str
+        The path of the executable
+    """
+    path = shutil.which(executable)
+    if path is None:
+        raise Exception(
+            f"PTOLEMY executable {executable} was not found! Set it with --ptolemy or ${PTOLEMY_ENV}"
+        )
+    return path
+
+
+def get_run_key(text: str, ptolemy_hash: str) -> str:
+    """Get the run cache key of an input
+
+    Parameters
+    ----------
+    text: str
+        The text of the input
+    ptolemy_hash: str
+        The hash of the PTOLEMY executable (see hieroglyph.cache.hash_file)
+
+    Returns
+    -------
+    str
+        The cache key, which also changes with PARSER_VERSION
+    """
+    return hash_key(text, ptolemy_hash, PARSER_VERSION)
+
+
+def get_reaction_keys(text: str, ptolemy_hash: str) -> list[str]:
+    """Get the run cache key of each reaction of an input
+
+    The keys are made from the text of each reaction without the tags of
+    hieroglyph.create.bundle_inputs (see hieroglyph.create.unbundle_input), so a
+    reaction has the same key whichever bundle, or sweep point, it is in.
+
+    Parameters
+    ----------
+    text: str
+        The text of the input, bundled or not
+    ptolemy_hash: str
+        The hash of the PTOLEMY executable (see hieroglyph.cache.hash_file)
+
+    Returns
+    -------
+    list[str]
+        The cache key of each reaction, in order
+    """
+    return [get_run_key(reaction, ptolemy_hash) for reaction in unbundle_input(text)]
+
+
+def get_cached_reactions(
+    cache: RunCache, reaction_keys: list[str]
+) -> list[tuple[str, CrossSectionResult]] | None:
+    """Look up the calculations of every reaction of an input
+
+    Parameters
+    ----------
+    cache: RunCache
+        The cache of runs
+    reaction_keys: list[str]
+        The cache key of each reaction (see get_reaction_keys)
+
+    Returns
+    -------
+    list[tuple[str, CrossSectionResult]] | None
+        The kind and result of each calculation, or None if any reaction is missing
+    """
+    reactions = []
+    for key in reaction_keys:
+        cached = cache.get_reactions(key)
+        if cached is None:
+            return None
+        reactions.extend(cached)
+    return reactions
+
+
+def put_cached_reactions(
+    cache: RunCache,
+    reaction_keys: list[str],
+    reactions: list[tuple[str, CrossSectionResult]],
+):
+    """Store the calculations of an input, one entry per reaction
+
+    Parameters
+    ----------
+    cache: RunCache
+        The cache of runs
+    reaction_keys: list[str]
+        The cache key of each reaction (see get_reaction_keys)
+    reactions: list[tuple[str, CrossSectionResult]]
+        The kind and result of each calculation of the run
+    """
+    if len(reaction_keys) == 1:
+        cache.put_reactions(reaction_keys[0], reactions)
+    elif len(reactions) == len(reaction_keys):
+        for key, reaction in zip(reaction_keys, reactions):
+            cache.put_reactions(key, [reaction])
+    # Otherwise the calculations can not be told apart by reaction, so none are kept
+
+
+def get_raw_path(output_path: Path, raw_format: str) -> Path | None:
+    """Get the path the raw text of an output is kept at
+
+    Parameters
+    ----------
+    output_path: Path
+        The path of the output
+    raw_format: str
+        One of RAW_FORMATS
+
+    Returns
+    -------
+    Path | None
+        The output path, with .gz appended for RAW_GZIP. None for RAW_NONE
+    """
+    if raw_format == RAW_TEXT:
+        return output_path
+    elif raw_format == RAW_GZIP:
+        return output_path.with_name(f"{output_path.name}.gz")
+    elif raw_format == RAW_NONE:
+        return None
+    raise Exception(
+        f"Raw output format {raw_format} is not in the set of allowed formats {RAW_FORMATS}!"
+    )
+
+
+def write_raw_output(raw_path: Path | None, raw_format: str, output: str | Path):
+    if raw_path is None:
+        return
+    raw_file = (
+        gzip.open(raw_path, "wt") if raw_format == RAW_GZIP else open(raw_path, "w")
+    )
+    with raw_file:
+        if isinstance(output, Path):
+            with open(output, "r") as spool:
+                shutil.copyfileobj(spool, raw_file, OUTPUT_READ_SIZE)
+        else:
+            raw_file.write(output)
+
+
+def read_output(stdout: TextIO, output_path: Path) -> str | Path:
+    """Read the output of a PTOLEMY run from its stdout
+
+    The output is held in memory up to OUTPUT_SPOOL_SIZE characters. Past that it
+    is spilled to a temporary file next to the output path, and the path of the file
+    is given instead of the text.
+
+    Parameters
+    ----------
+    stdout: TextIO
+        PTOLEMY's stdout
+    output_path: Path
+        The path of the output, next to which a large output is spilled
+
+    Returns
+    -------
+    str | Path
+        The text of the output, or the path of the temporary file holding it
+    """
+    chunks: list[str] = []
+    size = 0
+    while size <= OUTPUT_SPOOL_SIZE:
+        chunk = stdout.read(OUTPUT_READ_SIZE)
+        if not chunk:
+            return "".join(chunks)
+        chunks.append(chunk)
+        size += len(chunk)
+    spool = tempfile.NamedTemporaryFile(
+        "w",
+        dir=output_path.parent,
+        prefix=f"{output_path.name}.",
+        suffix=".partial",
+        delete=False,
+    )
+    try:
+        with spool:
+            spool.writelines(chunks)
+            chunks.clear()
+            shutil.copyfileobj(stdout, spool, OUTPUT_READ_SIZE)
+    except OSError:
+        discard_output(Path(spool.name))
+        raise
+    return Path(spool.name)
+
+
+def discard_output(output: str | Path):
+    # Only a spilled output has anything to clean up
+    if isinstance(output, Path):
+        output.unlink(missing_ok=True)
+
+
+def feed_input(stdin: TextIO, text: str):
+    # Written from its own thread, as a large (bundled) input would otherwise fill
+    # the pipe and deadlock against PTOLEMY's output
+    try:
+        stdin.write(text)
+        stdin.close()
+    except (BrokenPipeError, OSError):
+        pass
+
+
+def execute_ptolemy(
+    executable: str,
+    input_path: Path,
+    output_path: Path,
+    timeout: float | None = None,
+    retries: int = DEFAULT_RETRIES,
+    raw_format: str = RAW_NONE,
+    text: str | None = None,
+) -> tuple[str | Path, str]:
+    """Run PTOLEMY on a single input, reading its output straight from the pipe
+
+    The input is fed to PTOLEMY's stdin and its stdout is read into memory, so the
+    text does not have to go through the filesystem, unless it is too large to hold
+    (see read_output). A run which exits with an error or
+    runs past the timeout is retried, and a run past the timeout is killed along
+    with any processes it started. Nothing here holds the GIL for long, so many
+    runs can be watched from threads at once.
+
+    Parameters
+    ----------
+    executable: str
+        The PTOLEMY executable
+    input_path: Path
+        The path of the input
+    output_path: Path
+        The path of the output, where the raw text is kept if asked for
+    timeout: float | None
+        The time limit of each attempt in seconds. None waits forever
+    retries: int
+        The number of attempts after the first (default DEFAULT_RETRIES)
+    raw_format: str
+        How the raw text is kept, one of RAW_FORMATS (default RAW_NONE)
+    text: str | None
+        The text of the input, if it has already been read. None reads it from
+        input_path (default None)
+
+    Returns
+    -------
+    tuple[str | Path, str]
+        The text of the output, or the path of the temporary file holding a large
+        output (see read_output), and the error of the last attempt (empty if
+        PTOLEMY succeeded). A temporary file is only given on success, and is for the
+        caller to remove
+    """
+    raw_path = get_raw_path(output_path, raw_format)
+    try:
+        if text is None:
+            with open(input_path, "r") as ptolemy_input:
+                text = ptolemy_input.read()
+    except OSError as exception:
+        return "", f"Could not read the input {input_path}: {exception}"
+    error = ""
+    for _ in range(retries + 1):
+        with tempfile.TemporaryFile("w+") as stderr:
+            try:
+                process = subprocess.Popen(
+                    [executable],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=stderr,
+                    text=True,
+                    start_new_session=True,
+                )
+            except OSError as exception:
+                return "", f"Could not start PTOLEMY on {input_path}: {exception}"
+            timed_out = threading.Event()
+
+            # PTOLEMY is often started through a wrapper script, so the whole process
+            # group is killed, otherwise its children would keep the pipe open
+            def kill():
+                if process.poll() is not None:
+                    return
+                timed_out.set()
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+            timer = None if timeout is None else threading.Timer(timeout, kill)
+            if timer is not None:
+                timer.start()
+            feeder = threading.Thread(target=feed_input, args=(process.stdin, text))
+            feeder.start()
+            spool_error = None
+            try:
+                output = read_output(process.stdout, output_path)
+            except OSError as exception:
+                # PTOLEMY would block on a pipe nobody reads
+                output, spool_error = "", exception
+                kill()
+            process.stdout.close()
+            process.wait()
+            feeder.join()
+            if timer is not None:
+                timer.cancel()
+                timer.join()
+
+            if spool_error is not None:
+                return "", f"Could not spill the output of {input_path}: {spool_error}"
+            # The timer can fire after PTOLEMY has already finished on its own
+            if timed_out.is_set() and process.returncode != 0:
+                discard_output(output)
+                error = f"PTOLEMY timed out after {timeout} s on {input_path}"
+                continue
+            if process.returncode != 0:
+                discard_output(output)
+                stderr.seek(0)
+                error = f"PTOLEMY exited with code {process.returncode} on {input_path}: {stderr.read()[-STDERR_TAIL_LENGTH:]}"
+                continue
+            try:
+                write_raw_output(raw_path, raw_format, output)
+            except OSError as exception:
+                discard_output(output)
+                return "", f"Could not keep the raw output of {input_path}: {exception}"
+            return output, ""
+    return "", error
+
+
+def parse_run_output(
+    output: str | Path, input_path: Path
+) -> tuple[list[tuple[str, CrossSectionResult]], str]:
+    """Parse every calculation of the output of a PTOLEMY run
+
+    Parameters
+    ----------
+    output: str | Path
+        The text of the output, or the path of the temporary file holding it (see
+        read_output), which is streamed through the parser and then removed
+    input_path: Path
+        The path of the input, for the error
+
+    Returns
+    -------
+    tuple[list[tuple[str, CrossSectionResult]], str]
+        The (kind, result) of each calculation of the output, and the error (empty
+        on success)
+    """
+    try:
+        if isinstance(output, Path):
+            with open(output, "r") as lines:
+                return read_reactions(lines), ""
+        return read_reactions(iter(output.splitlines(keepends=True))), ""
+    except Exception as exception:
+        return [], f"Could not parse the output of {input_path}: {exception}"
+    finally:
+        discard_output(output)
+
+
+def run_ptolemy(
+    executable: str,
+    input_path: Path,
+    output_path: Path,
+    timeout: float | None = None,
+    retries: int = DEFAULT_RETRIES,
+    raw_format: str = RAW_NONE,
+    text: str | None = None,
+) -> tuple[list[tuple[str, CrossSectionResult]], str]:
+    """Run PTOLEMY on a single input and parse its output
+
+    See execute_ptolemy for the run, and parse_run_output for the parse.
+
+    Parameters
+    ----------
+    executable: str
+        The PTOLEMY executable
+    input_path: Path
+        The path of the input
+    output_path: Path
+        The path of the output, where the raw text is kept if asked for
+    timeout: float | None
+        The time limit of each attempt in seconds. None waits forever
+    retries: int
+        The number of attempts after the first (default DEFAULT_RETRIES)
+    raw_format: str
+        How the raw text is kept, one of RAW_FORMATS (default RAW_NONE)
+    text: str | None
+        The text of the input, if it has already been read. None reads it from
+        input_path (default None)
+
+    Returns
+    -------
+    tuple[list[tuple[str, CrossSectionResult]], str]
+        The (kind, result) of each calculation of the output, and the error (empty
+        if PTOLEMY succeeded and its output could be parsed)
+    """
+    output, error = execute_ptolemy(
+        executable, input_path, output_path, timeout, retries, raw_format, text
+    )
+    if error:
+        return [], error
+    return parse_run_output(output, input_path)
+
+
+def run_inputs(
+    input_paths: list[Path],
+    executable: str,
+    n_workers: int | None = None,
+    timeout: float | None = None,
+    retries: int = DEFAULT_RETRIES,
+    suffix: str = DEFAULT_OUTPUT_SUFFIX,
+    raw_format: str = RAW_NONE,
+    cache: RunCache | None = None,
+) -> dict[Path, tuple[list[tuple[str, CrossSectionResult]], str]]:
+    """Run PTOLEMY on many inputs, parsing the outputs in a pool of processes
+
+    Up to n_workers PTOLEMY processes run at once, each watched by a thread which
+    feeds its input and reads its output (see execute_ptolemy). Each output is then
+    handed to a pool of n_workers processes to be parsed (see parse_run_output), so
+    the parsing of many runs is not held to a single core by the GIL. An output is
+    handed over as its text, or, past OUTPUT_SPOOL_SIZE, as a temporary file which
+    the worker streams, so no run holds more than that in memory.
+
+    Runs are content-addressed and cached per reaction: the key of each reaction of
+    an input is the hash of its untagged text together with the hash of the PTOLEMY
+    executable (see get_reaction_keys). If the cache has an entry for every reaction
+    of an input, PTOLEMY is not run at all. The cache only holds the parsed results,
+    so it is not read when the raw text is asked for (it is still filled). Inputs
+    with the same reactions as one which is already running wait for its result
+    rather than running again, cache or not, and are given a copy of its raw text.
+    An input which can not be read or run only fails its own outputs.
+
+    Parameters
+    ----------
+    input_paths: list[Path]
+        The paths of the inputs
+    executable: str
+        The PTOLEMY executable
+    n_workers: int | None
+        The number of PTOLEMY processes to run, and outputs to parse, at once. None
+        uses one per CPU
+    timeout: float | None
+        The time limit of each run in seconds. None waits forever
+    retries: int
+        The number of times a failed run is retried (default DEFAULT_RETRIES)
+    suffix: str
+        The suffix of the outputs, which replaces that of the inputs (default .out)
+    raw_format: str
+        How the raw text of each output is kept, one of RAW_FORMATS (default
+        RAW_NONE)
+    cache: RunCache | None
+        The cache of runs, filled with every successful run. None always runs
+        (default None)
+
+    Returns
+    -------
+    dict[Path, tuple[list[tuple[str, CrossSectionResult]], str]]
+        The (kind, result) of each reaction of each output, and the error (empty on
+        success) of running or parsing it, keyed by output path
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    executable = find_ptolemy(executable)
+    ptolemy_hash = hash_file(Path(executable))
+    jobs: Iterator[tuple[Path, Path]] = (
+        (Path(input_path), get_sweep_output_path(Path(input_path), suffix))
+        for input_path in input_paths
+    )
+    outputs: dict[Path, tuple[list[tuple[str, CrossSectionResult]], str]] = {}
+    # The reaction keys, and the outputs waiting on the run, of each key
+    waiting: dict[str, tuple[list[str], list[Path]]] = {}
+
+    def finish(
+        key: str,
+        reactions: list[tuple[str, CrossSectionResult]],
+        error: str,
+        kept_raw: bool,
+    ):
+        reaction_keys, output_paths = waiting.pop(key)
+        if cache is not None and not error and len(reactions) > 0:
+            put_cached_reactions(cache, reaction_keys, reactions)
+        outputs[output_paths[0]] = (reactions, error)
+        # Only the first output was run, the others get a copy of its raw text
+        raw_path = get_raw_path(output_paths[0], raw_format)
+        for output_path in output_paths[1:]:
+            outputs[output_path] = (reactions, error)
+            if raw_path is None or not kept_raw:
+                continue
+            try:
+                shutil.copyfile(raw_path, get_raw_path(output_path, raw_format))
+            except OSError as exception:
+                outputs[output_path] = (
+                    reactions,
+                    f"Could not keep the raw output of {output_path}: {exception}",
+                )
+
+    with ThreadPoolExecutor(max_workers=n_workers) as runners, ProcessPoolExecutor(
+        max_workers=n_workers
+    ) as parsers:
+        running: dict[Future, tuple[str, Path]] = {}
+        parsing: dict[Future, tuple[str, str | Path]] = {}
+        while True:
+            # Keep the pool full, without queueing every job of a huge sweep at once
+            for input_path, output_path in jobs:
+                try:
+                    with open(input_path, "r") as ptolemy_input:
+                        text = ptolemy_input.read()
+                except OSError as exception:
+                    outputs[output_path] = (
+                        [],
+                        f"Could not read the input {input_path}: {exception}",
+                    )
+                    continue
+                reaction_keys = get_reaction_keys(text, ptolemy_hash)
+                key = hash_key(*reaction_keys)
+                if key in waiting:
+                    waiting[key][1].append(output_path)
+                    continue
+                if cache is not None and raw_format == RAW_NONE:
+                    reactions = get_cached_reactions(cache, reaction_keys)
+                    if reactions is not None:
+                        outputs[output_path] = (reactions, "")
+                        continue
+                waiting[key] = (reaction_keys, [output_path])
+                future = runners.submit(
+                    execute_ptolemy,
+                    executable,
+                    input_path,
+                    output_path,
+                    timeout,
+                    retries,
+                    raw_format,
+                    text,
+                )
+                running[future] = (key, input_path)
+                if len(running) >= n_workers:
+                    break
+            if len(running) == 0 and len(parsing) == 0:
+                break
+            done, _ = wait(
+                [*running.keys(), *parsing.keys()], return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if future in running:
+                    key, input_path = running.pop(future)
+                    try:
+                        output, error = future.result()
+                    except Exception as exception:
+                        output, error = "", f"Could not run {input_path}: {exception}"
+                    if error:
+                        finish(key, [], error, False)
+                    else:
+                        parsing[
+                            parsers.submit(parse_run_output, output, input_path)
+                        ] = (key, output)
+                else:
+                    key, output = parsing.pop(future)
+                    try:
+                        reactions, error = future.result()
+                    except Exception as exception:
+                        # The worker did not get to remove a spilled output
+                        discard_output(output)
+                        reactions, error = [], f"Could not parse an output: {exception}"
+                    finish(key, reactions, error, True)
+    return outputs
+
+
+def read_run_points(path: Path) -> list[SweepPoint]:
+    """Get the points to run from a configuration or a sweep manifest
+
+    A configuration has its input created (see hieroglyph.create.create_input) and is
+    run as a sweep of a single point.
+
+    Parameters
+    ----------
+    path: Path
+        The path to a JSON configuration, or to the manifest.json of create-sweep
+
+    Returns
+    -------
+    list[SweepPoint]
+        The points to run
+    """
+    with open(path, "r") as json_file:
+        data = load(json_file)
+    if "points" in data:
+        return read_manifest(path)
+    config = deserialize_config(path)
+    create_input(path)
+    return [SweepPoint(0, config.ptolemy_config_path, {})]
+
+
+def read_run_base(path: Path) -> Config:
+    """Get the configuration the points of read_run_points are made from
+
+    Parameters
+    ----------
+    path: Path
+        The path to a JSON configuration, or to the manifest.json of create-sweep
+
+    Returns
+    -------
+    Config
+        The configuration, or the base configuration of the sweep
+    """
+    with open(path, "r") as json_file:
+        data = load(json_file)
+    if "points" in data:
+        return read_manifest_base(path)
+    return deserialize_config(path)
+
+
+def run_sweep(
+    points: list[SweepPoint],
+    executable: str,
+    n_workers: int | None = None,
+    timeout: float | None = None,
+    retries: int = DEFAULT_RETRIES,
+    suffix: str = DEFAULT_OUTPUT_SUFFIX,
+    raw_format: str = RAW_NONE,
+    cache: RunCache | None = None,
+) -> list[tuple[str, CrossSectionResult | None, str]]:
+    """Run PTOLEMY on every input of a sweep and parse the results back per point
+
+    Parameters
+    ----------
+    points: list[SweepPoint]
+        The points of the sweep (see read_run_points)
+    executable: str
+        The PTOLEMY executable
+    n_workers: int | None
+        The number of PTOLEMY processes to run at once. None uses one per CPU
+    timeout: float | None
+        The time limit of each run in seconds. None waits forever
+    retries: int
+        The number of times a failed run is retried (default DEFAULT_RETRIES)
+    suffix: str
+        The suffix of the outputs, which replaces that of the inputs (default .out)
+    raw_format: str
+        How the raw text of each output is kept, one of RAW_FORMATS (default
+        RAW_NONE)
+    cache: RunCache | None
+        The cache of runs (see run_inputs). None always runs (default None)
+
+    Returns
+    -------
+    list[tuple[str, CrossSectionResult | None, str]]
+        The kind, result (None on failure), and error (empty on success) of each
+        point, in the same order as the points
+    """
+    input_paths = sorted({Path(point.path) for point in points if point.reaction >= 0})
+    outputs = run_inputs(
+        input_paths, executable, n_workers, timeout, retries, suffix, raw_format, cache
+    )
+    return match_sweep_outputs(points, outputs, suffix)
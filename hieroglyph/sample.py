@@ -0,0 +1,318 @@
+from dataclasses import dataclass
+from pathlib import Path
+import os
+import numpy as np
+
+from .cache import hash_key
+from .result import (
+    CrossSectionResult,
+    FORMAT_NPZ,
+    load_arrays,
+    load_result,
+    write_arrays,
+)
+
+# Bump whenever the layout or the meaning of the sampling tables changes
+SAMPLER_VERSION = "1"
+
+# Suffix of the sampling tables cached next to a parsed result
+SAMPLER_SUFFIX = ".sampler.npz"
+
+
+@dataclass
+class AngleSampler:
+    """Sampling tables of the center-of-mass angle of a parsed result
+
+    The distribution of the angle is the differential cross section times the solid
+    angle factor, dsigma/dOmega sin(theta), taken as linear between the angles of the
+    result. Each angle is drawn in two steps, both for whole arrays at once: the
+    interval between two angles of the result is picked from alias tables (Walker's
+    alias method, which takes the same time for any number of intervals), and the
+    cumulative distribution within the interval is inverted exactly. Row 0 of the
+    tables is the distribution of cross, and row i + 1 that of cross_ls[i] (for
+    l = l_values[i]) of DWBA results.
+
+    Attributes
+    ----------
+    angle: numpy.ndarray
+        The center-of-mass angles of the result (degrees)
+    pdf: numpy.ndarray
+        The probability density (per degree) of each distribution at each angle,
+        shape (distribution, angle)
+    cdf: numpy.ndarray
+        The cumulative probability of each distribution at each angle, shape
+        (distribution, angle)
+    alias_probability: numpy.ndarray
+        The probability of keeping each interval rather than taking its alias, shape
+        (distribution, interval)
+    alias: numpy.ndarray
+        The alias of each interval, shape (distribution, interval)
+    total: numpy.ndarray
+        The cross section of each distribution integrated over the angles of the
+        result (mb)
+    l_values: numpy.ndarray | None
+        The orbital angular momenta of the distributions after the first, None for
+        elastic results
+
+    Methods
+    -------
+    arrays()
+        Get the named arrays of the tables
+    sample(n, rng, l)
+        Draw angles
+    """
+
+    angle: np.ndarray
+    pdf: np.ndarray
+    cdf: np.ndarray
+    alias_probability: np.ndarray
+    alias: np.ndarray
+    total: np.ndarray
+    l_values: np.ndarray | None = None
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Get the named arrays of the tables
+
+        Returns
+        -------
+        dict[str, numpy.ndarray]
+            The arrays keyed by name, leaving out those which are None
+        """
+        return {key: value for key, value in self.__dict__.items() if value is not None}
+
+    def get_row(self, l: int | None) -> int:
+        if l is None:
+            return 0
+        if self.l_values is None:
+            raise Exception("The sampler has no distributions per l!")
+        matches = np.flatnonzero(self.l_values == l)
+        if len(matches) == 0:
+            raise Exception(
+                f"l={l} is not in the set of l values of the sampler {self.l_values}!"
+            )
+        return int(matches[0]) + 1
+
+    def sample(
+        self,
+        n: int,
+        rng: int | np.random.Generator | None = None,
+        l: int | None = None,
+    ) -> np.ndarray:
+        """Draw angles
+
+        Parameters
+        ----------
+        n: int
+            The number of angles to draw
+        rng: int | numpy.random.Generator | None
+            The random generator, or the seed of a new one (see
+            numpy.random.default_rng). The same seed gives the same angles. None
+            seeds from the operating system (default None)
+        l: int | None
+            The l whose distribution to draw from. None draws from the full cross
+            section (default None)
+
+        Returns
+        -------
+        numpy.ndarray
+            The center-of-mass angles (degrees)
+        """
+        row = self.get_row(l)
+        angle = np.asarray(self.angle)
+        pdf = np.asarray(self.pdf[row])
+        cdf = np.asarray(self.cdf[row])
+        rng = np.random.default_rng(rng)
+        n_intervals = len(angle) - 1
+
+        # The whole part picks an interval, and the fraction whether to keep it
+        pick = rng.random(n) * n_intervals
+        interval = pick.astype(np.intp)
+        np.minimum(interval, n_intervals - 1, out=interval)
+        pick -= interval
+        interval = np.where(
+            pick < self.alias_probability[row][interval],
+            interval,
+            self.alias[row][interval],
+        )
+
+        width = angle[interval + 1] - angle[interval]
+        start = pdf[interval]
+        slope = (pdf[interval + 1] - start) / width
+        # Solve start * x + slope * x^2 / 2 = remaining for the distance x into the
+        # interval, in the form which stays accurate as the slope goes to 0
+        remaining = rng.random(n) * (cdf[interval + 1] - cdf[interval])
+        root = start * start + 2.0 * slope * remaining
+        np.maximum(root, 0.0, out=root)
+        denominator = start + np.sqrt(root)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distance = np.where(denominator > 0.0, 2.0 * remaining / denominator, 0.0)
+        np.clip(distance, 0.0, width, out=distance)
+        return angle[interval] + distance
+
+
+def build_alias(probability: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Build the alias tables of a discrete distribution (Vose's algorithm)
+
+    Parameters
+    ----------
+    probability: numpy.ndarray
+        The probability of each outcome, summing to 1
+
+    Returns
+    -------
+    tuple[numpy.ndarray, numpy.ndarray]
+        The probability of keeping each outcome rather than taking its alias, and
+        the alias of each outcome
+    """
+    n_outcomes = len(probability)
+    scaled = probability * n_outcomes
+    keep = np.ones(n_outcomes)
+    alias = np.arange(n_outcomes, dtype=np.int64)
+    small = [idx for idx in range(n_outcomes) if scaled[idx] < 1.0]
+    large = [idx for idx in range(n_outcomes) if scaled[idx] >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        keep[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+    # Whatever is left over is only short of 1 by rounding, and is always kept
+    return keep, alias
+
+
+def build_sampler(result: CrossSectionResult) -> AngleSampler:
+    """Build the sampling tables of the angle of a parsed result
+
+    Parameters
+    ----------
+    result: CrossSectionResult
+        The parsed elastic or DWBA result
+
+    Returns
+    -------
+    AngleSampler
+        The sampling tables, with one distribution per l for DWBA results
+    """
+    angle = np.asarray(result.angle, dtype=np.float64)
+    if len(angle) < 2 or np.any(np.diff(angle) <= 0.0):
+        raise Exception(
+            f"Sampling needs at least two angles in increasing order, but the {len(angle)} angles of the result are not!"
+        )
+    rows = [np.asarray(result.cross, dtype=np.float64)]
+    if result.cross_ls is not None and result.l_values is not None:
+        rows.extend(np.asarray(result.cross_ls, dtype=np.float64))
+
+    # Negative values can only come from rounding in the output, and are no
+    # probability at all
+    density = np.maximum(np.stack(rows), 0.0) * np.sin(np.radians(angle))
+    # Trapezoids, which are exact for the linear density between the angles
+    areas = 0.5 * (density[:, 1:] + density[:, :-1]) * np.diff(angle)
+    cdf = np.concatenate((np.zeros((len(rows), 1)), np.cumsum(areas, axis=1)), axis=1)
+    norm = cdf[:, -1:].copy()
+    if np.any(norm <= 0.0):
+        raise Exception(
+            "The result has a distribution with no probability at any angle, which can not be sampled!"
+        )
+    cdf /= norm
+    alias_tables = [build_alias(np.diff(row)) for row in cdf]
+    sampler = AngleSampler(
+        angle=angle,
+        pdf=density / norm,
+        cdf=cdf,
+        alias_probability=np.stack([keep for keep, _ in alias_tables]),
+        alias=np.stack([alias for _, alias in alias_tables]),
+        total=2.0 * np.pi * np.radians(norm[:, 0]),
+    )
+    if len(rows) > 1:
+        sampler.l_values = np.asarray(result.l_values)
+    return sampler
+
+
+def get_sampler_path(parsed_path: Path) -> Path:
+    """Get the path of the sampling tables cached next to a parsed result
+
+    Parameters
+    ----------
+    parsed_path: Path
+        The path to the .npz file or npy directory of the result
+
+    Returns
+    -------
+    Path
+        The path of the sampling tables
+    """
+    parsed_path = Path(parsed_path)
+    return parsed_path.with_name(f"{parsed_path.stem}{SAMPLER_SUFFIX}")
+
+
+def get_sampler_key(parsed_path: Path) -> str:
+    """Get the key which ties cached sampling tables to their parsed result
+
+    The key changes whenever the result is written again
+
+    Parameters
+    ----------
+    parsed_path: Path
+        The path to the .npz file or npy directory of the result
+
+    Returns
+    -------
+    str
+        The key
+    """
+    parsed_path = Path(parsed_path)
+    if parsed_path.is_dir():
+        paths = sorted(parsed_path.glob("*.npy"))
+    else:
+        paths = [parsed_path]
+    parts = []
+    for path in paths:
+        stat = path.stat()
+        parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hash_key(*parts, SAMPLER_VERSION)
+
+
+def load_sampler(parsed_path: Path, cache: bool = True) -> AngleSampler:
+    """Get the sampling tables of a parsed result written by write_result
+
+    Parameters
+    ----------
+    parsed_path: Path
+        The path to the .npz file or npy directory of the result
+    cache: bool
+        If True, the tables are read from the file next to the result (see
+        get_sampler_path) while the result has not changed since, and are written
+        there otherwise. If the file can not be written, the tables are built every
+        time (default True)
+
+    Returns
+    -------
+    AngleSampler
+        The sampling tables
+    """
+    parsed_path = Path(parsed_path)
+    if not cache:
+        return build_sampler(load_result(parsed_path))
+
+    sampler_path = get_sampler_path(parsed_path)
+    key = get_sampler_key(parsed_path)
+    try:
+        arrays = load_arrays(sampler_path)
+        if str(arrays.pop("key")) == key:
+            return AngleSampler(**arrays)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    sampler = build_sampler(load_result(parsed_path))
+    # Ends in .npz, as write_arrays would add it otherwise
+    temp_path = sampler_path.with_name(f"{sampler_path.name}.{os.getpid()}.partial.npz")
+    try:
+        write_arrays({**sampler.arrays(), "key": np.array(key)}, temp_path, FORMAT_NPZ)
+        os.replace(temp_path, sampler_path)
+    except OSError:
+        pass
+    return sampler
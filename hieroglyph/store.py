@@ -0,0 +1,483 @@
+from pathlib import Path
+from json import load, dump
+from typing import Any, Iterable
+import os
+import numpy as np
+
+from .config import Config
+from .parse import DWBA
+from .result import CrossSectionResult
+from .sweep import SweepPoint, apply_sweep_values
+
+try:
+    import fcntl
+except ImportError:  # Windows, appends are only safe from a single process
+    fcntl = None
+
+# Bump whenever the layout of the store changes
+STORE_VERSION = "1"
+
+# Name of the file describing a store
+STORE_META_NAME = "store.json"
+# Name of the index of a store
+STORE_INDEX_NAME = "index.bin"
+# Name of the lock file taken by appends
+STORE_LOCK_NAME = "lock"
+# Name of the directory of data chunks
+STORE_CHUNKS_NAME = "chunks"
+
+# A new chunk is started once the current one holds this many bytes
+STORE_CHUNK_BYTES = 256 * 1024 * 1024
+
+# The arrays of each chunk, and their data type
+STORE_ARRAYS = {
+    "angle": np.dtype("<f8"),
+    "cross": np.dtype("<f8"),
+    "cross_ls": np.dtype("<f8"),
+    "l_values": np.dtype("<i8"),
+}
+
+# Length of the potential keywords in the index
+POTENTIAL_LENGTH = 32
+
+# One record per stored result: the configuration fields which can be queried, followed
+# by where the arrays of the result are in the chunks
+INDEX_DTYPE = np.dtype(
+    [
+        ("kind", "<U8"),
+        ("projectile_energy", "<f8"),
+        ("target_z", "<i4"),
+        ("target_a", "<i4"),
+        ("projectile_z", "<i4"),
+        ("projectile_a", "<i4"),
+        ("ejectile_z", "<i4"),
+        ("ejectile_a", "<i4"),
+        ("residual_z", "<i4"),
+        ("residual_a", "<i4"),
+        ("residual_excitation", "<f8"),
+        ("residual_j", "<f8"),
+        ("residual_parity", "<U1"),
+        ("orbital_n", "<i4"),
+        ("orbital_l", "<i4"),
+        ("orbital_j", "<f8"),
+        ("incoming_potential", f"<U{POTENTIAL_LENGTH}"),
+        ("outgoing_potential", f"<U{POTENTIAL_LENGTH}"),
+        ("chunk", "<i8"),
+        ("offset", "<i8"),
+        ("n_angles", "<i8"),
+        ("l_offset", "<i8"),
+        ("n_ls", "<i8"),
+        ("ls_offset", "<i8"),
+    ]
+)
+
+# The index fields which describe where the data is, rather than the calculation
+LOCATION_FIELDS = ("chunk", "offset", "n_angles", "l_offset", "n_ls", "ls_offset")
+
+
+def make_index_record(config: Config, kind: str) -> np.ndarray:
+    """Make the index record of a configuration
+
+    The configuration is recorded as given, that is before
+    hieroglyph.config.Config.sanitize, so that it can be queried with the values of
+    the configuration files.
+
+    Parameters
+    ----------
+    config: Config
+        The configuration of the calculation
+    kind: str
+        The kind of the result (elastic or dwba)
+
+    Returns
+    -------
+    numpy.ndarray
+        The record, with the location fields left at 0
+    """
+    for potential in (config.incoming_potential, config.outgoing_potential):
+        if len(potential) > POTENTIAL_LENGTH:
+            raise Exception(
+                f"Potential {potential} is longer than the {POTENTIAL_LENGTH} characters a result store can index!"
+            )
+    record = np.zeros(1, dtype=INDEX_DTYPE)
+    record["kind"] = kind
+    record["projectile_energy"] = config.projectile_energy
+    for name in ("target", "projectile", "ejectile", "residual"):
+        nucleus = config.__dict__[name]
+        record[f"{name}_z"] = nucleus.z
+        record[f"{name}_a"] = nucleus.a
+    record["residual_excitation"] = config.residual.excitation
+    record["residual_j"] = config.residual.j
+    record["residual_parity"] = config.residual.parity
+    record["orbital_n"] = config.orbital_n
+    record["orbital_l"] = config.orbital_l
+    record["orbital_j"] = config.orbital_j
+    record["incoming_potential"] = config.incoming_potential
+    record["outgoing_potential"] = config.outgoing_potential
+    return record
+
+
+def match_condition(column: np.ndarray, condition: Any) -> np.ndarray:
+    """Find the entries of an index column which satisfy a query condition
+
+    Parameters
+    ----------
+    column: numpy.ndarray
+        The index column
+    condition: Any
+        A single value (equal to), a tuple (low, high) (inclusive range, either can be
+        None for no limit), or a list (equal to any of)
+
+    Returns
+    -------
+    numpy.ndarray
+        The boolean mask of the matching entries
+    """
+    if isinstance(condition, tuple):
+        if len(condition) != 2:
+            raise Exception(
+                f"Range condition {condition} is not of the form (low, high)!"
+            )
+        low, high = condition
+        mask = np.ones(len(column), dtype=bool)
+        if low is not None:
+            mask &= column >= low
+        if high is not None:
+            mask &= column <= high
+        return mask
+    elif isinstance(condition, list):
+        return np.isin(column, condition)
+    return column == condition
+
+
+class ResultStore:
+    """An append-only store of parsed results, indexed by their configuration
+
+    The arrays (angle, cross, cross_ls, and l_values) of every result are appended to
+    flat binary files, split into chunks of about chunk_bytes, and the configuration
+    of each result is recorded in a fixed size record of the index, one column per
+    field of INDEX_DTYPE. Both are memory-mapped when read, so a query only reads the
+    index columns it asks about, and a result only reads its own slice of the chunks.
+
+    Appends take an exclusive lock on the store (where the platform has fcntl), so any
+    number of processes can append at once. The data of a result is written before its
+    index record, so readers never see a record whose data is not there, and a crash
+    at worst leaves unreferenced data behind.
+
+    Attributes
+    ----------
+    directory: Path
+        The directory of the store
+    chunk_bytes: int
+        The size at which a new chunk is started
+
+    Methods
+    -------
+    append(config, kind, result)
+        Append a single result
+    append_many(entries)
+        Append several results under a single lock
+    read_index()
+        Read the index of the store
+    query(**conditions)
+        Find the results whose configuration satisfies every condition
+    get(entry)
+        Get a stored result
+    get_many(entries)
+        Get several stored results
+    """
+
+    def __init__(self, directory: Path, chunk_bytes: int = STORE_CHUNK_BYTES):
+        self.directory = Path(directory)
+        self.chunk_bytes = chunk_bytes
+        self.chunks: dict[int, dict[str, np.ndarray]] = {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / STORE_CHUNKS_NAME).mkdir(exist_ok=True)
+        meta_path = self.directory / STORE_META_NAME
+        meta = {"version": STORE_VERSION, "index_dtype": str(INDEX_DTYPE.descr)}
+        try:
+            with open(meta_path, "r") as meta_file:
+                found = load(meta_file)
+        except FileNotFoundError:
+            temp_path = meta_path.with_name(f"{meta_path.name}.{os.getpid()}.partial")
+            with open(temp_path, "w") as meta_file:
+                dump(meta, meta_file)
+            os.replace(temp_path, meta_path)
+            return
+        if found != meta:
+            raise Exception(
+                f"Result store {self.directory} has version {found.get('version')}, but this is version {STORE_VERSION} of the store!"
+            )
+
+    def __len__(self) -> int:
+        try:
+            size = (self.directory / STORE_INDEX_NAME).stat().st_size
+        except FileNotFoundError:
+            return 0
+        return size // INDEX_DTYPE.itemsize
+
+    def get_chunk_dir(self, chunk: int) -> Path:
+        return self.directory / STORE_CHUNKS_NAME / f"{chunk:06d}"
+
+    def find_last_chunk(self) -> int:
+        chunks = [
+            int(path.name)
+            for path in (self.directory / STORE_CHUNKS_NAME).iterdir()
+            if path.name.isdigit()
+        ]
+        return max(chunks, default=0)
+
+    def append(self, config: Config, kind: str, result: CrossSectionResult):
+        """Append a single result
+
+        Parameters
+        ----------
+        config: Config
+            The configuration of the calculation
+        kind: str
+            The kind of the result (elastic or dwba)
+        result: CrossSectionResult
+            The parsed result. Only angle, cross, cross_ls, and l_values are stored
+        """
+        self.append_many([(config, kind, result)])
+
+    def append_many(self, entries: Iterable[tuple[Config, str, CrossSectionResult]]):
+        """Append several results under a single lock
+
+        Parameters
+        ----------
+        entries: Iterable[tuple[Config, str, CrossSectionResult]]
+            The configuration, kind, and parsed result of each calculation
+        """
+        entries = [
+            (make_index_record(config, kind), result)
+            for config, kind, result in entries
+        ]
+        if len(entries) == 0:
+            return
+        with open(self.directory / STORE_LOCK_NAME, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.write_entries(entries)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write_entries(self, entries: list[tuple[np.ndarray, CrossSectionResult]]):
+        # Only called with the lock held
+        chunk = self.find_last_chunk()
+        chunk_dir = self.get_chunk_dir(chunk)
+        chunk_dir.mkdir(exist_ok=True)
+        data_files = {
+            name: open(chunk_dir / f"{name}.bin", "ab") for name in STORE_ARRAYS.keys()
+        }
+        records = []
+        try:
+            for record, result in entries:
+                arrays = {
+                    "angle": result.angle,
+                    "cross": result.cross,
+                    "cross_ls": np.empty(0),
+                    "l_values": np.empty(0),
+                }
+                if result.cross_ls is not None and result.l_values is not None:
+                    arrays["cross_ls"] = result.cross_ls
+                    arrays["l_values"] = result.l_values
+                arrays = {
+                    name: np.ascontiguousarray(array, dtype=STORE_ARRAYS[name]).ravel()
+                    for name, array in arrays.items()
+                }
+                if len(arrays["angle"]) != len(arrays["cross"]):
+                    raise Exception(
+                        f"Result has {len(arrays['angle'])} angles but {len(arrays['cross'])} cross sections!"
+                    )
+
+                chunk_size = sum(data.tell() for data in data_files.values())
+                entry_size = sum(array.nbytes for array in arrays.values())
+                if chunk_size > 0 and chunk_size + entry_size > self.chunk_bytes:
+                    for data in data_files.values():
+                        data.close()
+                    chunk += 1
+                    chunk_dir = self.get_chunk_dir(chunk)
+                    chunk_dir.mkdir(exist_ok=True)
+                    data_files = {
+                        name: open(chunk_dir / f"{name}.bin", "ab")
+                        for name in STORE_ARRAYS.keys()
+                    }
+
+                record["chunk"] = chunk
+                record["offset"] = data_files["angle"].tell() // 8
+                record["n_angles"] = len(arrays["angle"])
+                record["l_offset"] = data_files["l_values"].tell() // 8
+                record["n_ls"] = len(arrays["l_values"])
+                record["ls_offset"] = data_files["cross_ls"].tell() // 8
+                for name, array in arrays.items():
+                    data_files[name].write(array.tobytes())
+                records.append(record)
+        finally:
+            for data in data_files.values():
+                data.close()
+
+        # Data first, then the index, so readers never see records without data
+        with open(self.directory / STORE_INDEX_NAME, "ab") as index_file:
+            # Drop a partial record left by a crash, if there is one
+            index_file.truncate(
+                index_file.tell() // INDEX_DTYPE.itemsize * INDEX_DTYPE.itemsize
+            )
+            index_file.seek(0, 2)
+            index_file.write(np.concatenate(records).tobytes())
+
+    def read_index(self) -> np.ndarray:
+        """Read the index of the store
+
+        Returns
+        -------
+        numpy.ndarray
+            The index, a read-only memory-mapped structured array of INDEX_DTYPE with
+            one record per stored result
+        """
+        n_entries = len(self)
+        if n_entries == 0:
+            return np.empty(0, dtype=INDEX_DTYPE)
+        return np.memmap(
+            self.directory / STORE_INDEX_NAME,
+            dtype=INDEX_DTYPE,
+            mode="r",
+            shape=(n_entries,),
+        )
+
+    def query(self, **conditions: Any) -> np.ndarray:
+        """Find the results whose configuration satisfies every condition
+
+        Each condition is keyed by a field of INDEX_DTYPE (dotted config names like
+        residual.j are written residual_j), and is a single value (equal to), a tuple
+        (low, high) (inclusive range, either can be None for no limit), or a list
+        (equal to any of). For example all 3/2- transfers at 10-12 MeV with a
+        Daehnick incoming potential are
+
+            store.query(kind="dwba", residual_j=1.5, residual_parity="-",
+                        projectile_energy=(10.0, 12.0), incoming_potential="daehnick")
+
+        Parameters
+        ----------
+        conditions: Any
+            The condition on each field
+
+        Returns
+        -------
+        numpy.ndarray
+            The entries (positions in the index) of the matching results
+        """
+        index = self.read_index()
+        mask = np.ones(len(index), dtype=bool)
+        for name, condition in conditions.items():
+            if name not in INDEX_DTYPE.names or name in LOCATION_FIELDS:
+                raise Exception(
+                    f"Query field {name} is not in the set of indexed fields {tuple(name for name in INDEX_DTYPE.names if name not in LOCATION_FIELDS)}!"
+                )
+            mask &= match_condition(index[name], condition)
+        return np.flatnonzero(mask)
+
+    def get_chunk(self, chunk: int, needed: dict[str, int]) -> dict[str, np.ndarray]:
+        # Map the arrays of a chunk, mapping again if they grew since
+        arrays = self.chunks.get(chunk, {})
+        for name, length in needed.items():
+            if name in arrays and len(arrays[name]) >= length:
+                continue
+            path = self.get_chunk_dir(chunk) / f"{name}.bin"
+            if path.stat().st_size == 0:
+                arrays[name] = np.empty(0, dtype=STORE_ARRAYS[name])
+            else:
+                arrays[name] = np.memmap(path, dtype=STORE_ARRAYS[name], mode="r")
+        self.chunks[chunk] = arrays
+        return arrays
+
+    def get(self, entry: int, index: np.ndarray | None = None) -> CrossSectionResult:
+        """Get a stored result
+
+        Parameters
+        ----------
+        entry: int
+            The entry of the result (its position in the index)
+        index: numpy.ndarray | None
+            The index, as given by read_index. None reads it
+
+        Returns
+        -------
+        CrossSectionResult
+            The result. Its arrays are read-only views of the memory-mapped chunks
+        """
+        if index is None:
+            index = self.read_index()
+        record = index[entry]
+        start = int(record["offset"])
+        end = start + int(record["n_angles"])
+        l_start = int(record["l_offset"])
+        l_end = l_start + int(record["n_ls"])
+        ls_start = int(record["ls_offset"])
+        ls_end = ls_start + int(record["n_ls"]) * int(record["n_angles"])
+        arrays = self.get_chunk(
+            int(record["chunk"]),
+            {"angle": end, "cross": end, "l_values": l_end, "cross_ls": ls_end},
+        )
+        result = CrossSectionResult(
+            angle=arrays["angle"][start:end], cross=arrays["cross"][start:end]
+        )
+        if record["kind"] == DWBA:
+            result.l_values = arrays["l_values"][l_start:l_end]
+            result.cross_ls = arrays["cross_ls"][ls_start:ls_end].reshape(
+                int(record["n_ls"]), int(record["n_angles"])
+            )
+        return result
+
+    def get_many(self, entries: Iterable[int]) -> list[CrossSectionResult]:
+        """Get several stored results
+
+        Parameters
+        ----------
+        entries: Iterable[int]
+            The entries of the results, like those given by query
+
+        Returns
+        -------
+        list[CrossSectionResult]
+            The results, in the order of the entries
+        """
+        index = self.read_index()
+        return [self.get(int(entry), index) for entry in entries]
+
+
+def store_sweep(
+    store: ResultStore,
+    base: Config,
+    points: list[SweepPoint],
+    parsed: list[tuple[str, CrossSectionResult | None, str]],
+) -> int:
+    """Append the results of a sweep to a result store
+
+    Points which failed are left out.
+
+    Parameters
+    ----------
+    store: ResultStore
+        The result store
+    base: Config
+        The base configuration of the sweep (see hieroglyph.sweep.read_manifest_base)
+    points: list[SweepPoint]
+        The points of the sweep
+    parsed: list[tuple[str, CrossSectionResult | None, str]]
+        The kind, result, and error of each point, as given by read_sweep_outputs
+
+    Returns
+    -------
+    int
+        The number of results appended
+    """
+    entries = [
+        (apply_sweep_values(base, point.values), kind, result)
+        for point, (kind, result, error) in zip(points, parsed)
+        if result is not None and not error
+    ]
+    store.append_many(entries)
+    return len(entries)
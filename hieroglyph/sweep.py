@@ -0,0 +1,908 @@
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from dataclasses import dataclass, field, asdict
+from itertools import islice, product
+from json import load, dump
+from math import prod
+from pathlib import Path
+from typing import Any, Iterator
+import os
+import numpy as np
+
+from .config import Config, NucleusParameters, config_from_dict, deserialize_config
+from .batch import consolidate_batch
+from .create import (
+    CREATED,
+    CHANGED,
+    UNCHANGED,
+    render_input,
+    bundle_inputs,
+    hash_input,
+    write_input_if_changed,
+)
+from .index import get_index, read_reaction
+from .kinematics import KINEMATICS_DTYPE, compute_kinematics, describe_forbidden
+from .nuclear import MassTable, get_mass_table
+from .parse import UNKNOWN
+from .registry import register_potential_file
+from .result import CrossSectionResult
+
+# Name of the manifest written next to the inputs of a sweep
+MANIFEST_NAME = "manifest.json"
+# Name of the table of the kinematics of every point, written next to the manifest
+KINEMATICS_NAME = "kinematics.npy"
+
+# Grid points handed to a worker at a time
+SWEEP_CHUNK_SIZE = 64
+# Grid points expanded at a time per worker, bounding the memory of huge sweeps
+SWEEP_POINTS_PER_WORKER = 1024
+
+# Suffix of the PTOLEMY output of each input, replacing the suffix of the input
+DEFAULT_OUTPUT_SUFFIX = ".out"
+
+
+@dataclass
+class SweepAxis:
+    """One axis of a parameter sweep
+
+    Several config fields can vary together along a single axis (for example
+    orbital_l and orbital_j), in which case each value is a list with one entry
+    per field.
+
+    Attributes
+    ----------
+    keys: list[str]
+        The config fields set by the axis. Fields of the nuclei are written dotted,
+        like residual.excitation
+    values: list[list[Any]]
+        The values of each point of the axis, one entry per key
+    """
+
+    keys: list[str] = field(default_factory=list)
+    values: list[list[Any]] = field(default_factory=list)
+
+
+@dataclass
+class SweepPoint:
+    """A single point of a parameter sweep, as recorded in the manifest
+
+    Attributes
+    ----------
+    index: int
+        The position of the point in the sweep
+    path: str
+        The path of the PTOLEMY input of the point
+    values: dict[str, Any]
+        The value of each swept config field
+    reaction: int
+        The position of the point's reaction within its input, which can hold several
+        when the inputs are bundled. -1 if the input could not be created
+    error: str
+        Why the input could not be created, empty if it was
+    status: str
+        Whether the input was created, changed, or unchanged (see
+        hieroglyph.create.write_input_if_changed), empty if it could not be created
+    input_hash: str
+        The hash of the text of the input (see hieroglyph.create.hash_input)
+    input_mtime_ns: int
+        The modification time of the input once written
+    """
+
+    index: int = 0
+    path: str = ""
+    values: dict[str, Any] = field(default_factory=dict)
+    reaction: int = 0
+    error: str = ""
+    status: str = ""
+    input_hash: str = ""
+    input_mtime_ns: int = 0
+
+
+def check_sweep_key(key: str):
+    """Check that a swept key names a field of the configuration
+
+    Parameters
+    ----------
+    key: str
+        The key, with fields of the nuclei written dotted (like residual.excitation)
+    """
+    config = Config()
+    parts = key.split(".")
+    if parts[0] not in config.__dict__ or parts[0] == "ptolemy_config_path":
+        raise Exception(f"Sweep axis {key} is not a field of the configuration!")
+    nucleus = config.__dict__[parts[0]]
+    if isinstance(nucleus, NucleusParameters):
+        if len(parts) != 2 or parts[1] not in nucleus.__dict__:
+            raise Exception(f"Sweep axis {key} is not a field of the configuration!")
+    elif len(parts) != 1:
+        raise Exception(f"Sweep axis {key} is not a field of the configuration!")
+
+
+def expand_axis_values(spec: Any) -> list[Any]:
+    """Expand the values of a single-key axis
+
+    Parameters
+    ----------
+    spec: Any
+        Either a list of values, or a range given as {"start", "stop", "step"}
+        (stop included)
+
+    Returns
+    -------
+    list[Any]
+        The values of the axis
+    """
+    if isinstance(spec, dict):
+        start, stop, step = (
+            float(spec["start"]),
+            float(spec["stop"]),
+            float(spec["step"]),
+        )
+        if step <= 0.0:
+            raise Exception(f"Sweep range {spec} must have a positive step!")
+        n_values = int(round((stop - start) / step)) + 1
+        return [round(start + idx * step, 12) for idx in range(n_values)]
+    elif isinstance(spec, list):
+        return spec
+    raise Exception(f"Sweep axis values {spec} must be a list or a range!")
+
+
+def read_sweep_axes(path: Path) -> list[SweepAxis]:
+    """Read the axes of a parameter sweep from a JSON file
+
+    The file maps each swept config field to its values, either a list or a
+    {"start", "stop", "step"} range. Fields which vary together are joined by commas
+    in a single key, and each of their values is a list with one entry per field
+
+    .. code-block:: json
+
+        {
+            "projectile_energy": {"start": 10.0, "stop": 50.0, "step": 5.0},
+            "residual.excitation": [0.0, 1.77],
+            "orbital_l,orbital_j": [[0, 0.5], [2, 2.5]]
+        }
+
+    Parameters
+    ----------
+    path: Path
+        The path to the JSON file
+
+    Returns
+    -------
+    list[SweepAxis]
+        The axes, in the order of the file
+    """
+    with open(path, "r") as sweep_file:
+        data = load(sweep_file)
+    axes = []
+    for key, spec in data.items():
+        keys = [part.strip() for part in key.split(",")]
+        for subkey in keys:
+            check_sweep_key(subkey)
+        if len(keys) == 1:
+            values = [[value] for value in expand_axis_values(spec)]
+        else:
+            values = spec
+            if not isinstance(values, list) or any(
+                not isinstance(value, list) or len(value) != len(keys)
+                for value in values
+            ):
+                raise Exception(
+                    f"Every value of the sweep axis {key} must be a list of {len(keys)} values!"
+                )
+        if len(values) == 0:
+            raise Exception(f"Sweep axis {key} has no values!")
+        axes.append(SweepAxis(keys, values))
+    return axes
+
+
+def count_sweep(axes: list[SweepAxis]) -> int:
+    """Count the points of a sweep without expanding it
+
+    Parameters
+    ----------
+    axes: list[SweepAxis]
+        The axes of the sweep
+
+    Returns
+    -------
+    int
+        The number of points
+    """
+    return prod(len(axis.values) for axis in axes)
+
+
+def iter_sweep(axes: list[SweepAxis]) -> Iterator[dict[str, Any]]:
+    """Lazily expand the Cartesian product of the axes of a sweep
+
+    Parameters
+    ----------
+    axes: list[SweepAxis]
+        The axes of the sweep
+
+    Yields
+    ------
+    dict[str, Any]
+        The value of each swept config field at a point. The last axis varies fastest
+    """
+    for combination in product(*(axis.values for axis in axes)):
+        values = {}
+        for axis, axis_values in zip(axes, combination):
+            values.update(zip(axis.keys, axis_values))
+        yield values
+
+
+def apply_sweep_values(config: Config, values: dict[str, Any]) -> Config:
+    """Make a copy of a configuration with swept fields set
+
+    Parameters
+    ----------
+    config: Config
+        The base configuration
+    values: dict[str, Any]
+        The value of each swept config field
+
+    Returns
+    -------
+    Config
+        The new configuration
+    """
+    config = deepcopy(config)
+    for key, value in values.items():
+        parts = key.split(".")
+        if len(parts) == 1:
+            config.__dict__[key] = value
+        else:
+            config.__dict__[parts[0]].__dict__[parts[1]] = value
+    return config
+
+
+def get_sweep_field(base: Config, values: list[dict[str, Any]], key: str) -> np.ndarray:
+    """Get a numeric config field at each of a batch of sweep points
+
+    Parameters
+    ----------
+    base: Config
+        The base configuration
+    values: list[dict[str, Any]]
+        The value of each swept config field at each point
+    key: str
+        The field, with fields of the nuclei written dotted (like residual.excitation)
+
+    Returns
+    -------
+    numpy.ndarray
+        The value of the field at each point
+    """
+    if len(values) > 0 and key in values[0]:
+        return np.array([point[key] for point in values], dtype=np.float64)
+    parts = key.split(".")
+    value = base.__dict__[parts[0]]
+    if len(parts) == 2:
+        value = value.__dict__[parts[1]]
+    return np.full(len(values), float(value))
+
+
+def compute_sweep_kinematics(
+    base: Config, values: list[dict[str, Any]], nuc_map: MassTable
+) -> np.ndarray:
+    """Compute the kinematics of a batch of sweep points at once
+
+    The configurations are brought to normal kinematics the same way as
+    Config.sanitize, with the beam energies converted as by
+    hieroglyph.convert.convert_to_target_ke_array, and then handed to
+    hieroglyph.kinematics.compute_kinematics.
+
+    Parameters
+    ----------
+    base: Config
+        The base configuration
+    values: list[dict[str, Any]]
+        The value of each swept config field at each point
+    nuc_map: hieroglyph.nuclear.MassTable
+        The map of nucleus masses
+
+    Returns
+    -------
+    numpy.ndarray
+        The kinematics of each point, a structured array of
+        hieroglyph.kinematics.KINEMATICS_DTYPE
+    """
+    nuclei = {}
+    for name in ("target", "projectile", "ejectile", "residual"):
+        z = get_sweep_field(base, values, f"{name}.z")
+        a = get_sweep_field(base, values, f"{name}.a")
+        nuclei[name] = (a, nuc_map.get_mass_array(z, a))
+    energy = get_sweep_field(base, values, "projectile_energy")
+    excitation = get_sweep_field(base, values, "residual.excitation")
+
+    (target_a, target_mass), (projectile_a, projectile_mass) = (
+        nuclei["target"],
+        nuclei["projectile"],
+    )
+    inverse = target_a < projectile_a
+    energy = np.where(inverse, energy * target_mass / projectile_mass, energy)
+    target_mass, projectile_mass = (
+        np.where(inverse, projectile_mass, target_mass),
+        np.where(inverse, target_mass, projectile_mass),
+    )
+
+    (ejectile_a, ejectile_mass), (residual_a, residual_mass) = (
+        nuclei["ejectile"],
+        nuclei["residual"],
+    )
+    # Swapping the ejectile and residual swaps their excitations too, so the
+    # excitation written to the input is the ejectile's
+    swapped = residual_a < ejectile_a
+    excitation = np.where(
+        swapped, get_sweep_field(base, values, "ejectile.excitation"), excitation
+    )
+    ejectile_mass, residual_mass = (
+        np.where(swapped, residual_mass, ejectile_mass),
+        np.where(swapped, ejectile_mass, residual_mass),
+    )
+    return compute_kinematics(
+        target_mass, projectile_mass, ejectile_mass, residual_mass, energy, excitation
+    )
+
+
+def iter_allowed_points(
+    base: Config,
+    axes: list[SweepAxis],
+    kinematics: np.ndarray,
+    forbidden: list[SweepPoint],
+) -> Iterator[SweepPoint]:
+    """Lazily expand a sweep, dropping the points which are kinematically forbidden
+
+    The kinematics are computed a batch of points at a time (see
+    compute_sweep_kinematics) and stored in the kinematics table.
+
+    Parameters
+    ----------
+    base: Config
+        The base configuration
+    axes: list[SweepAxis]
+        The axes of the sweep
+    kinematics: numpy.ndarray
+        The table the kinematics of every point are written to, with one record per
+        point of the sweep
+    forbidden: list[SweepPoint]
+        The points which are forbidden are appended here, with the reason as their
+        error
+
+    Yields
+    ------
+    SweepPoint
+        The points which are allowed, without an input path
+    """
+    nuc_map = get_mass_table()
+    sweep = iter_sweep(axes)
+    start = 0
+    while batch := list(islice(sweep, SWEEP_POINTS_PER_WORKER)):
+        table = compute_sweep_kinematics(base, batch, nuc_map)
+        kinematics[start : start + len(batch)] = table
+        for offset, values in enumerate(batch):
+            if table["allowed"][offset]:
+                yield SweepPoint(start + offset, "", values)
+            else:
+                forbidden.append(
+                    SweepPoint(
+                        start + offset,
+                        "",
+                        values,
+                        reaction=-1,
+                        error=describe_forbidden(table[offset]),
+                    )
+                )
+        start += len(batch)
+
+
+def get_sweep_input_path(
+    output_dir: Path, base_path: str, index: int, width: int
+) -> Path:
+    """Get the path of the PTOLEMY input of a sweep point
+
+    Parameters
+    ----------
+    output_dir: Path
+        The directory the inputs are written to
+    base_path: str
+        The ptolemy_config_path of the base configuration, whose name is used as a prefix
+    index: int
+        The position of the point in the sweep (of the first point for a bundle)
+    width: int
+        The number of digits of the index
+
+    Returns
+    -------
+    Path
+        The path of the input
+    """
+    base = Path(base_path)
+    return output_dir / f"{base.stem}_{index:0{width}d}{base.suffix}"
+
+
+def iter_bundles(
+    points: Iterator[SweepPoint], bundle_size: int
+) -> Iterator[list[SweepPoint]]:
+    """Lazily group consecutive sweep points into bundles
+
+    Parameters
+    ----------
+    points: Iterator[SweepPoint]
+        The points of the sweep
+    bundle_size: int
+        The number of points in each bundle (the last one may have fewer)
+
+    Yields
+    ------
+    list[SweepPoint]
+        The points of each bundle
+    """
+    while bundle := list(islice(points, bundle_size)):
+        yield bundle
+
+
+def iter_sweep_tasks(
+    base: Config,
+    points: Iterator[SweepPoint],
+    output_dir: Path,
+    bundle_size: int,
+    width: int,
+    recorded: dict[str, tuple[str, int]],
+) -> Iterator[tuple[Config, list[SweepPoint], tuple[str, int] | None]]:
+    # Each input is named after its first point, so the names do not shift when
+    # points before it are dropped
+    for bundle in iter_bundles(points, bundle_size):
+        path = str(
+            get_sweep_input_path(
+                output_dir, base.ptolemy_config_path, bundle[0].index, width
+            )
+        )
+        for point in bundle:
+            point.path = path
+        yield base, bundle, recorded.get(path)
+
+
+def _register_potentials(potential_paths: tuple[Path, ...]):
+    for potential_path in potential_paths:
+        register_potential_file(potential_path, replace=True)
+
+
+def _create_sweep_input(
+    task: tuple[Config, list[SweepPoint], tuple[str, int] | None],
+) -> list[SweepPoint]:
+    base, points, recorded = task
+    # The masses and potentials are remembered per process, so each is only
+    # looked up or computed once for each unique nucleus and energy
+    nuc_map = get_mass_table()
+    texts = []
+    for point in points:
+        try:
+            config = apply_sweep_values(base, point.values)
+            config.ptolemy_config_path = point.path
+            config.sanitize(nuc_map)
+            texts.append(
+                (f"hieroglyph sweep point {point.index}", render_input(config, nuc_map))
+            )
+            point.reaction = len(texts) - 1
+        except Exception as error:
+            point.reaction = -1
+            point.error = str(error)
+    if len(texts) == 1:
+        text = texts[0][1]
+    elif len(texts) > 1:
+        text = bundle_inputs(texts)
+    else:
+        return points
+
+    # The hash in the previous manifest can be trusted as long as the input has not
+    # been touched since, which saves reading it back
+    path = Path(points[0].path)
+    recorded_hash = None
+    if recorded is not None:
+        try:
+            if path.stat().st_mtime_ns == recorded[1]:
+                recorded_hash = recorded[0]
+        except OSError:
+            pass
+    status = write_input_if_changed(path, text, recorded_hash)
+    input_hash = hash_input(text)
+    input_mtime_ns = path.stat().st_mtime_ns
+    for point in points:
+        if point.reaction >= 0:
+            point.status = status
+            point.input_hash = input_hash
+            point.input_mtime_ns = input_mtime_ns
+    return points
+
+
+def write_manifest(
+    manifest_path: Path,
+    config_path: Path,
+    axes: list[SweepAxis],
+    points: list[SweepPoint],
+    base: Config | None = None,
+):
+    """Write the manifest of a sweep
+
+    Parameters
+    ----------
+    manifest_path: Path
+        The path of the manifest
+    config_path: Path
+        The path of the base configuration
+    axes: list[SweepAxis]
+        The axes of the sweep
+    points: list[SweepPoint]
+        Every point of the sweep
+    base: Config | None
+        The base configuration, which is kept in the manifest so the configuration of
+        every point can be rebuilt later. None reads it from config_path
+    """
+    if base is None:
+        base = deserialize_config(Path(config_path))
+    with open(manifest_path, "w") as manifest_file:
+        dump(
+            {
+                "config": str(config_path),
+                "base": asdict(base),
+                "axes": [asdict(axis) for axis in axes],
+                "points": [asdict(point) for point in points],
+            },
+            manifest_file,
+            indent=1,
+        )
+
+
+def read_manifest(manifest_path: Path) -> list[SweepPoint]:
+    """Read the points of a sweep manifest
+
+    Parameters
+    ----------
+    manifest_path: Path
+        The path of the manifest
+
+    Returns
+    -------
+    list[SweepPoint]
+        Every point of the sweep
+    """
+    with open(manifest_path, "r") as manifest_file:
+        data = load(manifest_file)
+    return [SweepPoint(**point) for point in data["points"]]
+
+
+def read_recorded_inputs(manifest_path: Path) -> dict[str, tuple[str, int]]:
+    """Read the hash and modification time of each input of a previous sweep
+
+    Parameters
+    ----------
+    manifest_path: Path
+        The path of the manifest
+
+    Returns
+    -------
+    dict[str, tuple[str, int]]
+        The (hash, modification time) of each input recorded in the manifest, keyed by
+        path. Empty if there is no readable manifest
+    """
+    try:
+        points = read_manifest(manifest_path)
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    return {
+        point.path: (point.input_hash, point.input_mtime_ns)
+        for point in points
+        if point.input_hash
+    }
+
+
+def count_input_status(points: list[SweepPoint]) -> dict[str, int]:
+    """Count the inputs of a sweep which were created, changed, and unchanged
+
+    Parameters
+    ----------
+    points: list[SweepPoint]
+        Every point of the sweep
+
+    Returns
+    -------
+    dict[str, int]
+        The number of inputs (not points, as an input can bundle several) of each
+        status
+    """
+    counts = {CREATED: 0, CHANGED: 0, UNCHANGED: 0}
+    statuses = {point.path: point.status for point in points if point.status}
+    for status in statuses.values():
+        counts[status] += 1
+    return counts
+
+
+def read_manifest_base(manifest_path: Path) -> Config:
+    """Read the base configuration of a sweep manifest
+
+    Parameters
+    ----------
+    manifest_path: Path
+        The path of the manifest
+
+    Returns
+    -------
+    Config
+        The base configuration. Manifests written before it was kept in the manifest
+        fall back to the configuration file it was made from
+    """
+    with open(manifest_path, "r") as manifest_file:
+        data = load(manifest_file)
+    if "base" in data:
+        return config_from_dict(data["base"])
+    return deserialize_config(Path(data["config"]))
+
+
+def create_sweep(
+    config_path: Path,
+    sweep_path: Path,
+    output_dir: Path,
+    n_workers: int | None = None,
+    potential_paths: tuple[Path, ...] = (),
+    bundle_size: int = 1,
+) -> list[SweepPoint]:
+    """Create the PTOLEMY inputs of every point of a parameter sweep
+
+    The grid is expanded lazily and the inputs are rendered across a pool of worker
+    processes. A manifest mapping each point to its input is written to the output
+    directory. Points which fail (an unsupported reaction, say) are recorded in the
+    manifest with their error rather than stopping the sweep.
+
+    Before anything is written, the kinematics of every point are computed in bulk
+    (see compute_sweep_kinematics) and saved to a table in the output directory.
+    Points which are kinematically forbidden (below threshold, or with a negative
+    outgoing energy) are dropped and recorded in the manifest with the reason, so no
+    input is created and no PTOLEMY job is run for them.
+
+    Sweeps are incremental: every input is rendered in memory and only written if its
+    text differs from the input already on disk, whose hash is taken from the previous
+    manifest when possible. Rerunning a sweep after a change only touches the inputs
+    the change affects, so only those need to be rerun through PTOLEMY.
+
+    With a bundle_size above 1, consecutive points are packed into a single input
+    of up to bundle_size reactions (see hieroglyph.create.bundle_inputs), so PTOLEMY
+    only starts once per bundle. The manifest records the position of each point's
+    reaction in its input, and read_sweep_outputs splits the outputs back apart.
+
+    Parameters
+    ----------
+    config_path: Path
+        The path to the base JSON configuration
+    sweep_path: Path
+        The path to the JSON file of sweep axes (see read_sweep_axes)
+    output_dir: Path
+        The directory the inputs and manifest are written to
+    n_workers: int | None
+        The number of worker processes. None uses one per CPU, 1 creates the inputs
+        in this process
+    potential_paths: tuple[Path, ...]
+        Files of extra potential definitions to register in every worker
+    bundle_size: int
+        The number of reactions in each input (default 1)
+
+    Returns
+    -------
+    list[SweepPoint]
+        Every point of the sweep
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    if bundle_size < 1:
+        raise Exception(f"Bundle size must be at least 1, not {bundle_size}!")
+    base = deserialize_config(Path(config_path))
+    axes = read_sweep_axes(Path(sweep_path))
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_points = count_sweep(axes)
+    width = len(str(max(n_points - 1, 0)))
+
+    kinematics = np.lib.format.open_memmap(
+        output_dir / KINEMATICS_NAME,
+        mode="w+",
+        dtype=KINEMATICS_DTYPE,
+        shape=(n_points,),
+    )
+    forbidden: list[SweepPoint] = []
+    points = iter_allowed_points(base, axes, kinematics, forbidden)
+    recorded = read_recorded_inputs(output_dir / MANIFEST_NAME)
+    tasks = iter_sweep_tasks(base, points, output_dir, bundle_size, width, recorded)
+    chunk_size = max(SWEEP_CHUNK_SIZE // bundle_size, 1)
+
+    created: list[SweepPoint] = []
+    if n_workers == 1:
+        _register_potentials(potential_paths)
+        for task in tasks:
+            created.extend(_create_sweep_input(task))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_register_potentials,
+            initargs=(potential_paths,),
+        ) as executor:
+            # Expand the grid a slice at a time, so it is never all in memory at once
+            while batch := list(
+                islice(tasks, n_workers * SWEEP_POINTS_PER_WORKER // bundle_size + 1)
+            ):
+                for bundle in executor.map(
+                    _create_sweep_input, batch, chunksize=chunk_size
+                ):
+                    created.extend(bundle)
+    kinematics.flush()
+
+    created.extend(forbidden)
+    created.sort(key=lambda point: point.index)
+    write_manifest(output_dir / MANIFEST_NAME, Path(config_path), axes, created, base)
+    return created
+
+
+def get_sweep_output_path(
+    input_path: Path, suffix: str = DEFAULT_OUTPUT_SUFFIX
+) -> Path:
+    """Get the path of the PTOLEMY output of a sweep input
+
+    Parameters
+    ----------
+    input_path: Path
+        The path of the input
+    suffix: str
+        The suffix of the output, which replaces that of the input (default .out)
+
+    Returns
+    -------
+    Path
+        The path of the output
+    """
+    return Path(input_path).with_suffix(suffix)
+
+
+def read_sweep_output(
+    output_path: Path,
+) -> tuple[list[tuple[str, CrossSectionResult]], str]:
+    """Parse every reaction of a PTOLEMY output, without raising on failure
+
+    Parameters
+    ----------
+    output_path: Path
+        The path of the output
+
+    Returns
+    -------
+    tuple[list[tuple[str, CrossSectionResult]], str]
+        The (kind, result) of each reaction in the output, and the error (empty on
+        success)
+    """
+    try:
+        index = get_index(output_path)
+        return [
+            (entry.kind, read_reaction(output_path, entry)) for entry in index.reactions
+        ], ""
+    except Exception as error:
+        return [], str(error)
+
+
+def read_sweep_outputs(
+    points: list[SweepPoint],
+    suffix: str = DEFAULT_OUTPUT_SUFFIX,
+    n_workers: int | None = None,
+) -> list[tuple[str, CrossSectionResult | None, str]]:
+    """Parse the PTOLEMY outputs of a sweep back into one result per point
+
+    Each output is split into its reactions with hieroglyph.index, and the reactions
+    are matched to the points of the manifest by their position, so bundled outputs
+    come apart into the results of each of their points.
+
+    Parameters
+    ----------
+    points: list[SweepPoint]
+        The points of the sweep (see read_manifest)
+    suffix: str
+        The suffix of the outputs, which replaces that of the inputs (default .out)
+    n_workers: int | None
+        The number of worker processes. None uses one per CPU
+
+    Returns
+    -------
+    list[tuple[str, CrossSectionResult | None, str]]
+        The kind, result (None on failure), and error (empty on success) of each
+        point, in the same order as the points
+    """
+    output_paths = sorted(
+        {
+            get_sweep_output_path(Path(point.path), suffix)
+            for point in points
+            if point.reaction >= 0
+        }
+    )
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        outputs = dict(zip(output_paths, executor.map(read_sweep_output, output_paths)))
+    return match_sweep_outputs(points, outputs, suffix)
+
+
+def match_sweep_outputs(
+    points: list[SweepPoint],
+    outputs: dict[Path, tuple[list[tuple[str, CrossSectionResult]], str]],
+    suffix: str = DEFAULT_OUTPUT_SUFFIX,
+) -> list[tuple[str, CrossSectionResult | None, str]]:
+    """Match the reactions of parsed sweep outputs to the points of the sweep
+
+    Parameters
+    ----------
+    points: list[SweepPoint]
+        The points of the sweep
+    outputs: dict[Path, tuple[list[tuple[str, CrossSectionResult]], str]]
+        The (kind, result) of each reaction of each output, and the error (empty on
+        success) of reading it, keyed by output path
+    suffix: str
+        The suffix of the outputs, which replaces that of the inputs (default .out)
+
+    Returns
+    -------
+    list[tuple[str, CrossSectionResult | None, str]]
+        The kind, result (None on failure), and error (empty on success) of each
+        point, in the same order as the points
+    """
+    parsed: list[tuple[str, CrossSectionResult | None, str]] = []
+    for point in points:
+        if point.reaction < 0:
+            parsed.append((UNKNOWN, None, point.error))
+            continue
+        output_path = get_sweep_output_path(Path(point.path), suffix)
+        reactions, error = outputs[output_path]
+        if error:
+            parsed.append((UNKNOWN, None, error))
+        elif point.reaction >= len(reactions):
+            parsed.append(
+                (
+                    UNKNOWN,
+                    None,
+                    f"Output {output_path} only has {len(reactions)} reactions, missing reaction {point.reaction}",
+                )
+            )
+        else:
+            parsed.append((*reactions[point.reaction], ""))
+    return parsed
+
+
+def consolidate_sweep(
+    points: list[SweepPoint],
+    parsed: list[tuple[str, CrossSectionResult | None, str]],
+    suffix: str = DEFAULT_OUTPUT_SUFFIX,
+) -> dict[str, np.ndarray]:
+    """Pack the results of a sweep into one set of flat arrays
+
+    The same layout as hieroglyph.batch.consolidate_batch, with one entry per point
+    rather than per file, and the index of each point in the array sweep_index, so
+    that each result can be matched to its values in the manifest.
+
+    Parameters
+    ----------
+    points: list[SweepPoint]
+        The points of the sweep
+    parsed: list[tuple[str, CrossSectionResult | None, str]]
+        The result of read_sweep_outputs
+    suffix: str
+        The suffix of the outputs, which replaces that of the inputs (default .out)
+
+    Returns
+    -------
+    dict[str, numpy.ndarray]
+        The consolidated dataset
+    """
+    # Points dropped before they got an input have no output either
+    data = consolidate_batch(
+        [
+            get_sweep_output_path(Path(point.path), suffix) if point.path else ""
+            for point in points
+        ],
+        parsed,
+    )
+    data["sweep_index"] = np.array([point.index for point in points], dtype=np.int64)
+    data["reaction"] = np.array([point.reaction for point in points], dtype=np.int64)
+    return data
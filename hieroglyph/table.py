@@ -0,0 +1,358 @@
+from dataclasses import dataclass
+from json import loads, JSONDecodeError
+from pathlib import Path
+from typing import Any
+import numpy as np
+
+from .batch import get_batch_result
+from .result import CrossSectionResult, FORMAT_NPY, write_arrays, load_arrays
+from .sweep import SweepPoint
+
+# The swept field a table interpolates over
+TABLE_ENERGY_KEY = "projectile_energy"
+
+# Relative spread of the grid steps below which a grid is taken as uniform
+UNIFORM_TOLERANCE = 1.0e-9
+
+
+@dataclass
+class CrossSectionTable:
+    """A differential cross section tabulated over beam energy and angle
+
+    The cross section between the grid points is interpolated bilinearly. Points
+    outside of the grid are NaN, unless clip is given, in which case they take the
+    value at the nearest edge of the grid.
+
+    Attributes
+    ----------
+    energy: numpy.ndarray
+        The beam energies of the grid (MeV), increasing
+    angle: numpy.ndarray
+        The center-of-mass angles of the grid (degrees), increasing
+    cross: numpy.ndarray
+        The differential cross section (mb/sr), shape (energy, angle)
+    l_values: numpy.ndarray | None
+        The orbital angular momenta of cross_ls, None for elastic tables
+    cross_ls: numpy.ndarray | None
+        The differential cross section for each l (mb/sr), shape (energy, angle, l).
+        An l which a calculation did not include is 0 for that energy
+
+    Methods
+    -------
+    arrays()
+        Get the named arrays of the table
+    evaluate(energy, angle, clip)
+        Interpolate the cross section
+    evaluate_ls(energy, angle, l, clip)
+        Interpolate the cross section of each l
+    """
+
+    energy: np.ndarray
+    angle: np.ndarray
+    cross: np.ndarray
+    l_values: np.ndarray | None = None
+    cross_ls: np.ndarray | None = None
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """Get the named arrays of the table
+
+        Returns
+        -------
+        dict[str, numpy.ndarray]
+            The arrays keyed by name, leaving out those which are None
+        """
+        return {key: value for key, value in self.__dict__.items() if value is not None}
+
+    def locate(
+        self, energy: np.ndarray, angle: np.ndarray, clip: bool
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # The flat index of the lower corner of the cell holding each point, the
+        # fractions of the way across the cell in energy and angle, and which points
+        # are outside of the grid, for one dimensional energy and angle
+        cells = []
+        outside = np.zeros(energy.shape, dtype=bool)
+        for grid, x in ((self.energy, energy), (self.angle, angle)):
+            grid = np.asarray(grid)
+            if clip:
+                x = np.clip(x, grid[0], grid[-1])
+            else:
+                outside |= ~((x >= grid[0]) & (x <= grid[-1]))
+            step = (grid[-1] - grid[0]) / (len(grid) - 1)
+            if np.allclose(np.diff(grid), step, rtol=UNIFORM_TOLERANCE, atol=0.0):
+                # Much quicker than a search, and the grid point itself is still
+                # recovered exactly if rounding puts it in the cell below
+                low = np.floor((x - grid[0]) / step).astype(np.intp)
+            else:
+                low = np.searchsorted(grid, x, side="right") - 1
+            np.clip(low, 0, len(grid) - 2, out=low)
+            fraction = x - grid[low]
+            fraction /= grid[low + 1] - grid[low]
+            cells.append((low, fraction))
+        (e_low, e_fraction), (a_low, a_fraction) = cells
+        corner = e_low * len(self.angle) + a_low
+        return corner, e_fraction, a_fraction, outside
+
+    def interpolate(
+        self, values: np.ndarray, energy: Any, angle: Any, clip: bool
+    ) -> np.ndarray:
+        # Bilinear interpolation of values, of shape (energy, angle, ...)
+        energy, angle = np.broadcast_arrays(
+            np.asarray(energy, dtype=np.float64), np.asarray(angle, dtype=np.float64)
+        )
+        shape = energy.shape
+        corner, e_fraction, a_fraction, outside = self.locate(
+            energy.ravel(), angle.ravel(), clip
+        )
+        values = np.asarray(values).reshape(
+            len(self.energy) * len(self.angle), *values.shape[2:]
+        )
+        extra = (np.newaxis,) * (values.ndim - 1)
+        e_fraction = e_fraction[(..., *extra)]
+        a_fraction = a_fraction[(..., *extra)]
+        # Weighted sums rather than differences, so the grid points come back exactly
+        low = values.take(corner, axis=0) * (1.0 - a_fraction)
+        low += values.take(corner + 1, axis=0) * a_fraction
+        corner += len(self.angle)
+        high = values.take(corner, axis=0) * (1.0 - a_fraction)
+        high += values.take(corner + 1, axis=0) * a_fraction
+        low *= 1.0 - e_fraction
+        high *= e_fraction
+        low += high
+        low[outside] = np.nan
+        return low.reshape(shape + values.shape[1:])
+
+    def evaluate(self, energy: Any, angle: Any, clip: bool = False) -> np.ndarray:
+        """Interpolate the cross section
+
+        Parameters
+        ----------
+        energy: Any
+            The beam energies (MeV), an array or a scalar
+        angle: Any
+            The center-of-mass angles (degrees), an array or a scalar. Broadcast
+            against energy
+        clip: bool
+            If True, points outside of the grid take the value at its nearest edge.
+            Otherwise they are NaN (default False)
+
+        Returns
+        -------
+        numpy.ndarray
+            The differential cross section (mb/sr) at each point
+        """
+        return self.interpolate(self.cross, energy, angle, clip)
+
+    def evaluate_ls(
+        self, energy: Any, angle: Any, l: int | None = None, clip: bool = False
+    ) -> np.ndarray:
+        """Interpolate the cross section of each l
+
+        Parameters
+        ----------
+        energy: Any
+            The beam energies (MeV), an array or a scalar
+        angle: Any
+            The center-of-mass angles (degrees), an array or a scalar. Broadcast
+            against energy
+        l: int | None
+            The l to interpolate. None interpolates all of them (default None)
+        clip: bool
+            If True, points outside of the grid take the value at its nearest edge.
+            Otherwise they are NaN (default False)
+
+        Returns
+        -------
+        numpy.ndarray
+            The differential cross section (mb/sr) at each point, with a last axis
+            of one entry per l of l_values when l is None
+        """
+        if self.cross_ls is None or self.l_values is None:
+            raise Exception("The table has no cross sections per l!")
+        if l is None:
+            return self.interpolate(self.cross_ls, energy, angle, clip)
+        matches = np.flatnonzero(self.l_values == l)
+        if len(matches) == 0:
+            raise Exception(
+                f"l={l} is not in the set of l values of the table {self.l_values}!"
+            )
+        return self.interpolate(self.cross_ls[:, :, matches[0]], energy, angle, clip)
+
+
+def build_table(
+    energies: np.ndarray, results: list[CrossSectionResult]
+) -> CrossSectionTable:
+    """Build an interpolation table from the results of an energy sweep
+
+    Parameters
+    ----------
+    energies: numpy.ndarray
+        The beam energy (MeV) of each result. There must be at least two, all
+        different
+    results: list[CrossSectionResult]
+        The results, all on the same angles. They are DWBA results if any has
+        cross_ls, in which case all must have it
+
+    Returns
+    -------
+    CrossSectionTable
+        The table
+    """
+    energies = np.asarray(energies, dtype=np.float64)
+    if len(energies) != len(results):
+        raise Exception(
+            f"There are {len(energies)} energies for {len(results)} results!"
+        )
+    order = np.argsort(energies, kind="stable")
+    energies = energies[order]
+    results = [results[idx] for idx in order]
+    if len(energies) < 2 or np.any(np.diff(energies) <= 0.0):
+        raise Exception(
+            f"A table needs at least two results at different energies, but has energies {energies}!"
+        )
+    angle = np.asarray(results[0].angle, dtype=np.float64)
+    if len(angle) < 2 or np.any(np.diff(angle) <= 0.0):
+        raise Exception(
+            f"A table needs at least two increasing angles, but has angles {angle}!"
+        )
+    for energy, result in zip(energies, results):
+        if not np.array_equal(result.angle, angle):
+            raise Exception(
+                f"The result at {energy} MeV is not on the same angles as the result at {energies[0]} MeV!"
+            )
+
+    table = CrossSectionTable(
+        energy=energies,
+        angle=angle,
+        cross=np.stack([np.asarray(result.cross) for result in results]),
+    )
+    with_ls = [result.cross_ls is not None for result in results]
+    if not any(with_ls):
+        return table
+    elif not all(with_ls):
+        raise Exception("Only some of the results of the table have cross_ls!")
+
+    table.l_values = np.unique(np.concatenate([result.l_values for result in results]))
+    table.cross_ls = np.zeros((len(energies), len(angle), len(table.l_values)))
+    for e_index, result in enumerate(results):
+        l_index = np.searchsorted(table.l_values, result.l_values)
+        table.cross_ls[e_index][:, l_index] = np.asarray(result.cross_ls).T
+    return table
+
+
+def parse_selection(text: str) -> tuple[str, Any]:
+    """Parse a selection of a swept field written key=value
+
+    Parameters
+    ----------
+    text: str
+        The selection, like residual.excitation=1.77. The value is read as JSON, and
+        taken as a string if it is not valid JSON (outgoing_potential=an-cai)
+
+    Returns
+    -------
+    tuple[str, Any]
+        The field and its value
+    """
+    key, separator, value = text.partition("=")
+    if separator == "" or key == "":
+        raise Exception(f"Selection {text} is not of the form key=value!")
+    try:
+        return key, loads(value)
+    except JSONDecodeError:
+        return key, value
+
+
+def build_sweep_table(
+    points: list[SweepPoint],
+    data: dict[str, np.ndarray],
+    select: dict[str, Any] | None = None,
+) -> CrossSectionTable:
+    """Build an interpolation table from a parsed energy sweep
+
+    Parameters
+    ----------
+    points: list[SweepPoint]
+        The points of the sweep (see hieroglyph.sweep.read_manifest)
+    data: dict[str, numpy.ndarray]
+        The consolidated results of parse-sweep or run
+    select: dict[str, Any] | None
+        The value of each other swept field to build the table for, so that a single
+        point is left at each energy. None if only the energy was swept
+
+    Returns
+    -------
+    CrossSectionTable
+        The table, over the points which were parsed successfully
+    """
+    if select is None:
+        select = {}
+    data = {key: data[key] for key in data.keys()}
+    values = {point.index: point.values for point in points}
+    energies = []
+    results = []
+    found: dict[float, dict[str, Any]] = {}
+    for idx, sweep_index in enumerate(data["sweep_index"]):
+        point_values = values[int(sweep_index)]
+        if TABLE_ENERGY_KEY not in point_values:
+            raise Exception(
+                f"The sweep does not sweep {TABLE_ENERGY_KEY}, so a table can not be built from it!"
+            )
+        for key, value in select.items():
+            if key not in point_values:
+                raise Exception(
+                    f"Selected field {key} is not in the set of swept fields {tuple(point_values.keys())}!"
+                )
+        if any(point_values[key] != value for key, value in select.items()):
+            continue
+        result = get_batch_result(data, idx)
+        if result is None:
+            continue
+        energy = float(point_values[TABLE_ENERGY_KEY])
+        if energy in found:
+            varying = [
+                key
+                for key in point_values.keys()
+                if key != TABLE_ENERGY_KEY and point_values[key] != found[energy][key]
+            ]
+            raise Exception(
+                f"Several points are at {energy} MeV! Select a single value of {varying}"
+            )
+        found[energy] = point_values
+        energies.append(energy)
+        results.append(result)
+    return build_table(np.array(energies), results)
+
+
+def write_table(table: CrossSectionTable, table_path: Path):
+    """Write an interpolation table to disk
+
+    The table is written as a directory of .npy files, so that it can be
+    memory-mapped by load_table.
+
+    Parameters
+    ----------
+    table: CrossSectionTable
+        The table
+    table_path: Path
+        The directory to write the table to
+    """
+    write_arrays(table.arrays(), Path(table_path), FORMAT_NPY)
+
+
+def load_table(table_path: Path, mmap: bool = True) -> CrossSectionTable:
+    """Load an interpolation table written by write_table
+
+    Parameters
+    ----------
+    table_path: Path
+        The directory of the table
+    mmap: bool
+        If True, the arrays are memory-mapped read-only instead of read into memory
+        (default True)
+
+    Returns
+    -------
+    CrossSectionTable
+        The table
+    """
+    return CrossSectionTable(**load_arrays(Path(table_path), mmap))
@@ -1,10 +1,262 @@
-from hieroglyph.create import create_input
-from hieroglyph.parse import (
-    parse_elastic_differential_cross_section,
-    parse_dwba_differential_cross_section,
+from hieroglyph.create import create_input, CREATED, CHANGED, UNCHANGED
+from hieroglyph.registry import register_potential_file
+from hieroglyph.run import (
+    read_run_points,
+    read_run_base,
+    run_sweep,
+    default_ptolemy,
+    DEFAULT_PTOLEMY,
+    DEFAULT_RETRIES,
+    PTOLEMY_ENV,
+    RAW_FORMATS,
+    RAW_NONE,
 )
+from hieroglyph.sweep import (
+    create_sweep as create_sweep_inputs,
+    read_manifest,
+    read_manifest_base,
+    count_input_status,
+    read_sweep_outputs,
+    consolidate_sweep,
+    MANIFEST_NAME,
+    DEFAULT_OUTPUT_SUFFIX,
+)
+from hieroglyph.parse import read_differential_cross_section
+from hieroglyph.batch import (
+    find_ptolemy_outputs,
+    parse_batch as parse_outputs,
+    consolidate_batch,
+)
+from hieroglyph.index import get_index, get_reaction, read_reaction
+from hieroglyph.chunked import read_chunked
+from hieroglyph.follow import follow_output
+from hieroglyph.cache import default_parse_cache, default_run_cache
+from hieroglyph.store import ResultStore, store_sweep
+from hieroglyph.table import build_sweep_table, parse_selection, write_table
+from hieroglyph.parse import ELASTIC, DWBA
+from hieroglyph.result import (
+    write_arrays,
+    write_result,
+    load_arrays,
+    OUTPUT_FORMATS,
+    FORMAT_NPZ_COMPRESSED,
+)
+from click.core import ParameterSource
 from pathlib import Path
 import click
+import sys
+
+
+def output_options(command):
+    """Add the options controlling how parsed results are written to a command"""
+    command = click.option(
+        "--compression-level",
+        type=click.IntRange(0, 9),
+        default=None,
+        help="zlib compression level of the npz-compressed format (default: zlib default)",
+    )(command)
+    command = click.option(
+        "--format",
+        "output_format",
+        type=click.Choice(OUTPUT_FORMATS),
+        default=FORMAT_NPZ_COMPRESSED,
+        show_default=True,
+        help="Output format. npy writes a directory of .npy files which can be memory-mapped",
+    )(command)
+    return command
+
+
+def extras_option(command):
+    """Add the option to collect the extra tables of an output to a command"""
+    return click.option(
+        "--extras",
+        is_flag=True,
+        help="Also collect the Rutherford ratio/analyzing power and the total cross sections",
+    )(command)
+
+
+def potentials_option(command):
+    """Add the option to register extra potential definitions to a command"""
+    return click.option(
+        "--potentials",
+        type=click.Path(exists=True),
+        multiple=True,
+        help="JSON or TOML file of extra potential definitions (can be given several times)",
+    )(command)
+
+
+def keep_raw_option(command):
+    """Add the option to keep a compressed copy of an output read from stdin"""
+    return click.option(
+        "--keep-raw",
+        type=click.Path(),
+        default=None,
+        help="When reading the output from stdin (-), also write a gzip-compressed copy of it here",
+    )(command)
+
+
+def no_cache_option(command):
+    """Add the option to skip the cache of parsed results to a command"""
+    return click.option(
+        "--no-cache",
+        is_flag=True,
+        help="Always parse, ignoring (and not filling) the cache of parsed results",
+    )(command)
+
+
+def store_option(command):
+    """Add the option to also append the results to a result store to a command"""
+    return click.option(
+        "--store",
+        type=click.Path(file_okay=False),
+        default=None,
+        help="Also append the results to the result store in this directory (created if needed)",
+    )(command)
+
+
+def parse_options(command):
+    """Add the options shared by parse-elastic and parse-dwba to a command"""
+    command = keep_raw_option(command)
+    command = no_cache_option(command)
+    command = extras_option(command)
+    command = click.option(
+        "--idle-timeout",
+        type=float,
+        default=300.0,
+        show_default=True,
+        help="With --follow, stop after the output has not grown for this many seconds, if the calculation has not finished before",
+    )(command)
+    command = click.option(
+        "--follow",
+        is_flag=True,
+        help="Parse the output while PTOLEMY is still writing it (always writes the npy format)",
+    )(command)
+    command = click.option(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="Parse in chunks split at page boundaries across this many processes",
+    )(command)
+    command = click.option(
+        "--reaction",
+        type=int,
+        default=None,
+        help="Only parse this calculation (counting from 0) of a multi-reaction output, read through the index rather than the cache",
+    )(command)
+    return output_options(command)
+
+
+def is_given(name: str) -> bool:
+    """Check whether an option was given, rather than left at its default"""
+    return click.get_current_context().get_parameter_source(name) in (
+        ParameterSource.COMMANDLINE,
+        ParameterSource.ENVIRONMENT,
+    )
+
+
+def check_parse_options(
+    ptolemy_path: str,
+    compression_level: int | None,
+    reaction: int | None,
+    workers: int | None,
+    follow: bool,
+    extras: bool,
+    keep_raw: str | None,
+):
+    """Reject the parse options which do not apply together"""
+    if ptolemy_path == "-":
+        if reaction is not None or workers is not None or follow:
+            raise click.UsageError(
+                "--reaction, --workers, and --follow need a PTOLEMY output file, not stdin"
+            )
+    elif keep_raw is not None:
+        raise click.UsageError(
+            "--keep-raw only applies when reading the output from stdin (-)"
+        )
+    if follow:
+        given = {
+            "--format": is_given("output_format"),
+            "--compression-level": compression_level is not None,
+            "--reaction": reaction is not None,
+            "--workers": workers is not None,
+            "--extras": extras,
+        }
+        for option, is_set in given.items():
+            if is_set:
+                raise click.UsageError(f"{option} is not supported with --follow")
+    elif is_given("idle_timeout"):
+        raise click.UsageError("--idle-timeout only applies with --follow")
+    if reaction is not None and workers is not None:
+        raise click.UsageError(
+            "--workers is not supported with --reaction, which only reads one calculation"
+        )
+
+
+def parse_calculation(
+    kind: str,
+    ptolemy_path: str,
+    parsed_path: str,
+    output_format: str,
+    compression_level: int | None,
+    reaction: int | None,
+    workers: int | None,
+    follow: bool,
+    idle_timeout: float,
+    extras: bool,
+    no_cache: bool,
+    keep_raw: str | None,
+):
+    """Parse a PTOLEMY output of one kind of calculation for parse-elastic and parse-dwba"""
+    check_parse_options(
+        ptolemy_path, compression_level, reaction, workers, follow, extras, keep_raw
+    )
+    click.echo("------- Hieroglyph: The PTOLEMY translator -------")
+    click.echo(f"Parsing the PTOLEMY {KIND_NAMES[kind]} output file {ptolemy_path}")
+    click.echo(f"Output will be written to {parsed_path}")
+    cache = None if no_cache else default_parse_cache()
+    if follow:
+        click.echo("Following the output, rows are appended as each block completes")
+        n_rows, finished = follow_output(
+            Path(ptolemy_path),
+            Path(parsed_path),
+            kind,
+            idle_timeout,
+            lambda rows: click.echo(f"Wrote {rows} rows"),
+        )
+        if finished:
+            click.echo(f"Calculation finished with {n_rows} rows")
+        else:
+            click.echo(
+                f"Output went idle for {idle_timeout} s, finished with {n_rows} rows"
+            )
+        click.echo("-------------------------------------------------")
+        return
+    if ptolemy_path == "-":
+        result = read_differential_cross_section(
+            sys.stdin,
+            kind,
+            cache,
+            extras=extras,
+            raw_path=None if keep_raw is None else Path(keep_raw),
+        )
+    elif workers is not None:
+        click.echo(f"Parsing in chunks across {workers} processes")
+        result = read_chunked(Path(ptolemy_path), kind, workers, extras, cache)
+    elif reaction is None:
+        result = read_differential_cross_section(
+            Path(ptolemy_path), kind, cache, extras=extras
+        )
+    else:
+        click.echo(f"Parsing only calculation {reaction}, without the parse cache")
+        entry = get_reaction(get_index(Path(ptolemy_path)), kind, reaction)
+        result = read_reaction(Path(ptolemy_path), entry, extras)
+    write_result(result, Path(parsed_path), output_format, compression_level)
+    click.echo("-------------------------------------------------")
+
+
+# How each kind of calculation is named in the messages of the parse commands
+KIND_NAMES = {ELASTIC: "elastic scattering", DWBA: "DWBA scattering"}
 
 
 @click.group()
@@ -14,48 +266,437 @@ def cli():
 
 @cli.command()
 @click.argument("config", type=click.Path(exists=True))
-def create(config: str):
+@potentials_option
+def create(config: str, potentials: tuple[str, ...]):
     """Create a PTOLEMY input file given a JSON configuration
 
     CONFIG is the JSON configuration file
     """
     click.echo("------- Hieroglyph: The PTOLEMY translator -------")
+    for potential_path in potentials:
+        names = register_potential_file(Path(potential_path))
+        click.echo(f"Registered potentials {names} from {potential_path}")
     click.echo(f"Generating a PTOLEMY input file from configuration: {config}")
-    create_input(Path(config))
+    status = create_input(Path(config))
+    if status == UNCHANGED:
+        click.echo("The input is unchanged and was left as is")
+    else:
+        click.echo(f"The input was {status}")
     click.echo("-------------------------------------------------")
 
 
 @cli.command()
-@click.argument("ptolemy_path", type=click.Path(exists=True))
+@click.argument("config", type=click.Path(exists=True))
+@click.argument("sweep", type=click.Path(exists=True))
+@click.argument("output_dir", type=click.Path())
+@click.option(
+    "-j",
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of worker processes (default: one per CPU)",
+)
+@click.option(
+    "--bundle",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of reactions packed into each input, so PTOLEMY starts once per bundle",
+)
+@potentials_option
+def create_sweep(
+    config: str,
+    sweep: str,
+    output_dir: str,
+    workers: int | None,
+    bundle: int,
+    potentials: tuple[str, ...],
+):
+    """Create the PTOLEMY inputs of a grid of configurations
+
+    \b
+    CONFIG is the base JSON configuration
+    SWEEP is the JSON file of the swept fields and their values
+    OUTPUT_DIR is the directory the inputs and their manifest are written to
+    """
+    click.echo("------- Hieroglyph: The PTOLEMY translator -------")
+    click.echo(f"Generating PTOLEMY input files from configuration: {config}")
+    click.echo(f"Sweeping the fields of {sweep}")
+    points = create_sweep_inputs(
+        Path(config),
+        Path(sweep),
+        Path(output_dir),
+        workers,
+        tuple(Path(potential_path) for potential_path in potentials),
+        bundle,
+    )
+    failures = [point for point in points if point.error]
+    for point in failures:
+        click.echo(
+            f"Failed to create point {point.index} {point.values}: {point.error}"
+        )
+    click.echo(f"Created {len(points) - len(failures)} of {len(points)} reactions")
+    counts = count_input_status(points)
+    click.echo(
+        f"Inputs created: {counts[CREATED]}, changed: {counts[CHANGED]}, unchanged: {counts[UNCHANGED]}"
+    )
+    click.echo(f"Manifest written to {Path(output_dir) / MANIFEST_NAME}")
+    click.echo("-------------------------------------------------")
+
+
+@cli.command()
+@click.argument("ptolemy_path", type=click.Path(exists=True, allow_dash=True))
 @click.argument("parsed_path", type=click.Path())
-def parse_elastic(ptolemy_path: str, parsed_path: str):
+@parse_options
+def parse_elastic(
+    ptolemy_path: str,
+    parsed_path: str,
+    output_format: str,
+    compression_level: int | None,
+    reaction: int | None,
+    workers: int | None,
+    follow: bool,
+    idle_timeout: float,
+    extras: bool,
+    no_cache: bool,
+    keep_raw: str | None,
+):
     """Parse the PTOLEMY output from an elastic calculation
 
     \b
-    PTOLEMY_PATH is the path to the PTOLEMY output
+    PTOLEMY_PATH is the path to the PTOLEMY output, or - to read it from stdin
     PARSED_PATH is the path to which the parsed result will be written
     """
+    parse_calculation(
+        ELASTIC,
+        ptolemy_path,
+        parsed_path,
+        output_format,
+        compression_level,
+        reaction,
+        workers,
+        follow,
+        idle_timeout,
+        extras,
+        no_cache,
+        keep_raw,
+    )
+
+
+@cli.command()
+@click.argument("ptolemy_path", type=click.Path(exists=True, allow_dash=True))
+@click.argument("parsed_path", type=click.Path())
+@parse_options
+def parse_dwba(
+    ptolemy_path: str,
+    parsed_path: str,
+    output_format: str,
+    compression_level: int | None,
+    reaction: int | None,
+    workers: int | None,
+    follow: bool,
+    idle_timeout: float,
+    extras: bool,
+    no_cache: bool,
+    keep_raw: str | None,
+):
+    """Parse the PTOLEMY output from a DWBA calculation
+
+    \b
+    PTOLEMY_PATH is the path to the PTOLEMY output, or - to read it from stdin
+    PARSED_PATH is the path to which the parsed result will be written
+    """
+    parse_calculation(
+        DWBA,
+        ptolemy_path,
+        parsed_path,
+        output_format,
+        compression_level,
+        reaction,
+        workers,
+        follow,
+        idle_timeout,
+        extras,
+        no_cache,
+        keep_raw,
+    )
+
+
+@cli.command()
+@click.argument("ptolemy_path", type=click.Path(exists=True))
+def index(ptolemy_path: str):
+    """Index the calculations within a PTOLEMY output
+
+    The index is written next to the output (as <output>.index.json) and lets
+    parse-elastic/parse-dwba --reaction seek straight to a single calculation.
+
+    \b
+    PTOLEMY_PATH is the path to the PTOLEMY output
+    """
+    click.echo("------- Hieroglyph: The PTOLEMY translator -------")
+    click.echo(f"Indexing the PTOLEMY output file {ptolemy_path}")
+    output_index = get_index(Path(ptolemy_path))
+    for kind in (ELASTIC, DWBA):
+        entries = [entry for entry in output_index.reactions if entry.kind == kind]
+        click.echo(f"Found {len(entries)} {kind} calculations")
+        for number, entry in enumerate(entries):
+            click.echo(
+                f"  {number}: bytes {entry.start}-{entry.end} in {len(entry.blocks)} blocks"
+            )
+    click.echo("-------------------------------------------------")
+
+
+@cli.command()
+@click.argument("source", type=str)
+@click.argument("parsed_path", type=click.Path())
+@click.option(
+    "-j",
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of worker processes (default: one per CPU)",
+)
+@output_options
+@no_cache_option
+def parse_batch(
+    source: str,
+    parsed_path: str,
+    workers: int | None,
+    output_format: str,
+    compression_level: int | None,
+    no_cache: bool,
+):
+    """Parse many PTOLEMY outputs into one consolidated dataset
+
+    Elastic and DWBA outputs are detected automatically.
+
+    \b
+    SOURCE is a directory of PTOLEMY outputs or a glob pattern (quote it!)
+    PARSED_PATH is the path to which the consolidated result will be written
+    """
     click.echo("------- Hieroglyph: The PTOLEMY translator -------")
-    click.echo(f"Parsing the PTOLEMY elastic scattering output file {ptolemy_path}")
+    ptolemy_paths = find_ptolemy_outputs(source)
+    if len(ptolemy_paths) == 0:
+        raise click.UsageError(f"No PTOLEMY outputs found in {source}!")
+    click.echo(f"Parsing {len(ptolemy_paths)} PTOLEMY output files from {source}")
     click.echo(f"Output will be written to {parsed_path}")
-    parse_elastic_differential_cross_section(Path(ptolemy_path), Path(parsed_path))
+    parsed = parse_outputs(
+        ptolemy_paths, workers, None if no_cache else default_parse_cache()
+    )
+    failures = [
+        (path, error) for path, (_, _, error) in zip(ptolemy_paths, parsed) if error
+    ]
+    for path, error in failures:
+        click.echo(f"Failed to parse {path}: {error}")
+    click.echo(f"Parsed {len(parsed) - len(failures)} of {len(parsed)} files")
+    write_arrays(
+        consolidate_batch(ptolemy_paths, parsed),
+        Path(parsed_path),
+        output_format,
+        compression_level,
+    )
     click.echo("-------------------------------------------------")
 
 
 @cli.command()
-@click.argument("ptolemy_path", type=click.Path(exists=True))
+@click.argument("manifest", type=click.Path(exists=True))
 @click.argument("parsed_path", type=click.Path())
-def parse_dwba(ptolemy_path: str, parsed_path: str):
-    """Parse the PTOLEMY output from a DWBA calculation
+@click.option(
+    "--suffix",
+    default=DEFAULT_OUTPUT_SUFFIX,
+    show_default=True,
+    help="Suffix of the PTOLEMY outputs, which replaces that of the inputs",
+)
+@click.option(
+    "-j",
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of worker processes (default: one per CPU)",
+)
+@output_options
+@store_option
+def parse_sweep(
+    manifest: str,
+    parsed_path: str,
+    suffix: str,
+    workers: int | None,
+    output_format: str,
+    compression_level: int | None,
+    store: str | None,
+):
+    """Parse the PTOLEMY outputs of a sweep made by create-sweep
+
+    Bundled outputs are split back into one result per reaction, and every result
+    is tagged with the index of its point in the manifest.
 
     \b
-    PTOLEMY_PATH is the path to the PTOLEMY output
-    PARSED_PATH is the path to which the parsed result will be written
+    MANIFEST is the manifest.json written by create-sweep
+    PARSED_PATH is the path to which the consolidated result will be written
     """
     click.echo("------- Hieroglyph: The PTOLEMY translator -------")
-    click.echo(f"Parsing the PTOLEMY DWBA scattering output file {ptolemy_path}")
+    points = read_manifest(Path(manifest))
+    click.echo(f"Parsing the PTOLEMY outputs of {len(points)} sweep points")
     click.echo(f"Output will be written to {parsed_path}")
-    parse_dwba_differential_cross_section(Path(ptolemy_path), Path(parsed_path))
+    parsed = read_sweep_outputs(points, suffix, workers)
+    failures = [(point, error) for point, (_, _, error) in zip(points, parsed) if error]
+    for point, error in failures:
+        click.echo(f"Failed to parse point {point.index}: {error}")
+    click.echo(f"Parsed {len(parsed) - len(failures)} of {len(parsed)} points")
+    write_arrays(
+        consolidate_sweep(points, parsed, suffix),
+        Path(parsed_path),
+        output_format,
+        compression_level,
+    )
+    if store is not None:
+        n_stored = store_sweep(
+            ResultStore(Path(store)),
+            read_manifest_base(Path(manifest)),
+            points,
+            parsed,
+        )
+        click.echo(f"Appended {n_stored} results to the store {store}")
+    click.echo("-------------------------------------------------")
+
+
+@cli.command()
+@click.argument("source", type=click.Path(exists=True))
+@click.argument("parsed_path", type=click.Path())
+@click.option(
+    "--ptolemy",
+    default=None,
+    help=f"PTOLEMY executable (default: ${PTOLEMY_ENV}, or {DEFAULT_PTOLEMY} on the PATH)",
+)
+@click.option(
+    "-j",
+    "--workers",
+    type=int,
+    default=None,
+    help="Number of PTOLEMY processes run at once (default: one per CPU)",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Time limit of each PTOLEMY run in seconds (default: none)",
+)
+@click.option(
+    "--retries",
+    type=click.IntRange(min=0),
+    default=DEFAULT_RETRIES,
+    show_default=True,
+    help="Number of times a failed or timed out run is retried",
+)
+@click.option(
+    "--suffix",
+    default=DEFAULT_OUTPUT_SUFFIX,
+    show_default=True,
+    help="Suffix of the PTOLEMY outputs, which replaces that of the inputs",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Always run PTOLEMY, ignoring (and not filling) the cache of runs",
+)
+@click.option(
+    "--raw",
+    "raw_format",
+    type=click.Choice(RAW_FORMATS),
+    default=RAW_NONE,
+    show_default=True,
+    help="Keep the raw PTOLEMY output next to each input: not at all, as text, or gzip-compressed",
+)
+@potentials_option
+@output_options
+@store_option
+def run(
+    source: str,
+    parsed_path: str,
+    ptolemy: str | None,
+    workers: int | None,
+    timeout: float | None,
+    retries: int,
+    suffix: str,
+    no_cache: bool,
+    raw_format: str,
+    potentials: tuple[str, ...],
+    output_format: str,
+    compression_level: int | None,
+    store: str | None,
+):
+    """Run PTOLEMY on a configuration or a sweep and parse the results
+
+    \b
+    SOURCE is a JSON configuration, or the manifest.json written by create-sweep
+    PARSED_PATH is the path to which the consolidated result will be written
+    """
+    click.echo("------- Hieroglyph: The PTOLEMY translator -------")
+    for potential_path in potentials:
+        names = register_potential_file(Path(potential_path))
+        click.echo(f"Registered potentials {names} from {potential_path}")
+    if ptolemy is None:
+        ptolemy = default_ptolemy()
+    points = read_run_points(Path(source))
+    click.echo(f"Running {ptolemy} on the inputs of {len(points)} points from {source}")
+    click.echo(f"Output will be written to {parsed_path}")
+    cache = None if no_cache else default_run_cache()
+    parsed = run_sweep(
+        points, ptolemy, workers, timeout, retries, suffix, raw_format, cache
+    )
+    failures = [(point, error) for point, (_, _, error) in zip(points, parsed) if error]
+    for point, error in failures:
+        click.echo(f"Failed point {point.index}: {error}")
+    click.echo(f"Ran and parsed {len(parsed) - len(failures)} of {len(parsed)} points")
+    if cache is not None:
+        click.echo(
+            f"Run cache: {cache.hits} hits, {cache.misses} misses (hit rate {cache.hit_rate:.0%})"
+        )
+    write_arrays(
+        consolidate_sweep(points, parsed, suffix),
+        Path(parsed_path),
+        output_format,
+        compression_level,
+    )
+    if store is not None:
+        n_stored = store_sweep(
+            ResultStore(Path(store)), read_run_base(Path(source)), points, parsed
+        )
+        click.echo(f"Appended {n_stored} results to the store {store}")
+    click.echo("-------------------------------------------------")
+
+
+@cli.command()
+@click.argument("manifest", type=click.Path(exists=True))
+@click.argument("parsed_path", type=click.Path(exists=True))
+@click.argument("table_path", type=click.Path(file_okay=False))
+@click.option(
+    "--select",
+    multiple=True,
+    help="Value of another swept field to build the table for, as key=value (can be given several times)",
+)
+def build_table(
+    manifest: str, parsed_path: str, table_path: str, select: tuple[str, ...]
+):
+    """Build an interpolation table of the cross section over energy and angle
+
+    \b
+    MANIFEST is the manifest.json of an energy sweep made by create-sweep
+    PARSED_PATH is the result of parse-sweep or run for the sweep
+    TABLE_PATH is the directory to which the table will be written
+    """
+    click.echo("------- Hieroglyph: The PTOLEMY translator -------")
+    points = read_manifest(Path(manifest))
+    selection = dict(parse_selection(text) for text in select)
+    click.echo(f"Building a table from the {len(points)} sweep points of {manifest}")
+    table = build_sweep_table(points, load_arrays(Path(parsed_path)), selection)
+    click.echo(
+        f"Table of {len(table.energy)} energies ({table.energy[0]} to {table.energy[-1]} MeV) by {len(table.angle)} angles ({table.angle[0]} to {table.angle[-1]} degrees)"
+    )
+    if table.l_values is not None:
+        click.echo(f"Cross sections per l for l = {table.l_values.tolist()}")
+    write_table(table, Path(table_path))
+    click.echo(f"Table written to {table_path}")
     click.echo("-------------------------------------------------")
 
 
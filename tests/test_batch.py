@@ -0,0 +1,31 @@
+from pathlib import Path
+from click.testing import CliRunner
+
+from hieroglyph.batch import consolidate_batch, get_batch_result, parse_output
+from hieroglyph.parse import DWBA, DWBA_CS_HEADER, UNKNOWN
+from main import cli
+
+
+def test_parse_output_keeps_detected_kind(tmp_path: Path):
+    broken = tmp_path / "broken.out"
+    broken.write_text(f"{DWBA_CS_HEADER} ONE    LAB    ANGLE\n  garbage\n")
+    empty = tmp_path / "empty.out"
+    empty.write_text("NOTHING TO SEE\n")
+    parsed = [parse_output(broken), parse_output(empty)]
+    kind, result, error = parsed[0]
+    assert kind == DWBA
+    assert result is None
+    assert error != ""
+    assert parsed[1] == (UNKNOWN, None, "No cross section table found")
+
+    data = consolidate_batch([broken, empty], parsed)
+    assert get_batch_result(data, 0) is None
+    assert get_batch_result(data, 1) is None
+
+
+def test_parse_batch_no_outputs(tmp_path: Path):
+    result = CliRunner().invoke(
+        cli, ["parse-batch", str(tmp_path / "*.out"), str(tmp_path / "parsed.npz")]
+    )
+    assert result.exit_code == 2
+    assert "No PTOLEMY outputs found" in result.output
@@ -0,0 +1,79 @@
+from pathlib import Path
+import os
+import numpy as np
+import pytest
+
+from hieroglyph import parse
+from hieroglyph.cache import ResultCache, RunCache
+from hieroglyph.parse import ELASTIC, read_differential_cross_section
+from hieroglyph.result import CrossSectionResult
+
+RESULT = CrossSectionResult(angle=np.array([0.0, 10.0]), cross=np.array([1.0, 2.0]))
+
+
+def write_elastic(ptolemy_path: Path, scale: float):
+    with open(ptolemy_path, "w") as out:
+        out.write(f"{parse.ELASTIC_CS_HEADER}  TYPE\n")
+        out.write("      C.M.         RUTHERFORD         MB/SR\n")
+        for angle in (0.0, 10.0, 20.0):
+            out.write(
+                f" {angle:9.3f}  1.00000E+00  0.5000  {scale * (1.0 + angle):12.5E}  {scale * (1.0 + angle):12.5E}   0.10\n"
+            )
+        out.write(f"{parse.ELASTIC_CS_FOOTER_ALT} = 123.4 MB\n")
+
+
+def test_parse_cache_hit_and_invalidation(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    ptolemy_path = tmp_path / "elastic.out"
+    write_elastic(ptolemy_path, 1.0)
+    cache = ResultCache(tmp_path / "cache", 1 << 30)
+    first = read_differential_cross_section(ptolemy_path, ELASTIC, cache)
+    second = read_differential_cross_section(ptolemy_path, ELASTIC, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(first.cross, second.cross)
+
+    # A changed output, or a new parser version, is parsed again
+    write_elastic(ptolemy_path, 2.0)
+    changed = read_differential_cross_section(ptolemy_path, ELASTIC, cache)
+    np.testing.assert_array_equal(changed.cross, 2.0 * first.cross)
+    monkeypatch.setattr(parse, "PARSER_VERSION", f"{parse.PARSER_VERSION}-next")
+    read_differential_cross_section(ptolemy_path, ELASTIC, cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    cache = ResultCache(tmp_path / "cache", 1 << 30)
+    cache.put("first", RESULT)
+    cache.put("second", RESULT)
+    entry_size = cache.get_entry_path("first").stat().st_size
+    # Made older than any hit, so the order does not hang on the clock's resolution
+    for key in ("first", "second"):
+        os.utime(cache.get_entry_path(key), (0, 0))
+    assert cache.get("first") is not None
+    cache.max_bytes = 3 * entry_size - 1
+    cache.put("third", RESULT)
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+@pytest.mark.parametrize(
+    "content", [b"", b"not an npz", b"PK\x03\x04 truncated zip", None]
+)
+def test_cache_removes_corrupt_entries(tmp_path: Path, content: bytes | None):
+    cache = RunCache(tmp_path / "cache", 1 << 30)
+    cache.put("result", RESULT)
+    cache.put_reactions("run", [(ELASTIC, RESULT)])
+    for key in ("result", "run"):
+        entry_path = cache.get_entry_path(key)
+        if content is None:
+            # A valid npz of the wrong layout
+            np.savez(entry_path, unexpected=np.zeros(2))
+        else:
+            entry_path.write_bytes(content)
+    assert cache.get("result") is None
+    assert cache.get_reactions("run") is None
+    assert not cache.get_entry_path("result").exists()
+    assert not cache.get_entry_path("run").exists()
+    assert cache.misses == 2
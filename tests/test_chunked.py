@@ -0,0 +1,113 @@
+from pathlib import Path
+import numpy as np
+import pytest
+
+from hieroglyph.cache import ResultCache
+from hieroglyph.chunked import read_chunked, split_at_pages
+from hieroglyph.parse import (
+    DWBA,
+    DWBA_CS_FOOTER,
+    DWBA_CS_FOOTER_ALT,
+    DWBA_CS_HEADER,
+    ELASTIC,
+    ELASTIC_CS_FOOTER,
+    ELASTIC_CS_FOOTER_ALT,
+    ELASTIC_CS_HEADER,
+    read_differential_cross_section,
+)
+
+# Enough Lx's that PTOLEMY breaks them, and their totals, over three lines
+L_VALUES = (0, 1, 2, 3, 4, 5, 6)
+N_PAGES = 6
+ANGLES_PER_PAGE = 5
+
+
+def write_pages(ptolemy_path: Path, kind: str):
+    angles = np.arange(N_PAGES * ANGLES_PER_PAGE, dtype=float)
+    with open(ptolemy_path, "w") as out:
+        out.write("   SOME OTHER OUTPUT LINE  1.234E+00\n")
+        for page in range(N_PAGES):
+            page_angles = angles[page * ANGLES_PER_PAGE : (page + 1) * ANGLES_PER_PAGE]
+            if kind == DWBA:
+                out.write(f"{DWBA_CS_HEADER} ONE    LAB    ANGLE\n")
+                out.write("  ANGLE     SIGMA      ASYMMETRY  ...\n")
+                out.write("       (MB/SR)      \n")
+                out.write("  \n")
+                for idx in range(0, len(L_VALUES), 3):
+                    group = L_VALUES[idx : idx + 3]
+                    out.write("".join(f"   LX =  {l:d}  +" for l in group) + "\n")
+                out.write("\n")
+                for angle in page_angles:
+                    values = [angle + l + 1.0 for l in L_VALUES]
+                    out.write(
+                        f" {angle:7.2f} {sum(values):11.4E} {0.1:9.4f} {0:4d} {30:4d} {1.0:7.2f} {angle:8.3f} {0.5:8.4f} {0.5:8.4f}"
+                    )
+                    for idx in range(0, len(values), 3):
+                        out.write(
+                            "".join(
+                                f" {value:11.4E}" for value in values[idx : idx + 3]
+                            )
+                        )
+                        out.write("\n")
+            else:
+                out.write(f"{ELASTIC_CS_HEADER}  TYPE\n")
+                out.write("      C.M.         RUTHERFORD         MB/SR\n")
+                for angle in page_angles:
+                    out.write(
+                        f" {angle:9.3f}  1.00000E+00  0.5000  {1.0 + angle:12.5E}  {1.0 + angle:12.5E}   0.10\n"
+                    )
+            if page < N_PAGES - 1:
+                banner = DWBA_CS_FOOTER if kind == DWBA else ELASTIC_CS_FOOTER
+                out.write(f"{banner}     VERSION  1.0\n")
+                out.write("   SOME OTHER OUTPUT LINE  1.234E+00\n")
+            elif kind == DWBA:
+                totals = [0.5 * (l + 1) for l in L_VALUES]
+                out.write(f"{DWBA_CS_FOOTER_ALT}  {sum(totals):11.4E}")
+                for idx in range(0, len(totals), 3):
+                    out.write(
+                        "".join(f" {total:11.4E}" for total in totals[idx : idx + 3])
+                    )
+                    out.write("\n")
+            else:
+                out.write(f"{ELASTIC_CS_FOOTER_ALT} = 123.4 MB\n")
+        out.write("   SOME OTHER OUTPUT LINE  1.234E+00\n")
+
+
+def test_split_at_pages():
+    banners = [100, 200, 300]
+    assert split_at_pages(400, banners, 1) == [(0, 400)]
+    # More chunks than pages cuts at every banner, and no more
+    chunks = split_at_pages(400, banners, 16)
+    assert chunks == [(0, 100), (100, 200), (200, 300), (300, 400)]
+    assert split_at_pages(400, [], 4) == [(0, 400)]
+
+
+@pytest.mark.parametrize("kind", [ELASTIC, DWBA])
+@pytest.mark.parametrize("extras", [False, True])
+def test_chunked_matches_serial(kind: str, extras: bool, tmp_path: Path):
+    ptolemy_path = tmp_path / "calculation.out"
+    write_pages(ptolemy_path, kind)
+    serial = read_differential_cross_section(ptolemy_path, kind, extras=extras)
+    # Enough chunks that the output is cut at every page, so the last chunk only
+    # holds the final page and the wrapped totals after it
+    chunked = read_chunked(ptolemy_path, kind, n_workers=N_PAGES, extras=extras)
+    serial_arrays = serial.arrays()
+    chunked_arrays = chunked.arrays()
+    assert serial_arrays.keys() == chunked_arrays.keys()
+    for name, array in serial_arrays.items():
+        np.testing.assert_array_equal(chunked_arrays[name], array, err_msg=name)
+    assert len(chunked.angle) == N_PAGES * ANGLES_PER_PAGE
+    if kind == DWBA and extras:
+        np.testing.assert_allclose(
+            chunked.total_cross_ls[:, 0], [0.5 * (l + 1) for l in L_VALUES]
+        )
+
+
+def test_chunked_shares_cache(tmp_path: Path):
+    ptolemy_path = tmp_path / "calculation.out"
+    write_pages(ptolemy_path, DWBA)
+    cache = ResultCache(tmp_path / "cache", 1 << 30)
+    chunked = read_chunked(ptolemy_path, DWBA, n_workers=2, cache=cache)
+    serial = read_differential_cross_section(ptolemy_path, DWBA, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    np.testing.assert_array_equal(serial.cross_ls, chunked.cross_ls)
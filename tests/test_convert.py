@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from spyral_utils.nuclear import NuclearDataMap
+
+from hieroglyph.convert import convert_to_target_ke, convert_to_target_ke_array
+
+ENERGIES = np.array([0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0, 1000.0])
+
+
+@pytest.mark.parametrize(
+    "projectile, target", [((50, 132), (1, 1)), ((8, 16), (1, 2)), ((20, 48), (2, 4))]
+)
+def test_array_matches_scalar(projectile: tuple[int, int], target: tuple[int, int]):
+    nuc_map = NuclearDataMap()
+    projectile_data = nuc_map.get_data(*projectile)
+    target_data = nuc_map.get_data(*target)
+    converted = convert_to_target_ke_array(ENERGIES, projectile_data, target_data)
+    assert converted.shape == ENERGIES.shape
+    for energy, value in zip(ENERGIES, converted):
+        # The scalar path loses digits in E - M for a heavy projectile
+        assert value == pytest.approx(
+            convert_to_target_ke(float(energy), projectile_data, target_data),
+            rel=1.0e-8,
+        )
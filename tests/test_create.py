@@ -0,0 +1,46 @@
+from json import dumps, loads
+from pathlib import Path
+import pytest
+
+from hieroglyph.create import (
+    CREATED,
+    UNCHANGED,
+    bundle_inputs,
+    create_channel_parameters,
+    create_input,
+    unbundle_input,
+)
+from hieroglyph.potentials import DAEHNICK, create_parameters
+
+DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_out_of_range_warns():
+    with pytest.warns(UserWarning, match=f"Potential {DAEHNICK} is being used outside"):
+        params = create_channel_parameters(5.0, 20, 48, DAEHNICK)
+    assert params is create_parameters(5.0, 20, 48, DAEHNICK)
+
+
+def test_unbundle_input():
+    reactions = [
+        "reaction: 16O(d,d)\nELAB=20.0\nRETURN\n",
+        "reaction: 18O(d,p)\nRETURN\n",
+    ]
+    text = bundle_inputs([("point 0", reactions[0]), ("point 1", reactions[1])])
+    assert unbundle_input(text) == reactions
+    assert unbundle_input(reactions[0]) == [reactions[0]]
+
+
+@pytest.mark.parametrize("name", ["elastic", "inelastic", "transfer_dt", "transfer_dp"])
+def test_render_matches_baseline(name: str, tmp_path: Path):
+    # The expected inputs were rendered by hieroglyph before any of the parameter
+    # records, caches, or array potentials, so they must still match byte for byte
+    config = loads((DATA_PATH / f"{name}.json").read_text())
+    config["ptolemy_config_path"] = str(tmp_path / f"{name}.in")
+    config_path = tmp_path / f"{name}.json"
+    config_path.write_text(dumps(config))
+    assert create_input(config_path) == CREATED
+    assert (tmp_path / f"{name}.in").read_text() == (
+        DATA_PATH / f"{name}.in"
+    ).read_text()
+    assert create_input(config_path) == UNCHANGED
@@ -0,0 +1,56 @@
+from pathlib import Path
+import threading
+import time
+import numpy as np
+from click.testing import CliRunner
+
+from hieroglyph.follow import follow_output
+from hieroglyph.parse import ELASTIC, ELASTIC_CS_HEADER, ELASTIC_CS_FOOTER_ALT
+from main import cli
+
+ANGLES = (0.0, 10.0, 20.0, 30.0)
+
+
+def write_slowly(ptolemy_path: Path):
+    with open(ptolemy_path, "a") as out:
+        out.write(f"{ELASTIC_CS_HEADER}  TYPE\n")
+        out.write("      C.M.         RUTHERFORD         MB/SR\n")
+        out.flush()
+        for angle in ANGLES:
+            time.sleep(0.05)
+            out.write(
+                f" {angle:9.3f}  1.00000E+00  0.5000  {1.0 + angle:12.5E}  {1.0 + angle:12.5E}   0.10\n"
+            )
+            out.flush()
+        out.write(f"{ELASTIC_CS_FOOTER_ALT} = 123.4 MB\n")
+
+
+def test_follow_stops_at_total(tmp_path: Path):
+    ptolemy_path = tmp_path / "elastic.out"
+    ptolemy_path.touch()
+    writer = threading.Thread(target=write_slowly, args=(ptolemy_path,))
+    writer.start()
+    start = time.monotonic()
+    n_rows, finished = follow_output(ptolemy_path, tmp_path / "parsed", ELASTIC, 60.0)
+    writer.join()
+    assert finished
+    assert n_rows == len(ANGLES)
+    assert time.monotonic() - start < 30.0
+    np.testing.assert_array_equal(np.load(tmp_path / "parsed" / "angle.npy"), ANGLES)
+
+
+def test_follow_rejects_extras(tmp_path: Path):
+    ptolemy_path = tmp_path / "elastic.out"
+    ptolemy_path.touch()
+    result = CliRunner().invoke(
+        cli,
+        [
+            "parse-elastic",
+            str(ptolemy_path),
+            str(tmp_path / "parsed"),
+            "--follow",
+            "--extras",
+        ],
+    )
+    assert result.exit_code == 2
+    assert "--extras is not supported with --follow" in result.output
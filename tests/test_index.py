@@ -0,0 +1,78 @@
+from io import StringIO
+from pathlib import Path
+import numpy as np
+
+from hieroglyph.index import get_index, get_reaction, read_reaction, read_reactions
+from hieroglyph.parse import (
+    DWBA,
+    DWBA_CS_HEADER,
+    DWBA_CS_FOOTER_ALT,
+    read_dwba_differential_cross_section,
+)
+
+ANGLES = (0.0, 10.0, 20.0)
+# Enough Lx's that PTOLEMY breaks them over three lines
+L_VALUES = (0, 1, 2, 3, 4, 5, 6)
+LX_TOTALS = tuple(0.5 * (l + 1) for l in L_VALUES)
+
+
+def write_dwba(out, scale: float):
+    groups = [L_VALUES[idx : idx + 3] for idx in range(0, len(L_VALUES), 3)]
+    out.write(f"{DWBA_CS_HEADER} ONE    LAB    ANGLE\n")
+    out.write("  ANGLE     SIGMA      ASYMMETRY  ...\n")
+    out.write("       (MB/SR)      \n")
+    out.write("  \n")
+    for group in groups:
+        out.write("".join(f"   LX =  {l:d}  +" for l in group).rstrip("+") + "\n")
+    out.write("\n")
+    for angle in ANGLES:
+        values = [scale * (angle + l + 1.0) for l in L_VALUES]
+        out.write(
+            f" {angle:7.2f} {sum(values):11.4E} {0.1:9.4f} {0:4d} {30:4d} {1.0:7.2f} {angle:8.3f} {0.5:8.4f} {0.5:8.4f}"
+        )
+        for idx in range(0, len(values), 3):
+            out.write("".join(f" {value:11.4E}" for value in values[idx : idx + 3]))
+            out.write("\n")
+    totals = [scale * total for total in LX_TOTALS]
+    out.write(f"{DWBA_CS_FOOTER_ALT}  {sum(totals):11.4E}")
+    for idx in range(0, len(totals), 3):
+        out.write("".join(f" {total:11.4E}" for total in totals[idx : idx + 3]))
+        out.write("\n")
+    out.write("   SOME OTHER OUTPUT LINE  1.234E+00\n")
+
+
+def test_reaction_includes_wrapped_totals(tmp_path: Path):
+    ptolemy_path = tmp_path / "dwba.out"
+    with open(ptolemy_path, "w") as out:
+        write_dwba(out, 1.0)
+        write_dwba(out, 2.0)
+
+    for number, scale in enumerate((1.0, 2.0)):
+        entry = get_reaction(get_index(ptolemy_path), DWBA, number)
+        result = read_reaction(ptolemy_path, entry, extras=True)
+        np.testing.assert_allclose(
+            result.total_cross_ls[:, 0], np.array(LX_TOTALS) * scale
+        )
+
+    full = read_dwba_differential_cross_section(ptolemy_path, extras=True)
+    with open(ptolemy_path, "r") as lines:
+        streamed = read_reactions(lines, extras=True)
+    assert len(streamed) == 2
+    for number, (kind, result) in enumerate(streamed):
+        assert kind == DWBA
+        np.testing.assert_array_equal(
+            result.total_cross_ls[:, 0], full.total_cross_ls[:, number]
+        )
+
+
+def test_reaction_reads_non_ascii(tmp_path: Path):
+    ptolemy_path = tmp_path / "dwba.out"
+    text = StringIO()
+    write_dwba(text, 1.0)
+    # A byte which is not valid UTF-8 within the calculation
+    ptolemy_path.write_bytes(
+        text.getvalue().replace("ASYMMETRY", "ASYMM\xc9TRY").encode("latin-1")
+    )
+    entry = get_reaction(get_index(ptolemy_path), DWBA, 0)
+    result = read_reaction(ptolemy_path, entry, extras=True)
+    np.testing.assert_allclose(result.total_cross_ls[:, 0], LX_TOTALS)
@@ -0,0 +1,98 @@
+from json import dumps, loads
+from pathlib import Path
+import numpy as np
+import pytest
+
+from hieroglyph.kinematics import compute_kinematics, describe_forbidden
+from hieroglyph.nuclear import get_mass_table
+from hieroglyph.sweep import KINEMATICS_NAME, create_sweep
+
+DATA_PATH = Path(__file__).parent / "data"
+
+
+def get_masses(*nuclei: tuple[int, int]) -> list[float]:
+    nuc_map = get_mass_table()
+    return [nuc_map.get_data(z, a).mass for z, a in nuclei]
+
+
+def test_kinematics_of_a_transfer():
+    # 48Ca(d,t)47Ca, which is endothermic
+    target, projectile, ejectile, residual = get_masses(
+        (20, 48), (1, 2), (1, 3), (20, 47)
+    )
+    q_value = target + projectile - ejectile - residual
+    assert q_value < 0.0
+    energies = np.array([0.0, 1.0, 20.0])
+    kinematics = compute_kinematics(
+        target, projectile, ejectile, residual, energies, 0.0
+    )
+    np.testing.assert_allclose(kinematics["q_value"], q_value)
+    np.testing.assert_allclose(kinematics["outgoing_energy"], energies + q_value)
+    threshold = kinematics["threshold"][0]
+    # Close to the non-relativistic threshold, -Q (1 + m_a / m_A)
+    assert threshold == pytest.approx(-q_value * (1.0 + projectile / target), rel=1e-4)
+    assert list(kinematics["allowed"]) == [False, False, True]
+    assert "not positive" in describe_forbidden(kinematics[0])
+    assert "below the reaction threshold" in describe_forbidden(kinematics[1])
+    assert describe_forbidden(kinematics[2]) == ""
+    # At threshold the outgoing pair is at rest in the center of mass
+    at_threshold = compute_kinematics(
+        target, projectile, ejectile, residual, threshold, 0.0
+    )
+    assert at_threshold["outgoing_cm_energy"] == pytest.approx(0.0, abs=1e-6)
+    assert at_threshold["allowed"]
+
+
+def test_kinematics_max_angle():
+    proton, carbon = get_masses((1, 1), (6, 12))
+    # A light ejectile off a heavy target goes everywhere
+    light = compute_kinematics(carbon, proton, proton, carbon, 20.0, 0.0)
+    assert light["max_angle"] == 180.0
+    # A heavy ejectile off a light target is held to sin(theta) = m_target / m_beam
+    heavy = compute_kinematics(proton, carbon, carbon, proton, 20.0, 0.0)
+    assert heavy["max_angle"] == pytest.approx(
+        np.degrees(np.arcsin(proton / carbon)), rel=1e-3
+    )
+    missing = compute_kinematics(proton, carbon, np.nan, proton, 20.0, 0.0)
+    assert not missing["allowed"]
+    assert "not in the mass table" in describe_forbidden(missing)
+
+
+# The potentials are taken below their fitted energies near threshold
+@pytest.mark.filterwarnings("ignore:Potential .* is being used outside")
+def test_sweep_prunes_forbidden_points(tmp_path: Path):
+    config = loads((DATA_PATH / "transfer_dt.json").read_text())
+    config["ptolemy_config_path"] = "dt.in"
+    config_path = tmp_path / "config.json"
+    config_path.write_text(dumps(config))
+    sweep_path = tmp_path / "sweep.json"
+    sweep_path.write_text(
+        dumps(
+            {
+                "projectile_energy": {"start": 0.0, "stop": 8.0, "step": 1.0},
+                "residual.excitation": [0.0, 2.0],
+            }
+        )
+    )
+    output_dir = tmp_path / "inputs"
+    points = create_sweep(config_path, sweep_path, output_dir, n_workers=1)
+    kinematics = np.load(output_dir / KINEMATICS_NAME)
+    assert len(kinematics) == len(points) == 18
+    for point, record in zip(points, kinematics):
+        assert record["projectile_energy"] == point.values["projectile_energy"]
+        if record["allowed"]:
+            assert point.reaction == 0
+            assert Path(point.path).exists()
+        else:
+            assert point.reaction == -1
+            assert point.path == ""
+            assert point.error == describe_forbidden(record)
+    # The threshold rises with the excitation of the residual
+    allowed = [
+        (point.values["projectile_energy"], point.values["residual.excitation"])
+        for point, record in zip(points, kinematics)
+        if record["allowed"]
+    ]
+    assert min(energy for energy, excitation in allowed if excitation == 0.0) == 4.0
+    assert min(energy for energy, excitation in allowed if excitation == 2.0) == 6.0
+    assert len(list(output_dir.glob("dt_*.in"))) == len(allowed)
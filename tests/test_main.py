@@ -0,0 +1,34 @@
+from pathlib import Path
+import pytest
+from click.testing import CliRunner
+
+from main import cli
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        (["--reaction", "0", "-j", "2"], "--workers is not supported with --reaction"),
+        (["--follow", "--format", "npy"], "--format is not supported with --follow"),
+        (
+            ["--follow", "--compression-level", "3"],
+            "--compression-level is not supported with --follow",
+        ),
+        (["--follow", "--reaction", "0"], "--reaction is not supported with --follow"),
+        (["--follow", "-j", "2"], "--workers is not supported with --follow"),
+        (["--keep-raw", "raw.gz"], "--keep-raw only applies when reading the output"),
+        (["--idle-timeout", "5"], "--idle-timeout only applies with --follow"),
+    ],
+)
+@pytest.mark.parametrize("command", ["parse-elastic", "parse-dwba"])
+def test_parse_rejects_options(
+    command: str, options: list[str], message: str, tmp_path: Path
+):
+    ptolemy_path = tmp_path / "calculation.out"
+    ptolemy_path.touch()
+    result = CliRunner().invoke(
+        cli, [command, str(ptolemy_path), str(tmp_path / "parsed"), *options]
+    )
+    assert result.exit_code == 2
+    assert message in result.output
+    assert not (tmp_path / "parsed").exists()
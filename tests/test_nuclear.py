@@ -0,0 +1,45 @@
+from pathlib import Path
+import shutil
+import numpy as np
+import pytest
+from spyral_utils.nuclear import NuclearDataMap
+from spyral_utils.nuclear.nuclear_map import DATA_PATH
+
+from hieroglyph.nuclear import load_mass_table
+
+
+def test_mass_table_matches_nuclear_map(tmp_path: Path):
+    parsed = load_mass_table(cache_dir=tmp_path)
+    cached = load_mass_table(cache_dir=tmp_path)
+    assert not isinstance(parsed.atomic_mass, np.memmap)
+    assert isinstance(cached.atomic_mass, np.memmap)
+    nuclei = list(NuclearDataMap().map.values())
+    for table in (parsed, cached):
+        for nucleus in nuclei:
+            assert vars(table.get_data(nucleus.Z, nucleus.A)) == vars(nucleus)
+        masses = table.get_mass_array(
+            np.array([nucleus.Z for nucleus in nuclei]),
+            np.array([nucleus.A for nucleus in nuclei]),
+        )
+        np.testing.assert_array_equal(masses, [nucleus.mass for nucleus in nuclei])
+    assert np.isnan(cached.get_mass_array(np.array([1, -1]), np.array([500, 1]))).all()
+    with pytest.raises(Exception, match="is not in the mass table"):
+        cached.get_data(1, 500)
+
+
+def test_mass_table_rebuilt_on_change(tmp_path: Path):
+    data_path = tmp_path / "masses.txt"
+    shutil.copyfile(DATA_PATH, data_path)
+    cache_dir = tmp_path / "cache"
+    load_mass_table(data_path, cache_dir)
+    assert len(list((cache_dir / "masses").iterdir())) == 1
+    # A changed table gets an entry of its own, rather than the stale arrays
+    with open(data_path, "a") as data_file:
+        data_file.write("1 3 H 3.1\n")
+    table = load_mass_table(data_path, cache_dir)
+    assert len(list((cache_dir / "masses").iterdir())) == 2
+    assert table.get_data(1, 3).atomic_mass == 3.1
+    # A corrupt entry falls back to parsing the table
+    for path in (cache_dir / "masses").glob("*/atomic_mass.npy"):
+        path.write_bytes(b"corrupt")
+    assert load_mass_table(data_path, cache_dir).get_data(1, 3).atomic_mass == 3.1
@@ -0,0 +1,67 @@
+from pathlib import Path
+import numpy as np
+import pytest
+
+from hieroglyph.parse import (
+    DWBA,
+    ELASTIC,
+    load_table_columns,
+    parse_dwba_differential_cross_section,
+    parse_elastic_differential_cross_section,
+    read_differential_cross_section,
+)
+from hieroglyph.result import load_arrays
+
+DATA_PATH = Path(__file__).parent / "data"
+# The outputs span several pages, with blank lines in the tables and (for DWBA) the
+# Lx's broken over three lines. The expected arrays were written by the original
+# line by line parsers
+CASES = [
+    (ELASTIC, "parse_elastic", parse_elastic_differential_cross_section),
+    (DWBA, "parse_dwba", parse_dwba_differential_cross_section),
+]
+
+
+def assert_matches_baseline(arrays: dict[str, np.ndarray], name: str):
+    with np.load(DATA_PATH / f"{name}.npz") as expected:
+        for key in expected.files:
+            np.testing.assert_array_equal(arrays[key], expected[key], err_msg=key)
+
+
+@pytest.mark.parametrize("kind, name, parse", CASES)
+def test_parse_matches_baseline(kind: str, name: str, parse, tmp_path: Path):
+    ptolemy_path = DATA_PATH / f"{name}.out"
+    assert_matches_baseline(
+        read_differential_cross_section(ptolemy_path, kind).arrays(), name
+    )
+    # Streamed from the lines of an open file rather than a path
+    with open(ptolemy_path, "r") as lines:
+        streamed = read_differential_cross_section(lines, kind)
+    assert_matches_baseline(streamed.arrays(), name)
+    # The extras are collected in the same pass without changing the rest
+    extras = read_differential_cross_section(ptolemy_path, kind, extras=True)
+    assert_matches_baseline(extras.arrays(), name)
+    parse(ptolemy_path, tmp_path / "parsed.npz")
+    assert_matches_baseline(load_arrays(tmp_path / "parsed.npz"), name)
+
+
+def test_load_table_columns_fortran_quirks():
+    lines = [
+        "  10.00  1.0000E+01  2.5000D-01  3.0\n",
+        "  20.00  1.0000-100  2.5000D+02  4.0\n",
+        "  30.00  1.0000E+01-2.5000E+00  5.0\n",
+    ]
+    np.testing.assert_array_equal(
+        load_table_columns(lines, [0, 1, 2, 3]),
+        [
+            [10.0, 1.0e1, 0.25, 3.0],
+            [20.0, 1.0e-100, 250.0, 4.0],
+            [30.0, 1.0e1, -2.5, 5.0],
+        ],
+    )
+    # Plain numbers take the fast path, which only reads the asked for columns
+    np.testing.assert_array_equal(
+        load_table_columns(["  1.0  2.0  3.0\n", "  4.0  5.0  6.0\n"], [0, 2]),
+        [[1.0, 3.0], [4.0, 6.0]],
+    )
+    assert load_table_columns([], [0, 1]).shape == (0, 2)
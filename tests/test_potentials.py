@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from hieroglyph.potentials import (
+    PARAMETER_NAMES,
+    POTENTIALS,
+    POTENTIALS_ARRAY,
+    PotentialParameters,
+    create_parameters,
+    create_parameters_array,
+)
+
+ENERGIES = np.linspace(1.0, 150.0, 25)
+# (Z, A) of targets from light to heavy
+TARGETS = ((6, 12), (20, 48), (50, 120), (82, 208))
+
+
+@pytest.mark.parametrize("potential", sorted(POTENTIALS.keys()))
+def test_scalar_matches_array(potential: str):
+    # The array potentials are written separately from the scalar ones, and are
+    # checked against them element by element
+    assert potential in POTENTIALS_ARRAY
+    for zt, at in TARGETS:
+        array = create_parameters_array(ENERGIES, zt, at, potential)
+        for idx, energy in enumerate(ENERGIES):
+            scalar = PotentialParameters()
+            POTENTIALS[potential](float(energy), zt, at, scalar)
+            for name in PARAMETER_NAMES:
+                assert scalar[name] == pytest.approx(
+                    array[name][idx], rel=1.0e-12, abs=1.0e-12
+                ), f"{name} at E={energy}, Z={zt}, A={at}"
+
+
+def test_create_parameters_memoized():
+    params = create_parameters(20.0, 20, 48, "daehnick")
+    assert create_parameters(20.0, 20, 48, "daehnick") is params
+    expected = PotentialParameters()
+    POTENTIALS["daehnick"](20.0, 20, 48, expected)
+    assert params.items() == expected.items()
@@ -0,0 +1,223 @@
+from pathlib import Path
+import gzip
+import sys
+import time
+import numpy as np
+import pytest
+
+from hieroglyph.cache import RunCache
+from hieroglyph.create import bundle_inputs
+from hieroglyph.parse import ELASTIC_CS_HEADER, ELASTIC_CS_FOOTER_ALT
+from hieroglyph import run
+from hieroglyph.run import RAW_GZIP, RAW_TEXT, run_inputs, run_ptolemy
+
+ANGLES = (0.0, 10.0, 20.0, 30.0)
+
+# A stand-in for PTOLEMY, which reads an input on stdin and writes an elastic output
+# on stdout. STUB_MODE picks how it misbehaves, and STUB_FLAG names a file which is
+# created the first time it runs, so that only the first run misbehaves
+STUB = f"""#!{sys.executable}
+import os
+import sys
+import time
+
+text = sys.stdin.read()
+mode = os.environ.get("STUB_MODE", "ok")
+if "STUB_LOG" in os.environ:
+    with open(os.environ["STUB_LOG"], "a") as log:
+        log.write("run\\n")
+flag = os.environ.get("STUB_FLAG")
+first = flag is not None and not os.path.exists(flag)
+if first:
+    open(flag, "w").close()
+if mode == "hang" or (mode == "hang-once" and first):
+    time.sleep(60.0)
+elif mode == "fail":
+    sys.stderr.write("stub failure\\n")
+    sys.exit(2)
+# One calculation per reaction of a bundled input
+for _ in range(1 + text.count("\\nreset\\n")):
+    sys.stdout.write({ELASTIC_CS_HEADER!r} + "  TYPE\\n")
+    sys.stdout.write("      C.M.         RUTHERFORD         MB/SR\\n")
+    for angle in {ANGLES!r}:
+        if mode == "garbage":
+            sys.stdout.write(f" {{angle:9.3f}}  garbage\\n")
+        else:
+            sys.stdout.write(
+                f" {{angle:9.3f}}  1.00000E+00  0.5000  {{1.0 + angle:12.5E}}  {{1.0 + angle:12.5E}}   0.10\\n"
+            )
+    sys.stdout.write({ELASTIC_CS_FOOTER_ALT!r} + " = 123.4 MB\\n")
+"""
+
+
+@pytest.fixture
+def stub(tmp_path: Path) -> str:
+    path = tmp_path / "ptolemy"
+    path.write_text(STUB)
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def input_path(tmp_path: Path) -> Path:
+    path = tmp_path / "point.in"
+    path.write_text("reaction: 16O(d,d)\nend\n")
+    return path
+
+
+def test_run_success(stub: str, input_path: Path):
+    reactions, error = run_ptolemy(stub, input_path, input_path.with_suffix(".out"))
+    assert error == ""
+    assert len(reactions) == 1
+    kind, result = reactions[0]
+    assert kind == "elastic"
+    np.testing.assert_array_equal(result.angle, ANGLES)
+    np.testing.assert_array_equal(result.cross, np.array(ANGLES) + 1.0)
+
+
+def test_run_timeout_retried(
+    stub: str, input_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    flag = tmp_path / "flag"
+    monkeypatch.setenv("STUB_MODE", "hang-once")
+    monkeypatch.setenv("STUB_FLAG", str(flag))
+    reactions, error = run_ptolemy(
+        stub, input_path, input_path.with_suffix(".out"), timeout=1.0, retries=1
+    )
+    assert flag.exists()
+    assert error == ""
+    assert len(reactions) == 1
+
+
+def test_run_timeout(stub: str, input_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("STUB_MODE", "hang")
+    reactions, error = run_ptolemy(
+        stub, input_path, input_path.with_suffix(".out"), timeout=0.5, retries=0
+    )
+    assert reactions == []
+    assert "timed out after 0.5 s" in error
+
+
+def test_run_timeout_kills_children(
+    stub: str, input_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # A wrapper script whose child keeps PTOLEMY's stdout open while it sleeps
+    wrapper = tmp_path / "wrapper.sh"
+    wrapper.write_text(f"#!/bin/sh\nsleep 60\nexec {stub}\n")
+    wrapper.chmod(0o755)
+    start = time.monotonic()
+    reactions, error = run_ptolemy(
+        str(wrapper), input_path, input_path.with_suffix(".out"), timeout=0.5, retries=0
+    )
+    assert time.monotonic() - start < 10.0
+    assert reactions == []
+    assert "timed out after 0.5 s" in error
+
+
+def test_run_nonzero_exit(stub: str, input_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("STUB_MODE", "fail")
+    reactions, error = run_ptolemy(
+        stub, input_path, input_path.with_suffix(".out"), retries=0
+    )
+    assert reactions == []
+    assert "exited with code 2" in error
+    assert error.endswith("stub failure\n")
+
+
+def test_run_parse_error(stub: str, input_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("STUB_MODE", "garbage")
+    reactions, error = run_ptolemy(stub, input_path, input_path.with_suffix(".out"))
+    assert reactions == []
+    assert error.startswith(f"Could not parse the output of {input_path}")
+
+
+def test_run_missing_executable(input_path: Path, tmp_path: Path):
+    reactions, error = run_ptolemy(
+        str(tmp_path / "missing"), input_path, input_path.with_suffix(".out")
+    )
+    assert reactions == []
+    assert error.startswith(f"Could not start PTOLEMY on {input_path}")
+
+
+def test_run_inputs_missing_input(stub: str, input_path: Path, tmp_path: Path):
+    missing = tmp_path / "missing.in"
+    outputs = run_inputs([input_path, missing], stub, n_workers=2)
+    reactions, error = outputs[input_path.with_suffix(".out")]
+    assert error == ""
+    assert len(reactions) == 1
+    reactions, error = outputs[missing.with_suffix(".out")]
+    assert reactions == []
+    assert error.startswith(f"Could not read the input {missing}")
+
+
+def test_run_inputs_cache_per_reaction(
+    stub: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    log = tmp_path / "log"
+    monkeypatch.setenv("STUB_LOG", str(log))
+    reactions = ["reaction: 16O(d,d)\nRETURN\n", "reaction: 18O(d,d)\nRETURN\n"]
+    first = tmp_path / "first.in"
+    first.write_text(
+        bundle_inputs([("point 0", reactions[0]), ("point 1", reactions[1])])
+    )
+    second = tmp_path / "second.in"
+    second.write_text(
+        bundle_inputs([("point 7", reactions[0]), ("point 8", reactions[1])])
+    )
+    single = tmp_path / "single.in"
+    single.write_text(reactions[1])
+    cache = RunCache(tmp_path / "cache", 1 << 30)
+
+    outputs = run_inputs([first], stub, n_workers=1, cache=cache)
+    assert len(outputs[first.with_suffix(".out")][0]) == 2
+    # The same reactions under other tags, and alone, come from the cache
+    outputs = run_inputs([second, single], stub, n_workers=1, cache=cache)
+    assert len(outputs[second.with_suffix(".out")][0]) == 2
+    assert len(outputs[single.with_suffix(".out")][0]) == 1
+    assert log.read_text().count("run") == 1
+    assert cache.misses == 1
+    assert cache.hits == 3
+
+
+def test_run_inputs_raw_every_output(
+    stub: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    log = tmp_path / "log"
+    monkeypatch.setenv("STUB_LOG", str(log))
+    first = tmp_path / "first.in"
+    first.write_text("reaction: 16O(d,d)\nRETURN\n")
+    duplicate = tmp_path / "duplicate.in"
+    duplicate.write_text(first.read_text())
+    cache = RunCache(tmp_path / "cache", 1 << 30)
+
+    run_inputs([first, duplicate], stub, n_workers=1, raw_format=RAW_GZIP, cache=cache)
+    assert log.read_text().count("run") == 1
+    raw_paths = [tmp_path / "first.out.gz", tmp_path / "duplicate.out.gz"]
+    texts = [gzip.open(path, "rt").read() for path in raw_paths]
+    assert texts[0] == texts[1]
+    assert ELASTIC_CS_HEADER in texts[0]
+
+    # The cache has no raw text to give, so the input is run again for it
+    for path in raw_paths:
+        path.unlink()
+    outputs = run_inputs([first], stub, n_workers=1, raw_format=RAW_GZIP, cache=cache)
+    assert outputs[first.with_suffix(".out")][1] == ""
+    assert log.read_text().count("run") == 2
+    assert raw_paths[0].exists()
+
+
+def test_run_inputs_spills_large_outputs(
+    stub: str, input_path: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # Every output is larger than this, so each is parsed from a temporary file
+    monkeypatch.setattr(run, "OUTPUT_SPOOL_SIZE", 16)
+    monkeypatch.setattr(run, "OUTPUT_READ_SIZE", 8)
+    outputs = run_inputs([input_path], stub, n_workers=1, raw_format=RAW_TEXT)
+    reactions, error = outputs[input_path.with_suffix(".out")]
+    assert error == ""
+    np.testing.assert_array_equal(reactions[0][1].cross, np.array(ANGLES) + 1.0)
+    assert ELASTIC_CS_HEADER in input_path.with_suffix(".out").read_text()
+    reactions, error = run_ptolemy(stub, input_path, input_path.with_suffix(".out"))
+    assert error == ""
+    assert len(reactions) == 1
+    assert list(tmp_path.glob("*.partial")) == []
@@ -0,0 +1,138 @@
+from pathlib import Path
+import os
+import numpy as np
+import pytest
+
+from hieroglyph.result import CrossSectionResult, write_result
+from hieroglyph.sample import build_sampler, get_sampler_path, load_sampler
+
+ANGLES = np.linspace(0.0, 180.0, 19)
+N_SAMPLES = 200_000
+
+
+def make_result() -> CrossSectionResult:
+    # Forward peaked, like most cross sections, with an l which peaks elsewhere
+    cross = 100.0 * np.exp(-ANGLES / 20.0) + 1.0
+    return CrossSectionResult(
+        angle=ANGLES.copy(),
+        cross=cross,
+        l_values=np.array([0, 3]),
+        cross_ls=np.stack([cross, 1.0 + np.sin(np.radians(ANGLES)) ** 2]),
+    )
+
+
+def exact_cdf(angle: np.ndarray, pdf: np.ndarray, x: np.ndarray) -> np.ndarray:
+    # The cumulative distribution of a density which is linear between the angles
+    idx = np.clip(np.searchsorted(angle, x, side="right") - 1, 0, len(angle) - 2)
+    width = np.diff(angle)
+    slope = np.diff(pdf) / width
+    areas = np.concatenate(([0.0], np.cumsum(0.5 * (pdf[1:] + pdf[:-1]) * width)))
+    distance = x - angle[idx]
+    return areas[idx] + pdf[idx] * distance + 0.5 * slope[idx] * distance**2
+
+
+@pytest.mark.parametrize("l", [None, 0, 3])
+def test_sample_matches_pdf(l: int | None):
+    result = make_result()
+    sampler = build_sampler(result)
+    row = 0 if l is None else 1 + list(result.l_values).index(l)
+    cross = result.cross if l is None else result.cross_ls[row - 1]
+    pdf = cross * np.sin(np.radians(ANGLES))
+    pdf /= np.sum(0.5 * (pdf[1:] + pdf[:-1]) * np.diff(ANGLES))
+    np.testing.assert_allclose(sampler.pdf[row], pdf, rtol=1.0e-12)
+
+    samples = sampler.sample(N_SAMPLES, 1234, l=l)
+    assert samples.shape == (N_SAMPLES,)
+    assert samples.min() >= ANGLES[0] and samples.max() <= ANGLES[-1]
+
+    # The histogram over a grid finer than the angles of the result, which also
+    # checks the shape within each interval
+    edges = np.linspace(ANGLES[0], ANGLES[-1], 73)
+    expected = np.diff(exact_cdf(ANGLES, pdf, edges)) * N_SAMPLES
+    counts, _ = np.histogram(samples, bins=edges)
+    filled = expected > 20.0
+    pulls = (counts[filled] - expected[filled]) / np.sqrt(expected[filled])
+    assert np.abs(pulls).max() < 5.0
+    assert np.sum(pulls**2) / np.count_nonzero(filled) < 1.5
+    # And the largest gap between the empirical and the exact distribution
+    ordered = np.sort(samples)
+    gap = np.abs(
+        exact_cdf(ANGLES, pdf, ordered) - np.arange(1, N_SAMPLES + 1) / N_SAMPLES
+    )
+    assert gap.max() < 1.63 / np.sqrt(N_SAMPLES)
+
+
+def test_sample_total():
+    result = make_result()
+    sampler = build_sampler(result)
+    density = result.cross * np.sin(np.radians(ANGLES))
+    integral = np.sum(0.5 * (density[1:] + density[:-1]) * np.diff(ANGLES))
+    assert sampler.total[0] == pytest.approx(2.0 * np.pi * np.radians(integral))
+
+
+def test_sample_seeds_reproducible():
+    sampler = build_sampler(make_result())
+    first = sampler.sample(1000, 42)
+    np.testing.assert_array_equal(sampler.sample(1000, 42), first)
+    np.testing.assert_array_equal(
+        sampler.sample(1000, np.random.default_rng(42)), first
+    )
+    assert not np.array_equal(sampler.sample(1000, 43), first)
+    assert not np.array_equal(sampler.sample(1000, 42, l=3), first)
+    # A generator carries on from where it was left, rather than starting again
+    rng = np.random.default_rng(42)
+    np.testing.assert_array_equal(sampler.sample(1000, rng), first)
+    assert not np.array_equal(sampler.sample(1000, rng), first)
+
+
+def test_sample_zero_intervals():
+    # Intervals with no probability are never drawn. The density is linear between
+    # the angles, so it only reaches 0 at the angles next to those it is not 0 at
+    cross = np.where((ANGLES >= 40.0) & (ANGLES <= 60.0), 5.0, 0.0)
+    sampler = build_sampler(CrossSectionResult(angle=ANGLES.copy(), cross=cross))
+    samples = sampler.sample(10_000, 5)
+    assert samples.min() >= 30.0 and samples.max() <= 70.0
+    assert np.any(samples < 40.0) and np.any(samples > 60.0)
+
+
+def test_sample_rejects():
+    sampler = build_sampler(
+        CrossSectionResult(angle=ANGLES.copy(), cross=np.ones(len(ANGLES)))
+    )
+    with pytest.raises(Exception, match="no distributions per l"):
+        sampler.sample(10, 0, l=0)
+    with pytest.raises(Exception, match="not in the set of l values"):
+        build_sampler(make_result()).sample(10, 0, l=1)
+    with pytest.raises(Exception, match="no probability at any angle"):
+        build_sampler(
+            CrossSectionResult(angle=ANGLES.copy(), cross=np.zeros(len(ANGLES)))
+        )
+    with pytest.raises(Exception, match="increasing order"):
+        build_sampler(
+            CrossSectionResult(angle=ANGLES[::-1].copy(), cross=np.ones(len(ANGLES)))
+        )
+
+
+def test_load_sampler_cached(tmp_path: Path):
+    parsed_path = tmp_path / "result.npz"
+    result = make_result()
+    write_result(result, parsed_path)
+    sampler = load_sampler(parsed_path)
+    sampler_path = get_sampler_path(parsed_path)
+    assert sampler_path.exists()
+    np.testing.assert_array_equal(
+        load_sampler(parsed_path).sample(100, 3), sampler.sample(100, 3)
+    )
+
+    # Writing the result again builds new tables
+    result.cross = result.cross[::-1].copy()
+    write_result(result, parsed_path)
+    stat = parsed_path.stat()
+    os.utime(parsed_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reloaded = load_sampler(parsed_path)
+    np.testing.assert_allclose(reloaded.pdf[0], build_sampler(result).pdf[0])
+    assert not np.allclose(reloaded.pdf[0], sampler.pdf[0])
+
+    # A corrupt file is built again too
+    sampler_path.write_bytes(b"not an npz")
+    np.testing.assert_array_equal(load_sampler(parsed_path).pdf, reloaded.pdf)
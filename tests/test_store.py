@@ -0,0 +1,139 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from pathlib import Path
+import numpy as np
+import pytest
+
+from hieroglyph.config import Config, deserialize_config
+from hieroglyph.parse import DWBA, ELASTIC
+from hieroglyph.result import CrossSectionResult
+from hieroglyph.store import ResultStore
+
+DATA_PATH = Path(__file__).parent / "data"
+ENERGIES = (16.0, 20.0, 24.0, 28.0)
+N_WRITERS = 4
+N_APPENDS = 10
+
+
+def make_config(energy: float) -> Config:
+    return replace(
+        deserialize_config(DATA_PATH / "transfer_dp.json"), projectile_energy=energy
+    )
+
+
+def make_result(energy: float, kind: str) -> CrossSectionResult:
+    # The values of every result depend on its energy, so that any mix up shows
+    angle = np.linspace(0.0, 180.0, 7)
+    result = CrossSectionResult(angle=angle, cross=energy + angle)
+    if kind == DWBA:
+        result.l_values = np.array([0, 2])
+        result.cross_ls = np.stack([energy * angle, energy * angle + 1.0])
+    return result
+
+
+def check_result(result: CrossSectionResult, energy: float, kind: str):
+    expected = make_result(energy, kind)
+    np.testing.assert_array_equal(result.angle, expected.angle)
+    np.testing.assert_array_equal(result.cross, expected.cross)
+    if kind == DWBA:
+        np.testing.assert_array_equal(result.l_values, expected.l_values)
+        np.testing.assert_array_equal(result.cross_ls, expected.cross_ls)
+    else:
+        assert result.cross_ls is None
+        assert result.l_values is None
+
+
+def fill_store(store: ResultStore):
+    store.append_many(
+        [
+            (make_config(energy), kind, make_result(energy, kind))
+            for energy in ENERGIES
+            for kind in (ELASTIC, DWBA)
+        ]
+    )
+
+
+def test_store_round_trip(tmp_path: Path):
+    store = ResultStore(tmp_path / "store")
+    assert len(store) == 0
+    assert len(store.query()) == 0
+    fill_store(store)
+    store.append(make_config(32.0), DWBA, make_result(32.0, DWBA))
+    assert len(store) == 2 * len(ENERGIES) + 1
+
+    # A store opened again reads the same results
+    store = ResultStore(tmp_path / "store")
+    index = store.read_index()
+    for entry in range(len(store)):
+        record = index[entry]
+        check_result(
+            store.get(entry), float(record["projectile_energy"]), str(record["kind"])
+        )
+
+
+def test_store_query(tmp_path: Path):
+    store = ResultStore(tmp_path / "store")
+    fill_store(store)
+    index = store.read_index()
+
+    entries = store.query(kind=DWBA)
+    assert len(entries) == len(ENERGIES)
+    assert all(index[entry]["kind"] == DWBA for entry in entries)
+    entries = store.query(projectile_energy=(18.0, 24.0))
+    assert sorted(index[entries]["projectile_energy"]) == [20.0, 20.0, 24.0, 24.0]
+    entries = store.query(projectile_energy=(None, 16.0), kind=ELASTIC)
+    assert len(entries) == 1
+    entries = store.query(projectile_energy=[16.0, 28.0, 100.0], kind=DWBA)
+    assert sorted(index[entries]["projectile_energy"]) == [16.0, 28.0]
+    assert len(store.query(projectile_energy=100.0)) == 0
+
+    for entry, result in zip(entries, store.get_many(entries)):
+        check_result(result, float(index[entry]["projectile_energy"]), DWBA)
+
+    with pytest.raises(Exception, match="not in the set of indexed fields"):
+        store.query(energy=20.0)
+    with pytest.raises(Exception, match="not in the set of indexed fields"):
+        store.query(chunk=0)
+    with pytest.raises(Exception, match="not of the form"):
+        store.query(projectile_energy=(1.0, 2.0, 3.0))
+
+
+def test_store_chunk_rollover(tmp_path: Path):
+    # Each DWBA result takes 7 + 7 + 2 * 7 + 2 values of 8 bytes, so a chunk holds two
+    store = ResultStore(tmp_path / "store", chunk_bytes=2 * 30 * 8)
+    for energy in ENERGIES:
+        store.append(make_config(energy), DWBA, make_result(energy, DWBA))
+    index = store.read_index()
+    assert list(index["chunk"]) == [0, 0, 1, 1]
+    assert len(list((tmp_path / "store" / "chunks").iterdir())) == 2
+    for entry, energy in enumerate(ENERGIES):
+        check_result(store.get(entry, index), energy, DWBA)
+
+
+def append_from_process(directory: Path, writer: int):
+    store = ResultStore(directory, chunk_bytes=4096)
+    for number in range(N_APPENDS):
+        energy = float(writer * N_APPENDS + number)
+        kind = DWBA if number % 2 == 0 else ELASTIC
+        store.append(make_config(energy), kind, make_result(energy, kind))
+
+
+def test_store_concurrent_appends(tmp_path: Path):
+    directory = tmp_path / "store"
+    with ProcessPoolExecutor(N_WRITERS) as executor:
+        futures = [
+            executor.submit(append_from_process, directory, writer)
+            for writer in range(N_WRITERS)
+        ]
+        for future in futures:
+            future.result()
+
+    store = ResultStore(directory, chunk_bytes=4096)
+    assert len(store) == N_WRITERS * N_APPENDS
+    index = store.read_index()
+    energies = sorted(index["projectile_energy"])
+    assert energies == [float(number) for number in range(N_WRITERS * N_APPENDS)]
+    assert index["chunk"].max() > 0
+    for entry in range(len(store)):
+        energy = float(index[entry]["projectile_energy"])
+        check_result(store.get(entry, index), energy, str(index[entry]["kind"]))
@@ -0,0 +1,141 @@
+from json import dumps, loads
+from pathlib import Path
+import os
+import numpy as np
+import pytest
+
+from hieroglyph.config import deserialize_config
+from hieroglyph.create import CHANGED, CREATED, UNCHANGED, render_input, unbundle_input
+from hieroglyph.nuclear import get_mass_table
+from hieroglyph.parse import DWBA
+from hieroglyph.result import CrossSectionResult
+from hieroglyph.sweep import (
+    KINEMATICS_NAME,
+    MANIFEST_NAME,
+    apply_sweep_values,
+    count_input_status,
+    create_sweep,
+    match_sweep_outputs,
+    read_manifest,
+    read_manifest_base,
+)
+
+DATA_PATH = Path(__file__).parent / "data"
+ENERGIES = (16.0, 20.0, 24.0)
+ORBITALS = ([1, 1.5], [3, 3.5])
+
+
+@pytest.fixture
+def config_path(tmp_path: Path) -> Path:
+    config = loads((DATA_PATH / "transfer_dp.json").read_text())
+    config["ptolemy_config_path"] = "dp.in"
+    path = tmp_path / "config.json"
+    path.write_text(dumps(config))
+    return path
+
+
+def write_sweep(path: Path, energies: tuple[float, ...]) -> Path:
+    path.write_text(
+        dumps(
+            {
+                "projectile_energy": {
+                    "start": energies[0],
+                    "stop": energies[-1],
+                    "step": energies[1] - energies[0],
+                },
+                "orbital_l,orbital_j": ORBITALS,
+            }
+        )
+    )
+    return path
+
+
+def test_sweep_manifest_round_trip(config_path: Path, tmp_path: Path):
+    sweep_path = write_sweep(tmp_path / "sweep.json", ENERGIES)
+    output_dir = tmp_path / "inputs"
+    points = create_sweep(config_path, sweep_path, output_dir, n_workers=1)
+    assert read_manifest(output_dir / MANIFEST_NAME) == points
+    base = read_manifest_base(output_dir / MANIFEST_NAME)
+    assert base == deserialize_config(config_path)
+    assert len(np.load(output_dir / KINEMATICS_NAME)) == len(points)
+    # The last axis varies fastest, and the joined keys vary together
+    assert [point.values for point in points] == [
+        {"projectile_energy": energy, "orbital_l": l, "orbital_j": j}
+        for energy in ENERGIES
+        for l, j in ORBITALS
+    ]
+    nuc_map = get_mass_table()
+    for point in points:
+        assert point.status == CREATED
+        assert point.reaction == 0
+        config = apply_sweep_values(base, point.values)
+        config.ptolemy_config_path = point.path
+        config.sanitize(nuc_map)
+        assert Path(point.path).read_text() == render_input(config, nuc_map)
+
+
+def test_sweep_bundles(config_path: Path, tmp_path: Path):
+    sweep_path = write_sweep(tmp_path / "sweep.json", ENERGIES)
+    single = create_sweep(config_path, sweep_path, tmp_path / "single", n_workers=1)
+    bundled = create_sweep(
+        config_path, sweep_path, tmp_path / "bundled", n_workers=1, bundle_size=4
+    )
+    assert [point.reaction for point in bundled] == [0, 1, 2, 3, 0, 1]
+    assert len({point.path for point in bundled}) == 2
+    assert read_manifest(tmp_path / "bundled" / MANIFEST_NAME) == bundled
+    for path in {point.path for point in bundled}:
+        reactions = unbundle_input(Path(path).read_text())
+        expected = [
+            unbundle_input(Path(point.path).read_text())[0]
+            for point, bundled_point in zip(single, bundled)
+            if bundled_point.path == path
+        ]
+        assert reactions == expected
+
+    # The reactions of each output go back to their own points
+    outputs = {}
+    for path in sorted({point.path for point in bundled}):
+        count = sum(point.path == path for point in bundled)
+        outputs[Path(path).with_suffix(".out")] = (
+            [
+                (DWBA, CrossSectionResult(angle=np.array([float(number)])))
+                for number in range(count)
+            ],
+            "",
+        )
+    for point, (kind, result, error) in zip(
+        bundled, match_sweep_outputs(bundled, outputs)
+    ):
+        assert error == ""
+        assert kind == DWBA
+        assert result.angle[0] == point.reaction
+    # An output missing a reaction only fails the point of that reaction
+    last = Path(bundled[-1].path).with_suffix(".out")
+    outputs[last] = (outputs[last][0][:1], "")
+    parsed = match_sweep_outputs(bundled, outputs)
+    assert [error != "" for _, _, error in parsed] == [False] * 5 + [True]
+
+
+def test_sweep_skips_unchanged_inputs(config_path: Path, tmp_path: Path):
+    sweep_path = write_sweep(tmp_path / "sweep.json", ENERGIES)
+    output_dir = tmp_path / "inputs"
+    first = create_sweep(config_path, sweep_path, output_dir, n_workers=1)
+    mtimes = {point.path: Path(point.path).stat().st_mtime_ns for point in first}
+
+    again = create_sweep(config_path, sweep_path, output_dir, n_workers=1)
+    assert count_input_status(again) == {CREATED: 0, CHANGED: 0, UNCHANGED: 6}
+    assert {
+        point.path: Path(point.path).stat().st_mtime_ns for point in again
+    } == mtimes
+
+    # An input edited by hand is rewritten, and a new energy only adds its own
+    edited = Path(first[0].path)
+    edited.write_text("edited\n")
+    # Later than the recorded time, however coarse the clock of the filesystem
+    os.utime(edited, ns=(mtimes[str(edited)] + 10**9, mtimes[str(edited)] + 10**9))
+    write_sweep(sweep_path, (*ENERGIES, 28.0))
+    extended = create_sweep(config_path, sweep_path, output_dir, n_workers=1)
+    assert [point.status for point in extended] == [CHANGED] + [UNCHANGED] * 5 + [
+        CREATED
+    ] * 2
+    assert Path(first[0].path).read_text() != "edited\n"
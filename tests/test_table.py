@@ -0,0 +1,122 @@
+from pathlib import Path
+import numpy as np
+import pytest
+
+from hieroglyph.result import CrossSectionResult
+from hieroglyph.table import build_table, load_table, write_table
+
+ANGLES = np.linspace(0.0, 180.0, 37)
+UNIFORM_ENERGIES = np.linspace(10.0, 30.0, 6)
+UNEVEN_ENERGIES = np.array([10.0, 11.0, 13.5, 20.0, 30.0])
+
+
+def bilinear(energy: np.ndarray, angle: np.ndarray) -> np.ndarray:
+    # Bilinear interpolation reproduces this exactly, on any grid
+    return 2.0 + 0.5 * energy + 0.1 * angle + 0.01 * energy * angle
+
+
+def make_results(energies: np.ndarray) -> list[CrossSectionResult]:
+    return [
+        CrossSectionResult(angle=ANGLES.copy(), cross=bilinear(energy, ANGLES))
+        for energy in energies
+    ]
+
+
+@pytest.mark.parametrize("energies", [UNIFORM_ENERGIES, UNEVEN_ENERGIES])
+def test_table_at_grid_points(energies: np.ndarray):
+    # Given out of order, as the outputs of a sweep can be
+    table = build_table(energies[::-1], make_results(energies)[::-1])
+    np.testing.assert_array_equal(table.energy, energies)
+    grid_energy, grid_angle = np.meshgrid(energies, ANGLES, indexing="ij")
+    np.testing.assert_array_equal(table.evaluate(grid_energy, grid_angle), table.cross)
+    assert table.evaluate(energies[-1], ANGLES[-1]) == table.cross[-1, -1]
+
+
+@pytest.mark.parametrize("energies", [UNIFORM_ENERGIES, UNEVEN_ENERGIES])
+def test_table_between_grid_points(energies: np.ndarray):
+    table = build_table(energies, make_results(energies))
+    rng = np.random.default_rng(7)
+    energy = rng.uniform(energies[0], energies[-1], 1000)
+    angle = rng.uniform(ANGLES[0], ANGLES[-1], 1000)
+    np.testing.assert_allclose(
+        table.evaluate(energy, angle), bilinear(energy, angle), rtol=1.0e-12
+    )
+    # Halfway across a cell is the mean of its corners
+    middle = table.evaluate(
+        0.5 * (energies[1] + energies[2]), 0.5 * (ANGLES[3] + ANGLES[4])
+    )
+    assert middle == pytest.approx(table.cross[1:3, 3:5].mean(), rel=1.0e-12)
+    # Scalars broadcast against arrays
+    assert table.evaluate(energies[1], ANGLES).shape == ANGLES.shape
+
+
+def test_table_outside_grid():
+    table = build_table(UNIFORM_ENERGIES, make_results(UNIFORM_ENERGIES))
+    energy = np.array([5.0, 20.0, 35.0, 20.0])
+    angle = np.array([90.0, -1.0, 90.0, 90.0])
+    values = table.evaluate(energy, angle)
+    assert np.isnan(values[:3]).all()
+    assert values[3] == pytest.approx(bilinear(20.0, 90.0), rel=1.0e-12)
+    clipped = table.evaluate(energy, angle, clip=True)
+    np.testing.assert_allclose(
+        clipped,
+        bilinear(np.array([10.0, 20.0, 30.0, 20.0]), np.array([90.0, 0.0, 90.0, 90.0])),
+        rtol=1.0e-12,
+    )
+
+
+def test_table_ls(tmp_path: Path):
+    results = make_results(UNIFORM_ENERGIES)
+    for energy, result in zip(UNIFORM_ENERGIES, results):
+        # The highest energy also includes l=4
+        if energy == UNIFORM_ENERGIES[-1]:
+            result.l_values = np.array([0, 2, 4])
+        else:
+            result.l_values = np.array([0, 2])
+        result.cross_ls = np.stack(
+            [(l + 1) * bilinear(energy, ANGLES) for l in result.l_values]
+        )
+    table = build_table(UNIFORM_ENERGIES, results)
+    np.testing.assert_array_equal(table.l_values, [0, 2, 4])
+
+    energy, angle = 15.0, 47.5
+    values = table.evaluate_ls(energy, angle)
+    assert values.shape == (3,)
+    np.testing.assert_allclose(
+        values[:2], [bilinear(energy, angle), 3.0 * bilinear(energy, angle)]
+    )
+    # l=4 is 0 wherever it was not calculated
+    assert values[2] == 0.0
+    assert table.evaluate_ls(UNIFORM_ENERGIES[-1], angle, l=4) == pytest.approx(
+        5.0 * bilinear(UNIFORM_ENERGIES[-1], angle)
+    )
+    with pytest.raises(Exception, match="not in the set of l values"):
+        table.evaluate_ls(energy, angle, l=1)
+
+    write_table(table, tmp_path / "table")
+    loaded = load_table(tmp_path / "table")
+    np.testing.assert_array_equal(loaded.evaluate_ls(energy, angle), values)
+    np.testing.assert_array_equal(
+        loaded.evaluate(UNIFORM_ENERGIES, 47.5),
+        table.evaluate(UNIFORM_ENERGIES, 47.5),
+    )
+
+
+def test_build_table_rejects():
+    results = make_results(UNIFORM_ENERGIES)
+    with pytest.raises(Exception, match="energies for"):
+        build_table(UNIFORM_ENERGIES[:-1], results)
+    with pytest.raises(Exception, match="at different energies"):
+        build_table(np.full(len(results), 20.0), results)
+    results[2].angle = ANGLES + 1.0
+    with pytest.raises(Exception, match="not on the same angles"):
+        build_table(UNIFORM_ENERGIES, results)
+    results = make_results(UNIFORM_ENERGIES)
+    results[0].l_values = np.array([0])
+    results[0].cross_ls = results[0].cross[np.newaxis, :]
+    with pytest.raises(Exception, match="Only some of the results"):
+        build_table(UNIFORM_ENERGIES, results)
+    with pytest.raises(Exception, match="no cross sections per l"):
+        build_table(UNIFORM_ENERGIES, make_results(UNIFORM_ENERGIES)).evaluate_ls(
+            20.0, 90.0
+        )